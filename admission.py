@@ -0,0 +1,170 @@
+"""
+요청 수락 제어(admission control) 모듈
+- 작업 종류(질의/인덱싱)별 동시 실행 한도와 대기열 크기 제한
+- 워커 전체 동시 실행 한도 안에서 우선순위가 높은 종류(질의)를 먼저 수락
+- 대기열이 가득 차면 즉시 거절(429), 대기 시간이 초과되면 거절(503)하고 Retry-After 제시
+- 대기열 길이, 실행 중인 요청 수, 대기 시간을 지표로 노출
+"""
+import time
+import math
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict
+
+from metrics import counter, gauge, histogram
+
+
+ADMISSION_QUEUE_DEPTH = gauge('pdfchat_admission_queue_depth', '수락 대기 중인 요청 수', ('class',))
+ADMISSION_IN_FLIGHT = gauge('pdfchat_admission_in_flight', '실행 중인 요청 수', ('class',))
+ADMISSION_WAIT_SECONDS = histogram('pdfchat_admission_wait_seconds', '수락까지 대기한 시간', ('class',))
+ADMISSION_REJECTIONS = counter(
+    'pdfchat_admission_rejections_total', '거절된 요청 수 (queue_full: 429, timeout: 503)', ('class', 'reason')
+)
+
+
+class AdmissionRejected(Exception):
+    """수락 거절 (HTTP 상태 코드와 Retry-After 초 포함)"""
+
+    def __init__(self, work_class: str, reason: str, status: int, retry_after: int):
+        super().__init__(f"{work_class} 요청 거절: {reason}")
+        self.work_class = work_class
+        self.reason = reason
+        self.status = status
+        self.retry_after = retry_after
+
+
+class _WorkClass:
+    """작업 종류별 한도와 상태"""
+
+    def __init__(self, name: str, priority: int, concurrency: int, queue_size: int, timeout: float):
+        self.name = name
+        self.priority = priority
+        self.concurrency = max(1, concurrency)
+        self.queue_size = max(0, queue_size)
+        self.timeout = timeout
+        self.running = 0
+        self.waiting = deque()
+        self.service_time = 1.0  # 처리 시간 지수 이동 평균 (초)
+
+
+class AdmissionController:
+    """워커 단위 요청 수락 제어기"""
+
+    def __init__(self, max_active: int = 4):
+        """
+        Args:
+            max_active: 모든 종류를 합친 동시 실행 한도
+        """
+        self.max_active = max(1, max_active)
+        self._classes: Dict[str, _WorkClass] = {}
+        self._condition = threading.Condition()
+
+    def add_class(
+        self,
+        name: str,
+        priority: int,
+        concurrency: int,
+        queue_size: int,
+        timeout: float
+    ) -> None:
+        """
+        작업 종류 등록
+
+        Args:
+            name: 종류 이름 (지표 라벨)
+            priority: 우선순위 (작을수록 먼저 수락)
+            concurrency: 이 종류의 동시 실행 한도
+            queue_size: 이 종류의 최대 대기 요청 수
+            timeout: 최대 대기 시간 (초)
+        """
+        self._classes[name] = _WorkClass(name, priority, concurrency, queue_size, timeout)
+
+    def _active(self) -> int:
+        return sum(work_class.running for work_class in self._classes.values())
+
+    def _can_admit(self, work_class: _WorkClass, ticket: object) -> bool:
+        """차례가 된 요청인지 확인 (self._condition 보유 상태)"""
+        if work_class.waiting[0] is not ticket:
+            return False
+        if work_class.running >= work_class.concurrency or self._active() >= self.max_active:
+            return False
+        # 우선순위가 더 높은 종류가 대기 중이고 수락 가능하면 양보
+        return not any(
+            other.priority < work_class.priority and other.waiting and other.running < other.concurrency
+            for other in self._classes.values()
+        )
+
+    def _retry_after(self, work_class: _WorkClass) -> int:
+        """대기열이 비워지는 데 걸릴 예상 시간 (초)"""
+        backlog = len(work_class.waiting) + work_class.running
+        return max(1, math.ceil(work_class.service_time * backlog / work_class.concurrency))
+
+    def _update_gauges(self, work_class: _WorkClass) -> None:
+        ADMISSION_QUEUE_DEPTH.set(len(work_class.waiting), **{'class': work_class.name})
+        ADMISSION_IN_FLIGHT.set(work_class.running, **{'class': work_class.name})
+
+    @contextmanager
+    def admit(self, name: str):
+        """
+        작업 수락 (with 블록 동안 실행 슬롯 점유)
+
+        Raises:
+            AdmissionRejected: 대기열이 가득 찼거나(429) 대기 시간이 초과된 경우(503)
+        """
+        work_class = self._classes[name]
+        labels = {'class': name}
+        ticket = object()
+        started_at = time.perf_counter()
+
+        with self._condition:
+            if work_class.running + len(work_class.waiting) >= work_class.concurrency + work_class.queue_size:
+                ADMISSION_REJECTIONS.inc(reason='queue_full', **labels)
+                raise AdmissionRejected(name, 'queue_full', 429, self._retry_after(work_class))
+
+            work_class.waiting.append(ticket)
+            self._update_gauges(work_class)
+
+            deadline = started_at + work_class.timeout
+            while not self._can_admit(work_class, ticket):
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    work_class.waiting.remove(ticket)
+                    self._update_gauges(work_class)
+                    self._condition.notify_all()
+                    ADMISSION_REJECTIONS.inc(reason='timeout', **labels)
+                    raise AdmissionRejected(name, 'timeout', 503, self._retry_after(work_class))
+                self._condition.wait(remaining)
+
+            work_class.waiting.popleft()
+            work_class.running += 1
+            self._update_gauges(work_class)
+            # 다음 차례의 요청(다른 종류 포함)도 수락 가능한지 다시 확인하도록 깨움
+            self._condition.notify_all()
+
+        admitted_at = time.perf_counter()
+        ADMISSION_WAIT_SECONDS.observe(admitted_at - started_at, **labels)
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                work_class.running -= 1
+                elapsed = time.perf_counter() - admitted_at
+                work_class.service_time = 0.8 * work_class.service_time + 0.2 * elapsed
+                self._update_gauges(work_class)
+                self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Dict]:
+        """종류별 실행/대기 현황"""
+        with self._condition:
+            return {
+                name: {
+                    'running': work_class.running,
+                    'waiting': len(work_class.waiting),
+                    'concurrency': work_class.concurrency,
+                    'queue_size': work_class.queue_size,
+                    'service_time': round(work_class.service_time, 3)
+                }
+                for name, work_class in self._classes.items()
+            }
@@ -6,13 +6,28 @@ Flask 백엔드 애플리케이션
 """
 import os
 import sys
+import time
+import hmac
+import tempfile
 import logging
+import functools
+import threading
+from collections import OrderedDict, namedtuple
+from urllib.parse import quote
 from datetime import datetime
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, request, jsonify, render_template, send_from_directory, Response, g, has_request_context
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
-from pdf_processor import PDFProcessor
-from rag_engine import RAGEngine
+from pdf_processor import PDFProcessor, PAGE_IMAGE_DPI, PAGE_IMAGE_DIR
+import metrics
+import index_store
+import index_bundle
+from storage_manager import StorageManager, parse_size
+from metrics import stage_timer
+from profiling import ProfileStore
+from singleflight import SingleFlight, normalize_question
+from conversation import ConversationStore
+from admission import AdmissionController, AdmissionRejected
 
 # 환경 변수 로드
 load_dotenv()
@@ -33,11 +48,233 @@ app.config['SECRET_KEY'] = 'your-secret-key-change-this'
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB 제한
 app.config['ALLOWED_EXTENSIONS'] = {'pdf'}
+app.config['RAG_BACKEND'] = os.getenv('RAG_BACKEND', 'openai').lower()  # openai | free
+app.config['INDEX_ROOT'] = os.getenv('INDEX_ROOT')  # 기본값: 엔진별 저장 경로
+app.config['CHUNK_SIZE'] = int(os.getenv('CHUNK_SIZE', 1000))
+app.config['CHUNK_OVERLAP'] = int(os.getenv('CHUNK_OVERLAP', 200))
+app.config['BATCH_QUERY_MAX'] = int(os.getenv('BATCH_QUERY_MAX', 100))
+app.config['BATCH_QUERY_CONCURRENCY'] = int(os.getenv('BATCH_QUERY_CONCURRENCY', 4))
+app.config['ADMIN_TOKEN'] = os.getenv('ADMIN_TOKEN')
+app.config['PROFILING_ENABLED'] = os.getenv('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes')
+app.config['PROFILE_DIR'] = os.getenv('PROFILE_DIR', 'profiles')
+app.config['DOCUMENT_CACHE_SIZE'] = int(os.getenv('DOCUMENT_CACHE_SIZE', 5))
+app.config['WARMUP_DOCUMENTS'] = int(os.getenv('WARMUP_DOCUMENTS', 3))
+app.config['WARMUP_STRATEGY'] = os.getenv('WARMUP_STRATEGY', 'recent').lower()  # recent | frequent
+app.config['CONVERSATION_MAX_TURNS'] = int(os.getenv('CONVERSATION_MAX_TURNS', 4))
+app.config['CONVERSATION_MAX_SESSIONS'] = int(os.getenv('CONVERSATION_MAX_SESSIONS', 1000))
+app.config['CONVERSATION_TTL'] = int(os.getenv('CONVERSATION_TTL', 3600))  # 초
+app.config['ADMISSION_MAX_ACTIVE'] = int(os.getenv('ADMISSION_MAX_ACTIVE', 4))  # 워커당 동시 실행 한도
+app.config['ADMISSION_QUERY_CONCURRENCY'] = int(os.getenv('ADMISSION_QUERY_CONCURRENCY', 3))  # 인덱싱용 슬롯 1개 남김
+app.config['ADMISSION_QUERY_QUEUE'] = int(os.getenv('ADMISSION_QUERY_QUEUE', 16))
+app.config['ADMISSION_QUERY_TIMEOUT'] = float(os.getenv('ADMISSION_QUERY_TIMEOUT', 30))  # 초
+app.config['ADMISSION_INGEST_CONCURRENCY'] = int(os.getenv('ADMISSION_INGEST_CONCURRENCY', 1))
+app.config['ADMISSION_INGEST_QUEUE'] = int(os.getenv('ADMISSION_INGEST_QUEUE', 2))
+app.config['ADMISSION_INGEST_TIMEOUT'] = float(os.getenv('ADMISSION_INGEST_TIMEOUT', 10))  # 초
+app.config['CLIENT_RENDER_ENABLED'] = os.getenv('CLIENT_RENDER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+app.config['PDF_CACHE_MAX_AGE'] = int(os.getenv('PDF_CACHE_MAX_AGE', 3600))  # 버전 없는 /api/pdf 요청의 캐시 시간 (초)
+app.config['STORAGE_BUDGET_BYTES'] = parse_size(os.getenv('STORAGE_BUDGET_BYTES', '0'))  # 예: 9G, 0이면 제한 없음
+app.config['STORAGE_EVICT_UPLOADS'] = os.getenv('STORAGE_EVICT_UPLOADS', '').lower() in ('1', 'true', 'yes')
 
 # 전역 변수
-rag_engine = None
-current_pdf_path = None
-pdf_processor = None
+# 현재 문서의 (RAG 엔진, PDFProcessor, 경로)는 한 튜플로 교체하므로 요청은 한 번 읽은 조합을 일관되게 사용
+ActiveDocument = namedtuple('ActiveDocument', ['engine', 'processor', 'path'])
+active_document = None
+profile_store = ProfileStore(app.config['PROFILE_DIR'])
+query_flights = SingleFlight('query')
+conversations = ConversationStore(
+    max_sessions=app.config['CONVERSATION_MAX_SESSIONS'],
+    max_turns=app.config['CONVERSATION_MAX_TURNS'],
+    ttl=app.config['CONVERSATION_TTL']
+)
+
+# 요청 수락 제어: 질의를 인덱싱(업로드/로드/일괄 질의)보다 먼저 수락
+admission = AdmissionController(max_active=app.config['ADMISSION_MAX_ACTIVE'])
+admission.add_class(
+    'query', priority=0,
+    concurrency=app.config['ADMISSION_QUERY_CONCURRENCY'],
+    queue_size=app.config['ADMISSION_QUERY_QUEUE'],
+    timeout=app.config['ADMISSION_QUERY_TIMEOUT']
+)
+admission.add_class(
+    'ingest', priority=1,
+    concurrency=app.config['ADMISSION_INGEST_CONCURRENCY'],
+    queue_size=app.config['ADMISSION_INGEST_QUEUE'],
+    timeout=app.config['ADMISSION_INGEST_TIMEOUT']
+)
+_engine_class = None
+_storage_manager = None
+
+# 로드된 문서 캐시 (PDF 경로 -> (RAG 엔진, PDFProcessor)), 최근 사용 순
+loaded_documents = OrderedDict()
+loaded_documents_lock = threading.Lock()
+
+# 로드하지 않은 문서의 페이지 이미지용 PDFProcessor 캐시 (PDF 경로 -> PDFProcessor), 최근 사용 순
+preview_processors = OrderedDict()
+preview_processors_lock = threading.Lock()
+
+# 워커 예열 상태 (pending -> warming -> ready | failed)
+warmup_state = {'status': 'pending', 'documents': [], 'error': None, 'elapsed': None}
+_warmup_thread = None
+
+
+def get_engine_class():
+    """
+    설정된 RAG 엔진 클래스 반환
+    
+    LangChain, OpenAI, FAISS(무료 버전은 torch까지)는 임포트 비용이 크므로
+    모듈 로드 시점이 아니라 엔진이 처음 필요할 때 임포트합니다.
+    """
+    global _engine_class
+    
+    if _engine_class is None:
+        backend = app.config['RAG_BACKEND']
+        logger.info(f"RAG 엔진 모듈 로드 중... (백엔드: {backend})")
+        with stage_timer('engine_import'):
+            if backend == 'free':
+                from rag_engine_free import RAGEngineFree
+                _engine_class = RAGEngineFree
+            elif backend == 'openai':
+                from rag_engine import RAGEngine
+                _engine_class = RAGEngine
+            else:
+                raise ValueError(f"지원하지 않는 RAG_BACKEND입니다: {backend} (openai, free)")
+    
+    return _engine_class
+
+
+def get_storage_manager():
+    """업로드/인덱스/페이지 이미지 디스크 용량 관리자 (인덱스 루트가 엔진별이므로 처음 필요할 때 생성)"""
+    global _storage_manager
+    
+    if _storage_manager is None:
+        _storage_manager = StorageManager(
+            app.config['UPLOAD_FOLDER'],
+            index_root_for(get_engine_class()),
+            image_dir=PAGE_IMAGE_DIR,
+            budget_bytes=app.config['STORAGE_BUDGET_BYTES'],
+            evict_uploads=app.config['STORAGE_EVICT_UPLOADS']
+        )
+    return _storage_manager
+
+
+def loaded_document_ids():
+    """이 워커에 로드된 문서 ID (예산 적용 시 인덱스/PDF 삭제 제외)"""
+    with loaded_documents_lock:
+        paths = list(loaded_documents)
+    document = active_document
+    if document is not None:
+        paths.append(document.path)
+    return {index_store.document_id(path) for path in paths}
+
+
+def enforce_storage_budget(required_bytes=0):
+    """
+    디스크 예산 적용
+    
+    required_bytes가 있으면(업로드) 최근 사용량 추정치로 바로 판단하고 부족할 때만 공간을 비우며,
+    없으면 STORAGE_CHECK_INTERVAL마다 백그라운드 스레드에서 정리하므로 요청을 붙잡지 않습니다.
+    
+    Returns:
+        bool: 예산 이내이면 True (디스크 오류로 확인하지 못한 경우도 True)
+    """
+    if not app.config['STORAGE_BUDGET_BYTES']:
+        return True
+    
+    storage = get_storage_manager()
+    try:
+        if required_bytes:
+            return storage.admit(required_bytes, protected=loaded_document_ids())
+        storage.maybe_enforce(protected=loaded_document_ids())
+    except OSError as e:
+        logger.warning(f"디스크 예산 적용 실패: {e}")
+    return True
+
+
+@app.before_request
+def start_request_timer():
+    """요청 단위 단계별 시간 측정 시작"""
+    g.request_started_at = time.perf_counter()
+    metrics.start_request_timing()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """요청 지표 기록 및 API 응답에 Server-Timing 헤더 추가"""
+    started_at = g.get('request_started_at')
+    if started_at is None:
+        return response
+    
+    elapsed = time.perf_counter() - started_at
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    metrics.HTTP_SECONDS.observe(elapsed, endpoint=endpoint)
+    
+    if request.path.startswith('/api/'):
+        response.headers['Server-Timing'] = metrics.server_timing_header(elapsed)
+    
+    return response
+
+
+def is_admin_request():
+    """관리자 토큰 검증 (ADMIN_TOKEN 미설정 시 관리자 기능 비활성화)"""
+    admin_token = app.config['ADMIN_TOKEN']
+    provided = request.headers.get('X-Admin-Token', '')
+    return bool(admin_token) and hmac.compare_digest(provided, admin_token)
+
+
+def admitted(work_class):
+    """
+    요청 수락 제어 데코레이터
+    
+    한도를 넘으면 처리하지 않고 즉시 429(대기열 가득 참) 또는 503(대기 시간 초과)과
+    Retry-After 헤더를 반환합니다.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                with admission.admit(work_class):
+                    return func(*args, **kwargs)
+            except AdmissionRejected as e:
+                logger.warning(f"요청 거절 ({e.work_class}, {e.reason}), Retry-After {e.retry_after}초")
+                response = jsonify({
+                    'error': '요청이 많아 지금은 처리할 수 없습니다. 잠시 후 다시 시도해주세요.',
+                    'reason': e.reason,
+                    'retry_after': e.retry_after
+                })
+                response.status_code = e.status
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response
+        return wrapper
+    return decorator
+
+
+def profiled(name):
+    """
+    요청 단위 프로파일링 데코레이터
+    
+    PROFILING_ENABLED 설정이 켜져 있고 요청에 `X-Profile: 1` 헤더나
+    `?profile=1` 쿼리 파라미터가 있을 때만 cProfile로 감싸 실행합니다.
+    프로파일링은 요청을 느리게 하고 디스크에 기록하므로 관리자 토큰(X-Admin-Token)이 맞는 요청만 허용합니다.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not (has_request_context() and app.config['PROFILING_ENABLED']):
+                return func(*args, **kwargs)
+            
+            flag = request.headers.get('X-Profile') or request.args.get('profile')
+            if flag not in ('1', 'true') or not is_admin_request():
+                return func(*args, **kwargs)
+            
+            result, profile_id = profile_store.run(name, func, *args, **kwargs)
+            response = app.make_response(result)
+            if profile_id:
+                logger.info(f"프로파일 저장됨: {profile_id}")
+                response.headers['X-Profile-Id'] = profile_id
+            return response
+        return wrapper
+    return decorator
 
 
 def allowed_file(filename):
@@ -59,10 +296,9 @@ def index():
 
 
 @app.route('/api/upload', methods=['POST'])
+@admitted('ingest')
 def upload_pdf():
     """PDF 파일 업로드 및 처리"""
-    global rag_engine, current_pdf_path, pdf_processor
-    
     if 'file' not in request.files:
         return jsonify({'error': '파일이 없습니다.'}), 400
     
@@ -72,15 +308,20 @@ def upload_pdf():
         return jsonify({'error': '파일이 선택되지 않았습니다.'}), 400
     
     if file and allowed_file(file.filename):
+        # 디스크 예산 확인 (필요하면 오래된 페이지 이미지/인덱스를 먼저 비움)
+        if not enforce_storage_budget(required_bytes=request.content_length or 0):
+            return jsonify({'error': '저장 공간이 부족합니다. 관리자에게 문의하세요.'}), 507
+        
         # 파일 저장
         filename = secure_filename(file.filename)
         os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        # 같은 이름의 문서를 덮어쓰면 이전 내용으로 로드된 엔진/프로세서를 버림
+        unload_document(filepath)
         file.save(filepath)
         
         try:
             # PDF 처리 및 RAG 엔진 초기화
-            current_pdf_path = filepath
             return process_pdf(filepath)
             
         except Exception as e:
@@ -90,10 +331,9 @@ def upload_pdf():
 
 
 @app.route('/api/load-pdf', methods=['POST'])
+@admitted('ingest')
 def load_existing_pdf():
     """기존 업로드된 PDF 로드"""
-    global current_pdf_path
-    
     try:
         data = request.json
         filename = data.get('filename')
@@ -114,7 +354,6 @@ def load_existing_pdf():
             return jsonify({'error': '파일을 찾을 수 없습니다.'}), 404
         
         logger.info(f"파일 확인 완료, 처리 시작...")
-        current_pdf_path = filepath
         return process_pdf(filepath)
         
     except Exception as e:
@@ -128,9 +367,10 @@ def load_existing_pdf():
         }), 500
 
 
+@profiled('process_pdf')
 def process_pdf(filepath):
     """PDF 파일 처리 및 벡터 스토어 구축"""
-    global rag_engine, pdf_processor
+    global active_document
     
     try:
         # OpenAI API 키 확인
@@ -141,34 +381,35 @@ def process_pdf(filepath):
         
         logger.info(f"PDF 처리 시작: {filepath}")
         
-        # PDF 처리
-        pdf_processor = PDFProcessor(filepath)
-        logger.info(f"PDF 로드 완료 - 총 {pdf_processor.total_pages}페이지")
+        started_at = time.perf_counter()
         
-        chunks = pdf_processor.create_chunks_with_metadata(
-            chunk_size=1000,
-            chunk_overlap=200
+        # 이미 로드된 문서면 재사용, 아니면 저장된 인덱스를 로드하거나 구축 후 저장
+        logger.info("벡터 스토어 준비 중... (새로 구축하는 경우 시간이 걸릴 수 있습니다)")
+        engine, processor, index_info = open_document(filepath, api_key)
+        logger.info(
+            f"벡터 스토어 준비 완료 ({index_info['status']}) - 총 {processor.total_pages}페이지, "
+            f"{index_info['total_chunks']}개 청크 ({_elapsed_ms(started_at)})"
         )
-        logger.info(f"청크 생성 완료 - 총 {len(chunks)}개")
-        
-        # RAG 엔진 초기화 및 벡터 스토어 구축
-        logger.info("RAG 엔진 초기화 중...")
-        rag_engine = RAGEngine(api_key)
         
-        logger.info("벡터 스토어 구축 중... (시간이 걸릴 수 있습니다)")
-        rag_engine.build_vector_store(chunks)
+        # 준비가 끝난 뒤에 엔진/프로세서/경로를 한 번에 교체 (처리 중에도 이전 문서로 질의 가능)
+        previous = active_document
+        active_document = ActiveDocument(engine, processor, filepath)
+        if previous is not None:
+            release_document(previous.path, previous.engine)
         
-        # 벡터 스토어 저장 (선택적)
-        logger.info("벡터 스토어 저장 중...")
-        rag_engine.save_vector_store()
+        # 새 인덱스/사이드카로 예산을 넘었으면 오래 사용하지 않은 문서의 산출물 정리
+        enforce_storage_budget()
         
-        logger.info("모든 처리가 완료되었습니다!")
+        logger.info(f"모든 처리가 완료되었습니다! (총 {_elapsed_ms(started_at)})")
         
         return jsonify({
             'message': 'PDF 처리가 완료되었습니다.',
             'filename': os.path.basename(filepath),
-            'total_pages': pdf_processor.total_pages,
-            'total_chunks': len(chunks)
+            'total_pages': processor.total_pages,
+            'total_chunks': index_info['total_chunks'],
+            'index_status': index_info['status'],
+            'resumed_batches': index_info.get('resumed_batches', 0),
+            'fresh_batches': index_info.get('fresh_batches', 0)
         })
         
     except Exception as e:
@@ -182,12 +423,185 @@ def process_pdf(filepath):
         }), 500
 
 
+def index_root_for(engine_class):
+    """설정된 인덱스 루트 (미설정 시 엔진별 기본 저장 경로)"""
+    return app.config['INDEX_ROOT'] or engine_class.DEFAULT_STORE_PATH
+
+
+def open_document(filepath, api_key, allow_build=True):
+    """
+    문서의 RAG 엔진과 PDFProcessor 준비 (캐시에 있으면 재사용)
+    
+    Args:
+        filepath: PDF 파일 경로
+        api_key: OpenAI API 키
+        allow_build: False면 저장된 인덱스가 없을 때 구축하지 않음 (예열용)
+        
+    Returns:
+        Tuple: (RAG 엔진, PDFProcessor, 인덱스 정보)
+    """
+    key = os.path.abspath(filepath)
+    engine_class = get_engine_class()
+    index_root = index_root_for(engine_class)
+    
+    with loaded_documents_lock:
+        cached = loaded_documents.get(key)
+        if cached is not None and cached[1].is_stale():
+            # 같은 경로의 PDF가 바뀜 (덮어쓴 업로드 등): 이전 인덱스로 답하지 않도록 다시 로드
+            logger.info(f"파일이 바뀌어 문서를 다시 로드합니다: {filepath}")
+            del loaded_documents[key]
+            stale, cached = cached, None
+        else:
+            stale = None
+        if cached is not None:
+            loaded_documents.move_to_end(key)
+    metrics.record_cache('document', cached is not None)
+    if stale is not None:
+        stale[1].close()
+        release_document(key, stale[0])
+    
+    if cached is not None:
+        engine, processor = cached
+        index_info = {'status': 'cached', 'total_chunks': len(engine.chunks_metadata)}
+    else:
+        with stage_timer('pdf_open'):
+            processor = PDFProcessor(filepath)
+        
+        with stage_timer('engine_init'):
+            engine = engine_class(api_key)
+        
+        try:
+            index_info = index_store.load_or_build_index(
+                processor,
+                engine,
+                index_root=index_root,
+                chunk_size=app.config['CHUNK_SIZE'],
+                chunk_overlap=app.config['CHUNK_OVERLAP'],
+                allow_build=allow_build
+            )
+        except Exception:
+            processor.close()
+            raise
+        
+        with loaded_documents_lock:
+            loaded_documents[key] = (engine, processor)
+            loaded_documents.move_to_end(key)
+            evicted = []
+            while len(loaded_documents) > max(1, app.config['DOCUMENT_CACHE_SIZE']):
+                evicted.append(loaded_documents.popitem(last=False))
+        
+        # 핸들 풀에 반납 (사용 중인 핸들은 풀이 유지하며, 다시 접근하면 자동으로 열림)
+        for evicted_key, (evicted_engine, evicted_processor) in evicted:
+            evicted_processor.close()
+            release_document(evicted_key, evicted_engine)
+    
+    try:
+        index_store.record_usage(index_root, filepath)
+    except OSError as e:
+        logger.warning(f"문서 사용 기록 저장 실패: {e}")
+    
+    return engine, processor, index_info
+
+
+def unload_document(filepath):
+    """캐시에서 문서를 내림 (파일을 덮어쓰거나 인덱스를 교체할 때)"""
+    key = os.path.abspath(filepath)
+    with loaded_documents_lock:
+        unloaded = loaded_documents.pop(key, None)
+    with preview_processors_lock:
+        preview = preview_processors.pop(key, None)
+    if preview is not None:
+        preview.close()
+    if unloaded is not None:
+        unloaded[1].close()
+        release_document(key, unloaded[0])
+
+
+def release_document(filepath, engine):
+    """
+    메모리에서 내린 문서의 인덱스 지표(source 라벨) 제거
+    
+    현재 문서이거나 아직 캐시에 남아 있으면 그대로 둡니다.
+    """
+    key = os.path.abspath(filepath)
+    document = active_document
+    if document is not None and os.path.abspath(document.path) == key:
+        return
+    with loaded_documents_lock:
+        if key in loaded_documents:
+            return
+    engine.clear_index_metrics()
+
+
+def warm_up():
+    """
+    최근/자주 사용한 문서의 인덱스와 PDF를 미리 로드 (워커 시작 시 1회)
+    
+    저장된 인덱스가 있는 문서만 로드하며, 인덱스를 새로 구축하지는 않습니다.
+    """
+    started_at = time.perf_counter()
+    warmup_state['status'] = 'warming'
+    
+    try:
+        api_key = os.getenv('OPENAI_API_KEY')
+        limit = app.config['WARMUP_DOCUMENTS']
+        if not api_key or limit <= 0:
+            logger.info("예열 건너뜀 (API 키 없음 또는 WARMUP_DOCUMENTS=0)")
+        else:
+            engine_class = get_engine_class()
+            candidates = index_store.most_used_documents(
+                index_root_for(engine_class),
+                min(limit, app.config['DOCUMENT_CACHE_SIZE']),
+                strategy=app.config['WARMUP_STRATEGY']
+            )
+            # 가장 많이 쓰인 문서가 캐시에서 마지막까지 남도록 역순으로 로드
+            for entry in reversed(candidates):
+                filepath = os.path.join(app.config['UPLOAD_FOLDER'], entry['source'])
+                if not os.path.exists(filepath):
+                    continue
+                try:
+                    open_document(filepath, api_key, allow_build=False)
+                    warmup_state['documents'].append(entry['source'])
+                except Exception as e:
+                    logger.warning(f"예열 실패 ({entry['source']}): {e}")
+        
+        warmup_state['status'] = 'ready'
+    except Exception as e:
+        logger.error(f"예열 중 오류 발생: {e}")
+        warmup_state['status'] = 'failed'
+        warmup_state['error'] = str(e)
+    
+    warmup_state['elapsed'] = round(time.perf_counter() - started_at, 3)
+    logger.info(
+        f"예열 완료 - 문서 {len(warmup_state['documents'])}개 "
+        f"({warmup_state['elapsed'] * 1000:.0f}ms, 상태: {warmup_state['status']})"
+    )
+
+
+def start_warmup():
+    """백그라운드 스레드로 예열 시작 (프로세스당 1회, gunicorn post_worker_init 훅 또는 첫 /readyz 요청에서 호출)"""
+    global _warmup_thread
+    
+    if _warmup_thread is None:
+        _warmup_thread = threading.Thread(target=warm_up, name='warmup', daemon=True)
+        _warmup_thread.start()
+    return _warmup_thread
+
+
+def _elapsed_ms(started_at):
+    """시작 시점부터의 경과 시간 문자열"""
+    return f"{(time.perf_counter() - started_at) * 1000:.0f}ms"
+
+
 @app.route('/api/query', methods=['POST'])
+@admitted('query')
+@profiled('query')
 def query():
     """사용자 질문에 대한 답변 생성"""
-    global rag_engine, pdf_processor
+    # 요청 동안 같은 문서 조합을 쓰도록 한 번만 읽음 (도중에 문서가 바뀌어도 섞이지 않음)
+    document = active_document
     
-    if rag_engine is None:
+    if document is None:
         return jsonify({'error': 'PDF를 먼저 업로드해주세요.'}), 400
     
     data = request.json
@@ -196,60 +610,224 @@ def query():
     if not question:
         return jsonify({'error': '질문을 입력해주세요.'}), 400
     
+    if not valid_k(data.get('k')):
+        return jsonify({'error': 'k는 1에서 20 사이의 정수여야 합니다.'}), 400
+    
+    session_id = data.get('session_id')
+    if session_id is not None and not (isinstance(session_id, str) and 0 < len(session_id) <= 128):
+        return jsonify({'error': 'session_id는 128자 이하의 문자열이어야 합니다.'}), 400
+    
+    client_render = data.get('client_render', False)
+    if not isinstance(client_render, bool):
+        return jsonify({'error': 'client_render는 true 또는 false여야 합니다.'}), 400
+    client_render = client_render and app.config['CLIENT_RENDER_ENABLED']
+    
     try:
         # RAG 파이프라인 실행
-        result = rag_engine.query(
-            question=question,
-            k=3  # 상위 3개 청크 검색
-        )
+        # k를 지정하지 않으면 검색 점수 분포로 k를, 질문 유형으로 생성 한도를 결정
+        engine = document.engine
+        k = data.get('k')
         
-        # 참조 페이지 이미지 생성
-        page_images = []
-        for page_num in result['referenced_pages']:
-            try:
-                image_path = pdf_processor.render_page_as_image(page_num)
-                # 웹 경로로 변환
-                web_path = image_path.replace('\\', '/')
-                page_images.append({
-                    'page_number': page_num,
-                    'image_url': f'/{web_path}'
-                })
-            except Exception as e:
-                print(f"페이지 {page_num} 이미지 생성 실패: {e}")
+        # 같은 문서에 대한 동일한 질문이 동시에 들어오면 검색/LLM 호출을 한 번만 수행
+        flight_key = (document.path, normalize_question(question), k or 'adaptive')
         
-        # 응답 구성 (카테고리별 분리)
-        response = {
-            'question': question,
-            'answer': result['answer'],
-            'categories': {
-                'overview': extract_section(result['answer'], '개요'),
-                'steps': extract_section(result['answer'], '단계별 설명'),
-                'notes': extract_section(result['answer'], '참고사항')
-            },
-            'references': {
-                'pages': result['referenced_pages'],
-                'page_images': page_images,
-                'source_chunks': [
-                    {
-                        'text': chunk['text'][:200] + '...' if len(chunk['text']) > 200 else chunk['text'],
-                        'page_number': chunk['page_number'],
-                        'similarity_score': chunk['similarity_score']
-                    }
-                    for chunk in result['source_chunks']
-                ]
-            },
-            'metadata': {
-                'model': result['model'],
-                'total_tokens': result['total_tokens']
-            }
-        }
+        if session_id:
+            # 대화 모드: 세션 기록을 함께 보내고, 같은 페이지에 머무는 후속 질문은 이전 검색 결과 재사용
+            conversation = conversations.get(session_id, document.path)
+            with conversation.lock:
+                history = conversation.history()
+                previous_results = conversation.reusable_results(question)
+                if history or previous_results is not None:
+                    result = engine.query_with_history(
+                        question=question,
+                        history=history,
+                        previous_results=previous_results,
+                        k=k or 3,
+                        adaptive=k is None
+                    )
+                    coalesced = False
+                else:
+                    # 첫 질문은 세션 기록과 무관하므로 다른 세션의 같은 첫 질문과 합침
+                    # (후속 질문의 프롬프트 캐시를 위해 대화 모드 메시지 구성은 유지)
+                    result, coalesced = query_flights.do(
+                        flight_key + ('conversation',),
+                        lambda: engine.query_with_history(
+                            question=question, history=[], k=k or 3, adaptive=k is None
+                        )
+                    )
+                conversation.record(question, result['answer'], result['source_chunks'])
+        else:
+            result, coalesced = query_flights.do(
+                flight_key,
+                lambda: engine.query(question=question, k=k or 3, adaptive=k is None)
+            )
         
+        response = build_query_response(question, result, document.processor, client_render=client_render)
+        response['metadata']['coalesced'] = coalesced
+        if session_id:
+            response['metadata']['session_id'] = session_id
+            response['metadata']['reused_retrieval'] = result['retrieval']['reused']
         return jsonify(response)
         
     except Exception as e:
         return jsonify({'error': f'질의 처리 중 오류 발생: {str(e)}'}), 500
 
 
+@app.route('/api/query/batch', methods=['POST'])
+@admitted('ingest')
+def query_batch():
+    """
+    여러 질문을 한 번에 처리 (평가/FAQ 생성 등 일괄 작업용)
+    
+    질문 임베딩은 한 번의 배치 호출, FAISS 검색은 한 번의 행렬 검색으로 수행하고
+    답변 생성은 제한된 동시성으로 병렬 실행합니다. 결과는 입력 순서를 유지합니다.
+    대량 작업이므로 수락 제어에서는 인덱싱과 같은 낮은 우선순위로 처리합니다.
+    """
+    document = active_document
+    
+    if document is None:
+        return jsonify({'error': 'PDF를 먼저 업로드해주세요.'}), 400
+    
+    data = request.json or {}
+    questions = data.get('questions')
+    
+    if not isinstance(questions, list) or not questions:
+        return jsonify({'error': 'questions 배열을 입력해주세요.'}), 400
+    
+    if len(questions) > app.config['BATCH_QUERY_MAX']:
+        return jsonify({'error': f"한 번에 최대 {app.config['BATCH_QUERY_MAX']}개의 질문까지 처리할 수 있습니다."}), 400
+    
+    questions = [str(q).strip() for q in questions]
+    if not all(questions):
+        return jsonify({'error': '빈 질문이 포함되어 있습니다.'}), 400
+    
+    if not valid_k(data.get('k')):
+        return jsonify({'error': 'k는 1에서 20 사이의 정수여야 합니다.'}), 400
+    
+    try:
+        k = data.get('k')
+        results = document.engine.query_batch(
+            questions=questions,
+            k=k or 3,
+            max_workers=app.config['BATCH_QUERY_CONCURRENCY'],
+            adaptive=k is None
+        )
+        
+        responses = []
+        for question, result in zip(questions, results):
+            if 'error' in result:
+                responses.append({'question': question, 'error': result['error']})
+            else:
+                responses.append(build_query_response(question, result, document.processor))
+        
+        return jsonify({
+            'count': len(responses),
+            'failed': sum(1 for r in responses if 'error' in r),
+            'results': responses,
+            'metadata': {
+                'total_tokens': sum(r['metadata']['total_tokens'] for r in responses if 'error' not in r)
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({'error': f'일괄 질의 처리 중 오류 발생: {str(e)}'}), 500
+
+
+def valid_k(k):
+    """검색 개수 파라미터 검증 (None은 적응형)"""
+    return k is None or (isinstance(k, int) and not isinstance(k, bool) and 1 <= k <= 20)
+
+
+def page_image_entry(processor, page_num, client_render=False):
+    """
+    참조 페이지의 점진적 미리보기 정보 (자리표시자 + 크기별 이미지 URL)
+    
+    이미지는 응답 시점에 렌더링하지 않고, 브라우저가 화면에 보일 때
+    /api/page-image에서 필요한 해상도만 요청합니다.
+    client_render이면 서버에서 아무것도 래스터화하지 않고 원본 PDF 주소(pdf_url)를 함께 돌려주어
+    브라우저가 필요한 바이트 범위만 받아 직접 렌더링합니다.
+    """
+    filename = os.path.basename(processor.pdf_path)
+    version = int(os.path.getmtime(processor.pdf_path))
+    urls = {
+        size: f"/api/page-image/{quote(filename)}/{page_num}?size={size}&v={version}"
+        for size in PAGE_IMAGE_DPI
+    }
+    
+    if client_render:
+        width, height = processor.get_page_size(page_num)
+        return {
+            'page_number': page_num,
+            'pdf_url': f"/api/pdf/{quote(filename)}?v={version}",
+            'image_url': urls['full'],
+            'width': round(width),
+            'height': round(height)
+        }
+    
+    preview = processor.page_preview(page_num)
+    return {
+        'page_number': page_num,
+        'placeholder': preview['placeholder'],
+        'thumbnail_url': urls['thumb'],
+        'image_url': urls['full'],
+        'srcset': ', '.join(f"{urls[size]} {width}w" for size, width in preview['widths'].items()),
+        'width': preview['width'],
+        'height': preview['height']
+    }
+
+
+def build_query_response(question, result, processor, client_render=False):
+    """RAG 결과를 API 응답 형식으로 변환 (참조 페이지 미리보기 포함, processor는 질의한 문서의 PDFProcessor)"""
+    # 참조 페이지 미리보기 (전체 해상도 이미지는 필요할 때 지연 로드)
+    page_images = []
+    for page_num in result['referenced_pages']:
+        try:
+            page_images.append(page_image_entry(processor, page_num, client_render))
+        except Exception as e:
+            print(f"페이지 {page_num} 미리보기 생성 실패: {e}")
+    
+    # 답변 카테고리 분리
+    with stage_timer('extract_section'):
+        categories = {
+            'overview': extract_section(result['answer'], '개요'),
+            'steps': extract_section(result['answer'], '단계별 설명'),
+            'notes': extract_section(result['answer'], '참고사항')
+        }
+    
+    # 응답 구성 (카테고리별 분리)
+    return {
+        'question': question,
+        'answer': result['answer'],
+        'categories': categories,
+        'references': {
+            'pages': result['referenced_pages'],
+            'page_images': page_images,
+            'source_chunks': [
+                {
+                    'text': chunk['text'][:200] + '...' if len(chunk['text']) > 200 else chunk['text'],
+                    'page_number': chunk['page_number'],
+                    'pages': chunk.get('pages', [chunk['page_number']]),
+                    'similarity_score': chunk['similarity_score']
+                }
+                for chunk in result['source_chunks']
+            ]
+        },
+        'metadata': {
+            'model': result['model'],
+            'total_tokens': result['total_tokens'],
+            'prompt_tokens': result.get('prompt_tokens'),
+            'completion_tokens': result.get('completion_tokens'),
+            'cached_tokens': result.get('cached_tokens'),
+            'retrieval_k': result['retrieval']['k'],
+            'adaptive': result['retrieval']['adaptive'],
+            'question_type': result['generation'].get('question_type'),
+            'max_tokens': result['generation']['max_tokens'],
+            'temperature': result['generation']['temperature'],
+            'client_render': client_render
+        }
+    }
+
+
 def extract_section(text, section_name):
     """답변에서 특정 섹션 추출"""
     lines = text.split('\n')
@@ -271,18 +849,297 @@ def extract_section(text, section_name):
 @app.route('/api/pdf-info', methods=['GET'])
 def pdf_info():
     """현재 로드된 PDF 정보 반환"""
-    global current_pdf_path, pdf_processor
+    document = active_document
     
-    if not current_pdf_path or not pdf_processor:
+    if document is None:
         return jsonify({'error': 'PDF가 로드되지 않았습니다.'}), 400
     
     return jsonify({
-        'filename': os.path.basename(current_pdf_path),
-        'total_pages': pdf_processor.total_pages,
-        'path': current_pdf_path
+        'filename': os.path.basename(document.path),
+        'total_pages': document.processor.total_pages,
+        'path': document.path
     })
 
 
+@app.route('/api/admin/profiles', methods=['GET'])
+def list_profiles():
+    """최근 프로파일 목록 (관리자 전용)"""
+    if not is_admin_request():
+        return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
+    
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify({
+        'enabled': app.config['PROFILING_ENABLED'],
+        'profiles': profile_store.list_recent(limit)
+    })
+
+
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    """프로파일 파일 다운로드 (?format=txt 로 요약 조회, 관리자 전용)"""
+    if not is_admin_request():
+        return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
+    
+    kind = request.args.get('format', 'prof')
+    path = profile_store.path_for(profile_id, kind)
+    if path is None:
+        return jsonify({'error': '프로파일을 찾을 수 없습니다.'}), 404
+    
+    return send_from_directory(
+        os.path.abspath(profile_store.directory),
+        os.path.basename(path),
+        mimetype='text/plain' if kind == 'txt' else 'application/octet-stream',
+        as_attachment=(kind == 'prof')
+    )
+
+
+@app.route('/api/admin/bundles/<filename>', methods=['GET'])
+def export_index_bundle(filename):
+    """문서 인덱스 번들 다운로드 (?include_pdf=1 로 원본 PDF 포함, 관리자 전용)"""
+    if not is_admin_request():
+        return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
+
+    filepath = uploaded_pdf_path(filename)
+    if filepath is None:
+        return jsonify({'error': '파일을 찾을 수 없습니다.'}), 404
+
+    fd, bundle_path = tempfile.mkstemp(suffix='.bundle.tar.gz')
+    os.close(fd)
+    try:
+        index_bundle.export_bundle(
+            filepath,
+            index_root_for(get_engine_class()),
+            bundle_path,
+            include_pdf=request.args.get('include_pdf') in ('1', 'true')
+        )
+    except FileNotFoundError:
+        os.remove(bundle_path)
+        return jsonify({'error': '저장된 인덱스가 없습니다. 먼저 PDF를 로드하세요.'}), 404
+    except index_bundle.BundleError as e:
+        os.remove(bundle_path)
+        return jsonify({'error': str(e)}), 409
+
+    def stream_and_remove():
+        # 전송이 끝나거나 연결이 끊기면 임시 번들 삭제
+        try:
+            with open(bundle_path, 'rb') as f:
+                for block in iter(lambda: f.read(64 * 1024), b''):
+                    yield block
+        finally:
+            os.remove(bundle_path)
+
+    download_name = f"{index_store.document_id(filepath)}.bundle.tar.gz"
+    return Response(
+        stream_and_remove(),
+        mimetype='application/gzip',
+        headers={
+            'Content-Disposition': f'attachment; filename="{download_name}"',
+            'Content-Length': str(os.path.getsize(bundle_path))
+        }
+    )
+
+
+@app.route('/api/admin/bundles', methods=['POST'])
+@admitted('ingest')
+def import_index_bundle():
+    """인덱스 번들 설치 (multipart 'bundle', ?overwrite_pdf=1, 관리자 전용)"""
+    global active_document
+    
+    if not is_admin_request():
+        return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
+
+    if 'bundle' not in request.files:
+        return jsonify({'error': '번들 파일이 없습니다.'}), 400
+
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        return jsonify({'error': 'OpenAI API 키가 설정되지 않았습니다.'}), 500
+
+    engine_class = get_engine_class()
+    fd, bundle_path = tempfile.mkstemp(suffix='.bundle.tar.gz')
+    os.close(fd)
+    try:
+        request.files['bundle'].save(bundle_path)
+        result = index_bundle.import_bundle(
+            bundle_path,
+            index_root_for(engine_class),
+            upload_dir=app.config['UPLOAD_FOLDER'],
+            expected_model=engine_class(api_key).embedding_model_id(),
+            overwrite_pdf=request.args.get('overwrite_pdf') in ('1', 'true')
+        )
+    except index_bundle.BundleError as e:
+        return jsonify({'error': f'번들을 설치할 수 없습니다: {e}'}), 400
+    finally:
+        os.remove(bundle_path)
+
+    # 이전 인덱스로 열린 문서는 다음 요청 때 새 인덱스로 다시 로드
+    if result['pdf_path'] is not None:
+        key = os.path.abspath(result['pdf_path'])
+        unload_document(key)
+        
+        # 현재 질의 중인 문서면 새 인덱스로 바로 교체
+        document = active_document
+        if document is not None and os.path.abspath(document.path) == key:
+            try:
+                engine, processor, _ = open_document(document.path, api_key)
+                active_document = ActiveDocument(engine, processor, document.path)
+            except Exception as e:
+                logger.warning(f"설치한 인덱스로 현재 문서를 다시 열지 못했습니다: {e}")
+
+    logger.info(f"인덱스 번들 설치: {result['source']} ({result['total_chunks']}개 청크)")
+    return jsonify({
+        'success': True,
+        'filename': result['source'],
+        'total_chunks': result['total_chunks'],
+        'embedding_model': result['embedding_model'],
+        'pdf_installed': result['pdf_path'] is not None
+    })
+
+
+@app.route('/api/admin/storage', methods=['GET'])
+def storage_stats():
+    """문서별/산출물 종류별 디스크 사용량 (관리자 전용)"""
+    if not is_admin_request():
+        return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
+    
+    return jsonify(get_storage_manager().stats())
+
+
+@app.route('/api/admin/storage/enforce', methods=['POST'])
+def enforce_storage():
+    """고아 산출물 정리 및 디스크 예산 적용 (?dry_run=1 로 대상만 조회, 관리자 전용)"""
+    if not is_admin_request():
+        return jsonify({'error': '관리자 권한이 필요합니다.'}), 403
+    
+    storage = get_storage_manager()
+    dry_run = request.args.get('dry_run') in ('1', 'true')
+    if not storage.budget_bytes:
+        return jsonify({'enabled': False, 'collected': storage.collect_garbage(dry_run=dry_run), 'evicted': []})
+    return jsonify(storage.enforce(protected=loaded_document_ids(), dry_run=dry_run))
+
+
+def uploaded_pdf_path(filename):
+    """업로드 폴더 안의 PDF 경로 (잘못된 파일명이거나 없으면 None)"""
+    if secure_filename(filename) != filename:
+        return None
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    return filepath if os.path.isfile(filepath) else None
+
+
+def processor_for(filepath):
+    """
+    이미 열린 문서의 PDFProcessor 재사용 (핸들은 풀에서 공유)
+    
+    로드하지 않은 문서는 페이지 이미지용 캐시(DOCUMENT_CACHE_SIZE개, LRU)에 두고,
+    파일이 바뀌었거나 캐시에서 밀려난 프로세서는 닫습니다.
+    """
+    key = os.path.abspath(filepath)
+    document = active_document
+    if document is not None and os.path.abspath(document.path) == key and not document.processor.is_stale():
+        return document.processor
+    with loaded_documents_lock:
+        cached = loaded_documents.get(key)
+    if cached is not None and not cached[1].is_stale():
+        return cached[1]
+    
+    with preview_processors_lock:
+        processor = preview_processors.get(key)
+        if processor is not None and not processor.is_stale():
+            preview_processors.move_to_end(key)
+            return processor
+        closing = [preview_processors.pop(key)] if processor is not None else []
+        processor = PDFProcessor(filepath)
+        preview_processors[key] = processor
+        while len(preview_processors) > max(1, app.config['DOCUMENT_CACHE_SIZE']):
+            closing.append(preview_processors.popitem(last=False)[1])
+    for old_processor in closing:
+        old_processor.close()
+    return processor
+
+
+@app.route('/api/page-image/<filename>/<int:page_number>', methods=['GET'])
+def page_image(filename, page_number):
+    """
+    페이지 이미지 (?size=thumb|medium|full, 기본값 full)
+    
+    URL의 v(PDF 수정 시각)가 바뀌면 새 주소가 되므로 브라우저가 오래 캐시할 수 있습니다.
+    """
+    size = request.args.get('size', 'full')
+    if size not in PAGE_IMAGE_DPI:
+        return jsonify({'error': f"size는 {', '.join(PAGE_IMAGE_DPI)} 중 하나여야 합니다."}), 400
+    
+    filepath = uploaded_pdf_path(filename)
+    if filepath is None:
+        return jsonify({'error': '파일을 찾을 수 없습니다.'}), 404
+    
+    try:
+        image_path = processor_for(filepath).render_page_as_image(page_number, dpi=PAGE_IMAGE_DPI[size])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    enforce_storage_budget()
+    
+    response = send_from_directory(
+        os.path.abspath(os.path.dirname(image_path)),
+        os.path.basename(image_path),
+        mimetype='image/png'
+    )
+    if request.args.get('v'):
+        response.headers['Cache-Control'] = 'public, max-age=2592000, immutable'
+    return response
+
+
+@app.route('/api/pdf/<filename>', methods=['GET'])
+def serve_pdf(filename):
+    """
+    원본 PDF 제공 (브라우저 렌더링용)
+    
+    Range 요청(206), ETag/Last-Modified 조건부 요청(304)을 지원하므로
+    PDF.js 뷰어가 필요한 페이지의 바이트 범위만 받아갑니다.
+    URL에 v(PDF 수정 시각)가 있으면 내용이 바뀌지 않으므로 오래 캐시합니다.
+    """
+    filepath = uploaded_pdf_path(filename)
+    if filepath is None:
+        return jsonify({'error': '파일을 찾을 수 없습니다.'}), 404
+    
+    response = send_from_directory(
+        os.path.abspath(app.config['UPLOAD_FOLDER']),
+        filename,
+        mimetype='application/pdf',
+        conditional=True,
+        etag=True
+    )
+    response.headers['Accept-Ranges'] = 'bytes'
+    if request.args.get('v'):
+        response.headers['Cache-Control'] = 'public, max-age=2592000, immutable'
+    else:
+        response.headers['Cache-Control'] = f"public, max-age={app.config['PDF_CACHE_MAX_AGE']}, must-revalidate"
+    return response
+
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """생존 확인 (프로세스가 요청을 처리할 수 있으면 200)"""
+    return jsonify({'status': 'ok'})
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """준비 상태 확인 (예열이 끝나기 전에는 503)"""
+    # gunicorn 훅 없이 실행된 경우(예: gunicorn app:app, 다른 WSGI 서버) 첫 확인 요청에서 예열 시작
+    start_warmup()
+    ready = warmup_state['status'] in ('ready', 'failed')
+    with loaded_documents_lock:
+        documents = len(loaded_documents)
+    body = dict(warmup_state, ready=ready, loaded_documents=documents)
+    return jsonify(body), 200 if ready else 503
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus 텍스트 포맷 지표"""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
 @app.route('/static/<path:filename>')
 def serve_static(filename):
     """정적 파일 제공"""
@@ -298,7 +1155,7 @@ def request_entity_too_large(error):
 if __name__ == '__main__':
     # 필요한 디렉토리 생성
     os.makedirs('uploads', exist_ok=True)
-    os.makedirs('static/page_images', exist_ok=True)
+    os.makedirs(PAGE_IMAGE_DIR, exist_ok=True)
     os.makedirs('vector_store', exist_ok=True)
     
     # 포트 설정 (Render는 PORT 환경변수 사용)
@@ -310,6 +1167,9 @@ if __name__ == '__main__':
     if is_production:
         logger.info(f"프로덕션 모드로 실행 중 (포트: {port})")
     
+    # 최근 사용 문서 예열 (gunicorn에서는 gunicorn.conf.py 훅에서 시작)
+    start_warmup()
+    
     # Flask 앱 실행
     app.run(
         debug=not is_production,
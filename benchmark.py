@@ -0,0 +1,569 @@
+"""
+오프라인 성능 벤치마크 스크립트
+- fitz로 합성 PDF 생성 (페이지 수/분량 조절 가능)
+- 결정적(deterministic) 스텁 임베딩 및 스텁 LLM 사용 (네트워크 불필요)
+- 단계별 시간 측정: 추출, 청킹, 임베딩, 인덱스 구축, 저장/로드, 검색,
+  페이지 렌더링, /api/query 전체
+- 검색 경로 비교: LangChain 래퍼 vs FAISS 직접 검색 vs NumPy 정확 검색 (같은 질의 벡터)
+- 결과를 JSON으로 저장하고 기준선(baseline) 대비 회귀 검사
+
+- 시작 시간 벤치마크: 모듈별 임포트 비용 측정 (--startup)
+- 차원 축소 평가: 축소 차원별 인덱스 크기, 검색 지연, 전체 차원 대비 top-k 겹침 (--reduce-dims)
+
+사용 예:
+    python benchmark.py --pages 100 --output bench.json
+    python benchmark.py --baseline bench.json --tolerance 0.25
+    python benchmark.py --startup --output startup.json
+    python benchmark.py --reduce-dims 32,64,128 --dimensions 384 --output dims.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import hashlib
+import argparse
+import platform
+import statistics
+import tempfile
+import subprocess
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+import fitz  # PyMuPDF
+from langchain_core.embeddings import Embeddings
+
+
+WORDS = (
+    "install cable router switch power adapter firmware port network module "
+    "bracket screw panel sensor configure reset connect verify indicator LED "
+    "voltage ground mount wall rack device manual warning caution step check "
+    "signal antenna channel password admin console default update backup"
+).split()
+
+STARTUP_MODULES = [
+    'app', 'pdf_processor', 'rag_engine', 'rag_engine_free',
+    'flask', 'fitz', 'openai', 'langchain_openai',
+    'langchain_community.vectorstores', 'faiss', 'numpy', 'torch'
+]
+
+SAMPLE_QUESTIONS = [
+    "How do I install the router on the wall?",
+    "What should I check before connecting the power adapter?",
+    "How do I reset the device to default settings?",
+    "Which port is used for the network cable?",
+    "How do I update the firmware?",
+]
+
+
+class StubEmbeddings(Embeddings):
+    """해시 기반 결정적 스텁 임베딩 (네트워크 없이 동작)"""
+
+    def __init__(self, dimensions: int = 256):
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for token in text.lower().split():
+            digest = hashlib.md5(token.encode('utf-8')).digest()
+            index = int.from_bytes(digest[:4], 'little') % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class StubChatClient:
+    """OpenAI 클라이언트의 chat.completions.create 를 흉내내는 스텁 LLM"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str, messages: List[Dict], **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+
+        prompt_tokens = sum(len(m['content'].split()) for m in messages)
+        answer = (
+            "**개요**\n스텁 답변입니다.\n\n"
+            "**단계별 설명**\n1. 첫 번째 단계\n2. 두 번째 단계\n\n"
+            "**참고사항**\n벤치마크용 응답입니다."
+        )
+        completion_tokens = len(answer.split())
+
+        return SimpleNamespace(
+            model=f"stub-{model}",
+            choices=[SimpleNamespace(message=SimpleNamespace(content=answer))],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens
+            )
+        )
+
+
+def generate_synthetic_pdf(path: str, pages: int, paragraphs: int = 6, seed: int = 42) -> None:
+    """
+    합성 PDF 생성
+
+    Args:
+        path: 저장 경로
+        pages: 페이지 수
+        paragraphs: 페이지당 문단 수
+        seed: 난수 시드 (동일 시드는 동일 문서 생성)
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+
+    for page_num in range(pages):
+        page = doc.new_page()
+        lines = [f"Section {page_num + 1}"]
+        for _ in range(paragraphs):
+            sentence_count = rng.randint(3, 6)
+            sentences = []
+            for _ in range(sentence_count):
+                words = rng.choices(WORDS, k=rng.randint(8, 16))
+                sentences.append(" ".join(words).capitalize() + ".")
+            lines.append(" ".join(sentences))
+        page.insert_textbox(page.rect + (36, 36, -36, -36), "\n\n".join(lines), fontsize=8)
+
+    doc.save(path)
+    doc.close()
+
+
+def measure(func: Callable, repeat: int = 1) -> Dict:
+    """함수를 반복 실행하며 소요 시간 측정"""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - start)
+
+    durations.sort()
+    stats = {
+        'count': repeat,
+        'total': sum(durations),
+        'mean': statistics.mean(durations),
+        'p50': durations[len(durations) // 2],
+        'p95': durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+        'max': durations[-1]
+    }
+    return {'stats': stats, 'result': result}
+
+
+def run_benchmark(args) -> Dict:
+    """전체 파이프라인 벤치마크 실행"""
+    from pdf_processor import PDFProcessor
+    from rag_engine import RAGEngine
+
+    workdir = tempfile.mkdtemp(prefix='pdfchat_bench_')
+    original_cwd = os.getcwd()
+    stages = {}
+
+    def record(name: str, func: Callable, repeat: int = 1):
+        measured = measure(func, repeat)
+        stages[name] = measured['stats']
+        print(f"  {name:<16} p50={measured['stats']['p50'] * 1000:9.2f}ms  (x{repeat})")
+        return measured['result']
+
+    try:
+        os.chdir(workdir)
+        pdf_path = os.path.join(workdir, 'synthetic.pdf')
+        generate_synthetic_pdf(pdf_path, args.pages, args.paragraphs, args.seed)
+
+        if args.embedder == 'local':
+            # 실제 로컬 임베딩 모델 처리량 측정 (sentence-transformers 필요)
+            from rag_engine_free import get_local_embeddings
+            embeddings = get_local_embeddings()
+        else:
+            embeddings = StubEmbeddings(args.dimensions)
+        client = StubChatClient(args.llm_latency)
+
+        print(f"[INFO] 합성 PDF: {args.pages}페이지, 작업 디렉토리: {workdir}")
+        processor = PDFProcessor(pdf_path)
+
+        record('extraction', processor.extract_text_with_pages)
+        chunks = record('chunking', lambda: processor.create_chunks_with_metadata(
+            chunk_size=args.chunk_size,
+            chunk_overlap=args.chunk_overlap
+        ))
+        texts = [chunk['text'] for chunk in chunks]
+        record('embedding', lambda: embeddings.embed_documents(texts))
+        chunks_per_second = len(texts) / stages['embedding']['p50'] if stages['embedding']['p50'] else 0.0
+        print(f"  embedding throughput: {chunks_per_second:.1f} chunks/s")
+
+        engine = RAGEngine('stub-key', embeddings=embeddings, client=client)
+        record('index_build', lambda: engine.build_vector_store(chunks))
+
+        store_path = os.path.join(workdir, 'vector_store')
+        record('save', lambda: engine.save_vector_store(store_path))
+        record('load', lambda: engine.load_vector_store(store_path))
+
+        questions = SAMPLE_QUESTIONS
+        counter = iter(range(10 ** 9))
+        record('search', lambda: engine.search(questions[next(counter) % len(questions)], k=3),
+               repeat=args.repeat)
+
+        # 검색 경로 비교 (질의 임베딩 제외)
+        query_vectors = [embeddings.embed_query(question) for question in questions]
+        path_results = {}
+        for mode in ('langchain', 'faiss', 'numpy'):
+            if mode == 'numpy' and engine._exact_matrix() is None:
+                print(f"  search_path:numpy 건너뜀 (청크 {len(chunks)}개 > EXACT_SEARCH_MAX_VECTORS)")
+                continue
+            engine.search_mode = mode
+            record(f'search_path:{mode}', lambda: engine.search_by_vector(
+                query_vectors[next(counter) % len(query_vectors)], k=3
+            ), repeat=args.repeat * 5)
+            path_results[mode] = [
+                [(result['chunk_id'], round(result['similarity_score'], 4))
+                 for result in engine.search_by_vector(vector, k=3)]
+                for vector in query_vectors
+            ]
+        engine.search_mode = 'faiss'
+        search_paths_agree = all(results == path_results['langchain'] for results in path_results.values())
+        baseline_p50 = stages['search_path:langchain']['p50']
+        for mode in path_results:
+            speedup = baseline_p50 / stages[f'search_path:{mode}']['p50'] if stages[f'search_path:{mode}']['p50'] else 0.0
+            print(f"  search_path:{mode:<10} x{speedup:.2f} (LangChain 경로 대비)")
+        print(f"  검색 경로 결과 일치: {'예' if search_paths_agree else '아니오'}")
+
+        image_dir = os.path.join(workdir, 'page_images')
+        record('page_render', lambda: processor.render_page_as_image(
+            next(counter) % processor.total_pages + 1, output_dir=image_dir
+        ), repeat=min(args.repeat, processor.total_pages))
+
+        # Flask 앱 전체 경로 (/api/query)
+        import app as app_module
+        app_module.active_document = app_module.ActiveDocument(engine, processor, pdf_path)
+        http = app_module.app.test_client()
+
+        def post_query():
+            response = http.post('/api/query', json={
+                'question': questions[next(counter) % len(questions)]
+            })
+            if response.status_code != 200:
+                raise RuntimeError(f"/api/query 실패: {response.status_code} {response.get_data(as_text=True)}")
+            return response
+
+        record('api_query', post_query, repeat=args.repeat)
+        processor.close()
+
+    finally:
+        os.chdir(original_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pages': args.pages,
+            'paragraphs': args.paragraphs,
+            'chunk_size': args.chunk_size,
+            'chunk_overlap': args.chunk_overlap,
+            'total_chunks': len(chunks),
+            'dimensions': args.dimensions,
+            'embedder': args.embedder,
+            'embedding_chunks_per_second': chunks_per_second,
+            'search_paths_agree': search_paths_agree,
+            'repeat': args.repeat,
+            'seed': args.seed
+        },
+        'stages': stages
+    }
+
+
+def _directory_bytes(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+
+def run_dimension_benchmark(args) -> Dict:
+    """
+    축소 차원별 인덱스 크기/검색 지연/top-k 겹침 평가 (전체 차원 인덱스 기준)
+
+    질의는 샘플 질문과 청크 앞부분 문장을 함께 사용하며,
+    겹침은 전체 차원 검색 결과의 top-k 청크 중 축소 인덱스도 찾은 비율입니다.
+    """
+    from pdf_processor import PDFProcessor
+    from rag_engine import RAGEngine
+
+    workdir = tempfile.mkdtemp(prefix='pdfchat_dims_')
+    stages = {}
+    variants = []
+    k = args.eval_k
+
+    try:
+        pdf_path = os.path.join(workdir, 'synthetic.pdf')
+        generate_synthetic_pdf(pdf_path, args.pages, args.paragraphs, args.seed)
+        if args.embedder == 'local':
+            from rag_engine_free import get_local_embeddings
+            embeddings = get_local_embeddings()
+        else:
+            embeddings = StubEmbeddings(args.dimensions)
+        client = StubChatClient()
+
+        with PDFProcessor(pdf_path) as processor:
+            chunks = processor.create_chunks_with_metadata(
+                chunk_size=args.chunk_size,
+                chunk_overlap=args.chunk_overlap
+            )
+        rng = random.Random(args.seed)
+        questions = SAMPLE_QUESTIONS + [
+            ' '.join(chunk['text'].split()[:12])
+            for chunk in rng.sample(chunks, min(len(chunks), 50))
+        ]
+        print(f"[INFO] 합성 PDF: {args.pages}페이지, {len(chunks)}개 청크, 질의 {len(questions)}개, k={k}")
+
+        baseline_ids = None
+        for dimensions in [None] + args.reduce_dims:
+            name = f"dims:{dimensions or 'full'}"
+            engine = RAGEngine('stub-key', embeddings=embeddings, client=client, dimensions=dimensions)
+            engine.build_vector_store(chunks)
+            store_path = os.path.join(workdir, name.replace(':', '_'))
+            engine.save_vector_store(store_path)
+            engine.load_vector_store(store_path)
+
+            query_vectors = engine._project_queries(embeddings.embed_documents(questions))
+            counter = iter(range(10 ** 9))
+            measured = measure(lambda: engine.search_by_vector(
+                query_vectors[next(counter) % len(questions)], k=k
+            ), repeat=args.repeat * 5)
+            stages[f'search_{name}'] = measured['stats']
+
+            result_ids = [
+                {result['chunk_id'] for result in engine.search_by_vector(vector, k=k)}
+                for vector in query_vectors
+            ]
+            if baseline_ids is None:
+                baseline_ids = result_ids
+            overlap = statistics.mean(
+                len(found & expected) / max(len(expected), 1)
+                for found, expected in zip(result_ids, baseline_ids)
+            )
+
+            variant = {
+                'dimensions': engine.vector_store.index.d,
+                'reduction': engine.reduction or 'none',
+                'index_bytes': _directory_bytes(store_path),
+                'vector_bytes': os.path.getsize(os.path.join(store_path, 'index.faiss')),
+                'search_p50_ms': measured['stats']['p50'] * 1000,
+                f'overlap_at_{k}': overlap
+            }
+            variants.append(variant)
+            print(f"  {name:<10} {variant['reduction']:<6} {variant['dimensions']:>5}차원  "
+                  f"벡터 {variant['vector_bytes'] / 1024:8.1f}KB (전체 {variant['index_bytes'] / 1024:8.1f}KB)  검색 p50 {variant['search_p50_ms']:7.3f}ms  "
+                  f"top-{k} 겹침 {overlap:6.1%}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'mode': 'dimensions',
+            'pages': args.pages,
+            'total_chunks': len(chunks),
+            'queries': len(questions),
+            'embedder': args.embedder,
+            'k': k,
+            'variants': variants,
+            'seed': args.seed
+        },
+        'stages': stages
+    }
+
+
+def _time_import(module: str, cwd: str) -> float:
+    """새 인터프리터에서 모듈 하나를 임포트하는 데 걸린 시간 (초)"""
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; "
+        "print(time.perf_counter() - start)"
+    )
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=cwd, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise ImportError(completed.stderr.strip().splitlines()[-1])
+    return float(completed.stdout.strip().splitlines()[-1])
+
+
+def _import_breakdown(module: str, cwd: str, top: int) -> List[Dict]:
+    """python -X importtime 결과에서 누적 시간이 큰 모듈 목록"""
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        cwd=cwd, env=env, capture_output=True, text=True
+    )
+
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line.split(':', 1)[1].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append({
+            'module': name.strip(),
+            'depth': depth,
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000
+        })
+
+    entries.sort(key=lambda entry: entry['cumulative_ms'], reverse=True)
+    return entries[:top]
+
+
+def run_startup_benchmark(args) -> Dict:
+    """모듈별 임포트 비용 측정 (각 모듈을 새 프로세스에서 임포트)"""
+    workdir = tempfile.mkdtemp(prefix='pdfchat_startup_')
+    stages = {}
+    skipped = []
+
+    try:
+        baseline = measure(lambda: _time_import('sys', workdir), args.startup_repeat)['stats']
+
+        for module in STARTUP_MODULES:
+            try:
+                stats = measure(lambda: _time_import(module, workdir), args.startup_repeat)['stats']
+            except ImportError as e:
+                skipped.append({'module': module, 'reason': str(e)})
+                print(f"  {module:<34} (건너뜀: {e})")
+                continue
+
+            stages[f"import:{module}"] = stats
+            print(f"  {module:<34} p50={stats['p50'] * 1000:9.2f}ms")
+
+        breakdown = _import_breakdown('app', workdir, args.startup_top)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n'import app' 누적 시간 상위 {args.startup_top}개 모듈:")
+    for entry in breakdown:
+        print(f"  {entry['module']:<40} {entry['cumulative_ms']:9.2f}ms")
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'mode': 'startup',
+            'repeat': args.startup_repeat,
+            'interpreter_overhead_seconds': baseline['p50'],
+            'skipped': skipped,
+            'app_import_breakdown': breakdown
+        },
+        'stages': stages
+    }
+
+
+def compare_with_baseline(results: Dict, baseline: Dict, tolerance: float, min_delta: float) -> List[str]:
+    """
+    기준선 대비 회귀 검사
+
+    Args:
+        results: 현재 결과
+        baseline: 기준선 결과
+        tolerance: 허용 비율 (0.2 = 20% 느려지는 것까지 허용)
+        min_delta: 무시할 최소 절대 차이 (초)
+
+    Returns:
+        List[str]: 회귀가 발생한 단계 설명 리스트
+    """
+    regressions = []
+
+    for name, current in results['stages'].items():
+        previous = baseline.get('stages', {}).get(name)
+        if not previous:
+            continue
+
+        delta = current['p50'] - previous['p50']
+        ratio = current['p50'] / previous['p50'] if previous['p50'] else float('inf')
+        status = 'OK'
+        if ratio > 1 + tolerance and delta > min_delta:
+            status = 'REGRESSION'
+            regressions.append(
+                f"{name}: {previous['p50'] * 1000:.2f}ms -> {current['p50'] * 1000:.2f}ms ({ratio:.2f}x)"
+            )
+        print(f"  {name:<16} {previous['p50'] * 1000:9.2f}ms -> {current['p50'] * 1000:9.2f}ms  {ratio:5.2f}x  {status}")
+
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='PDF 챗봇 오프라인 성능 벤치마크')
+    parser.add_argument('--pages', type=int, default=50, help='합성 PDF 페이지 수')
+    parser.add_argument('--paragraphs', type=int, default=6, help='페이지당 문단 수')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--chunk-overlap', type=int, default=200)
+    parser.add_argument('--dimensions', type=int, default=256, help='스텁 임베딩 차원')
+    parser.add_argument('--embedder', choices=('stub', 'local'), default='stub',
+                        help='임베딩 방식 (local: RAGEngineFree의 공유 로컬 모델로 처리량 측정)')
+    parser.add_argument('--repeat', type=int, default=20, help='반복 측정 단계의 반복 횟수')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='스텁 LLM 지연 시간 (초)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bench_results.json', help='결과 JSON 저장 경로')
+    parser.add_argument('--startup', action='store_true', help='파이프라인 대신 모듈별 임포트 비용 측정')
+    parser.add_argument('--startup-repeat', type=int, default=3, help='모듈별 임포트 측정 반복 횟수')
+    parser.add_argument('--startup-top', type=int, default=15, help="'import app' 분석에 표시할 모듈 수")
+    parser.add_argument('--reduce-dims', type=lambda text: [int(part) for part in text.split(',')],
+                        help='차원 축소 평가 모드: 비교할 축소 차원 목록 (예: 64,128,256)')
+    parser.add_argument('--eval-k', type=int, default=5, help='차원 축소 평가의 top-k')
+    parser.add_argument('--baseline', help='비교할 기준선 JSON 경로')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='허용 회귀 비율')
+    parser.add_argument('--min-delta', type=float, default=0.001, help='무시할 최소 차이 (초)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("\n" + "=" * 50)
+    print("  PDF 챗봇 오프라인 벤치마크")
+    print("=" * 50)
+
+    if args.startup:
+        results = run_startup_benchmark(args)
+    elif args.reduce_dims:
+        results = run_dimension_benchmark(args)
+    else:
+        results = run_benchmark(args)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\n[OK] 결과가 {args.output}에 저장되었습니다.")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+        print("\n기준선 비교:")
+        regressions = compare_with_baseline(results, baseline, args.tolerance, args.min_delta)
+        if regressions:
+            print("\n[FAIL] 성능 회귀 발견:")
+            for line in regressions:
+                print(f"   - {line}")
+            return 1
+        print("\n[OK] 성능 회귀 없음")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
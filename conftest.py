@@ -0,0 +1,31 @@
+"""
+pytest 공통 픽스처
+- 네트워크 없이 동작하는 스텁 임베딩/LLM을 쓰는 RAG 엔진 (benchmark.py의 스텁 사용)
+- 합성 PDF
+"""
+import pytest
+
+import benchmark
+from rag_engine import RAGEngine
+
+
+@pytest.fixture
+def make_engine():
+    """스텁 임베딩/LLM을 쓰는 RAGEngine 생성 함수 (embeddings를 바꿔 장애 주입 가능)"""
+    def factory(embeddings=None):
+        return RAGEngine(
+            'test-key',
+            embeddings=embeddings or benchmark.StubEmbeddings(),
+            client=benchmark.StubChatClient()
+        )
+    return factory
+
+
+@pytest.fixture
+def sample_pdf(tmp_path):
+    """업로드 폴더의 합성 PDF 경로 (6페이지)"""
+    upload_dir = tmp_path / 'uploads'
+    upload_dir.mkdir()
+    path = upload_dir / 'manual.pdf'
+    benchmark.generate_synthetic_pdf(str(path), pages=6, paragraphs=3, seed=1)
+    return str(path)
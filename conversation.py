@@ -0,0 +1,144 @@
+"""
+대화(세션) 모드 모듈
+- 세션별 최근 질문/답변 기록 유지 (메모리, 워커 단위)
+- 후속 질문 판별: 이전 검색 결과를 그대로 재사용할 수 있는지 결정
+  (재사용 시 질문 임베딩/벡터 검색/컨텍스트 재구성 생략, 프롬프트 앞부분이 같아 제공자 측 캐시 적중)
+"""
+import re
+import time
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+from metrics import counter
+
+
+CONVERSATION_TURNS = counter(
+    'pdfchat_conversation_turns_total', '대화 모드 질문 수 (reused: 이전 검색 결과 재사용)', ('retrieval',)
+)
+
+# 질문 앞부분에 오면 후속 질문으로 보는 표현
+FOLLOW_UP_PREFIXES = (
+    '그럼', '그러면', '그리고', '그 다음', '그다음', '다음은', '다음 단계', '그건', '그거', '그것',
+    '이건', '이거', '이것', '거기', '또', '그래서',
+    'and ', 'then', 'what about', 'how about', 'and?', 'what next', 'next'
+)
+# 앞 질문을 가리키는 지시어
+FOLLOW_UP_REFERENCES = ('그것', '그거', '이것', '이거', '위의', '방금', '앞의', ' it ', ' that ', ' this ')
+# 짧은 단계 지칭 질문 ('4단계는?', 'step 4?')
+STEP_REFERENCE = re.compile(r'\d+\s*(?:단계|번)|step\s*\d+', re.IGNORECASE)
+STEP_REFERENCE_MAX_CHARS = 20
+
+PAGE_REFERENCE = re.compile(r'(\d+)\s*(?:페이지|쪽|page)|(?:page|p\.)\s*(\d+)', re.IGNORECASE)
+
+
+def referenced_page_numbers(question: str) -> List[int]:
+    """질문에 명시된 페이지 번호 ('5페이지', 'page 5')"""
+    return [int(a or b) for a, b in PAGE_REFERENCE.findall(question)]
+
+
+def is_follow_up(question: str) -> bool:
+    """앞 질문을 이어받는 표현('그럼', 'what about', '그것', 짧은 '4단계는?')이 있으면 후속 질문으로 판단"""
+    text = question.strip().lower()
+    padded = f" {text} "
+    return text.startswith(FOLLOW_UP_PREFIXES) or \
+        any(reference in padded for reference in FOLLOW_UP_REFERENCES) or \
+        (len(text) <= STEP_REFERENCE_MAX_CHARS and bool(STEP_REFERENCE.search(text)))
+
+
+class Conversation:
+    """한 세션의 대화 기록과 마지막 검색 결과"""
+
+    def __init__(self, document: str, max_turns: int, max_answer_chars: int):
+        self.document = document
+        self.max_answer_chars = max_answer_chars
+        self.turns = deque(maxlen=max_turns)
+        self.last_results: List[Dict] = []
+        self.last_used = time.time()
+        self.lock = threading.Lock()
+
+    def history(self) -> List[Dict]:
+        """LLM 메시지 형식의 대화 기록 (오래된 순)"""
+        messages = []
+        for question, answer in self.turns:
+            messages.append({'role': 'user', 'content': question})
+            messages.append({'role': 'assistant', 'content': answer})
+        return messages
+
+    def reusable_results(self, question: str) -> Optional[List[Dict]]:
+        """
+        후속 질문이 이전 검색 결과와 같은 페이지에 머무르면 그 결과 반환
+
+        Returns:
+            List[Dict] 또는 None (새로 검색해야 하는 경우)
+        """
+        reusable = bool(self.last_results) and is_follow_up(question)
+
+        # 이전 결과에 없는 페이지를 명시하면 새로 검색
+        if reusable:
+            pages = {
+                page
+                for result in self.last_results
+                for page in result.get('pages') or [result['page_number']]
+            }
+            reusable = all(page in pages for page in referenced_page_numbers(question))
+
+        CONVERSATION_TURNS.inc(retrieval='reused' if reusable else 'searched')
+        return self.last_results if reusable else None
+
+    def record(self, question: str, answer: str, search_results: List[Dict]) -> None:
+        """질문/답변과 사용한 검색 결과 기록 (답변은 길이를 제한하여 보관)"""
+        self.turns.append((question, answer[:self.max_answer_chars]))
+        self.last_results = search_results
+        self.last_used = time.time()
+
+
+class ConversationStore:
+    """세션 ID별 대화 저장소 (세션 수/유휴 시간 제한)"""
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        max_turns: int = 4,
+        max_answer_chars: int = 2000,
+        ttl: float = 3600.0
+    ):
+        """
+        Args:
+            max_sessions: 유지할 최대 세션 수 (초과 시 가장 오래 쓰지 않은 세션 삭제)
+            max_turns: 세션별로 LLM에 함께 보낼 최근 질문/답변 쌍 수
+            max_answer_chars: 기록에 보관할 답변 최대 길이
+            ttl: 세션 유휴 만료 시간 (초)
+        """
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.max_answer_chars = max_answer_chars
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str, document: str) -> Conversation:
+        """
+        세션의 대화 반환 (없거나 만료되었거나 문서가 바뀌었으면 새로 시작)
+
+        Args:
+            session_id: 클라이언트가 보낸 세션 ID
+            document: 현재 문서 경로
+        """
+        now = time.time()
+        with self._lock:
+            conversation = self._sessions.get(session_id)
+            if conversation is None or conversation.document != document or \
+                    now - conversation.last_used > self.ttl:
+                conversation = Conversation(document, self.max_turns, self.max_answer_chars)
+                self._sessions[session_id] = conversation
+            self._sessions.move_to_end(session_id)
+
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+            return conversation
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
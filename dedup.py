@@ -0,0 +1,113 @@
+"""
+거의 같은 청크(반복되는 머리글/바닥글, 안전 경고, 저작권 문구) 제거
+- 청크 텍스트를 단어 3-gram shingle 집합으로 만들고 MinHash 서명으로 Jaccard 유사도 추정
+- LSH(밴드 분할)로 후보 쌍만 비교하므로 청크 수에 거의 선형
+- 중복 청크는 처음 나온 청크(대표) 하나로 합치고, 나타난 페이지 목록(pages)을 유지
+
+환경 변수:
+- CHUNK_DEDUP_THRESHOLD: 중복으로 볼 추정 Jaccard 유사도 (기본값 0.9, 0이면 사용 안 함)
+"""
+import os
+import re
+import zlib
+from typing import Dict, List
+
+
+DEDUP_THRESHOLD = float(os.getenv('CHUNK_DEDUP_THRESHOLD', 0.9))
+
+SHINGLE_WORDS = 3
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16  # 밴드당 4행: 추정 유사도 약 0.5 이상이면 후보로 비교
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_permutations = None  # (a, b) 계수 배열 (NumPy는 앱 시작 시간을 늘리므로 처음 사용할 때 생성)
+
+
+def _get_permutations():
+    """MinHash 순열 계수 (고정 시드라 프로세스/재시작과 무관하게 같은 서명)"""
+    global _permutations
+    if _permutations is None:
+        import numpy as np
+        rng = np.random.RandomState(1)
+        _permutations = (
+            rng.randint(1, _MAX_HASH, size=NUM_PERMUTATIONS, dtype=np.uint64),
+            rng.randint(0, _MAX_HASH, size=NUM_PERMUTATIONS, dtype=np.uint64)
+        )
+    return _permutations
+
+
+def shingles(text: str) -> List[str]:
+    """공백/대소문자를 정규화한 단어 3-gram 목록 (단어가 적으면 전체 텍스트 하나)"""
+    words = re.sub(r'\s+', ' ', text).strip().lower().split(' ')
+    if len(words) <= SHINGLE_WORDS:
+        return [' '.join(words)]
+    return [' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+
+
+def minhash(text: str):
+    """MinHash 서명 (NUM_PERMUTATIONS개의 최소 해시값, np.ndarray)"""
+    import numpy as np
+
+    perm_a, perm_b = _get_permutations()
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode('utf-8')) for shingle in set(shingles(text))),
+        dtype=np.uint64
+    )
+    # (a * x + b) mod p: a, x < 2^32 이므로 uint64에서 넘치지 않음
+    permuted = ((hashes[:, None] * perm_a + perm_b) % _MERSENNE_PRIME) & _MAX_HASH
+    return permuted.min(axis=0)
+
+
+def collapse_near_duplicates(chunks: List[Dict], threshold: float = DEDUP_THRESHOLD) -> List[Dict]:
+    """
+    거의 같은 청크를 대표 청크 하나로 합침
+
+    Args:
+        chunks: create_chunks_with_metadata()의 청크 (문서 순서)
+        threshold: 중복으로 볼 추정 Jaccard 유사도 (0이면 합치지 않음)
+
+    Returns:
+        List[Dict]: 대표 청크 리스트 (pages: 나타난 페이지 목록, chunk_id는 0부터 다시 부여)
+    """
+    import numpy as np
+
+    rows = NUM_PERMUTATIONS // LSH_BANDS
+    buckets: Dict[tuple, List[int]] = {}
+    canonical: List[Dict] = []
+    signatures = []
+
+    for chunk in chunks:
+        pages = chunk.get('pages') or [chunk['page_number']]
+        if threshold <= 0:
+            canonical.append(dict(chunk, pages=list(pages)))
+            continue
+
+        signature = minhash(chunk['text'])
+        band_keys = [
+            (band, signature[band * rows:(band + 1) * rows].tobytes())
+            for band in range(LSH_BANDS)
+        ]
+
+        match = None
+        candidates = sorted({index for key in band_keys for index in buckets.get(key, ())})
+        for index in candidates:
+            if np.mean(signatures[index] == signature) >= threshold:
+                match = index
+                break
+
+        if match is not None:
+            merged = canonical[match]['pages']
+            merged.extend(page for page in pages if page not in merged)
+            continue
+
+        index = len(canonical)
+        canonical.append(dict(chunk, pages=list(pages)))
+        signatures.append(signature)
+        for key in band_keys:
+            buckets.setdefault(key, []).append(index)
+
+    for chunk_id, chunk in enumerate(canonical):
+        chunk['chunk_id'] = chunk_id
+        chunk['pages'].sort()
+    return canonical
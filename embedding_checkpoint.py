@@ -0,0 +1,124 @@
+"""
+임베딩 체크포인트 모듈
+- 인덱스 구축 중 임베딩을 배치 단위로 디스크(<인덱스 디렉토리>/checkpoints/)에 저장
+- 배치 파일명은 임베딩 모델과 배치 텍스트의 해시이므로 같은 입력이면 재시작 후 그대로 재사용
+  (PDF, 청킹 설정, 모델이 바뀌면 해시가 달라져 자동으로 새로 임베딩)
+- 임시 파일에 쓴 뒤 교체하므로 워커가 강제 종료되어도 손상된 배치가 남지 않음
+- 인덱스 저장이 끝나면 체크포인트 디렉토리 삭제
+
+환경 변수:
+- EMBEDDING_CHECKPOINT_BATCH: 체크포인트 배치당 청크 수 (기본값 256)
+"""
+import os
+import shutil
+import hashlib
+from typing import List
+
+from metrics import counter
+
+
+CHECKPOINT_DIR_NAME = 'checkpoints'
+CHECKPOINT_BATCH_SIZE = int(os.getenv('EMBEDDING_CHECKPOINT_BATCH', 256))
+
+EMBEDDING_BATCHES = counter(
+    'pdfchat_embedding_batches_total', '인덱스 구축 임베딩 배치 수 (resumed: 체크포인트 재사용, fresh: 새로 임베딩)',
+    ('source',)
+)
+
+
+class EmbeddingCheckpoint:
+    """배치 단위 임베딩 체크포인트 저장소"""
+
+    def __init__(self, directory: str, model_id: str, batch_size: int = CHECKPOINT_BATCH_SIZE):
+        """
+        Args:
+            directory: 체크포인트 디렉토리
+            model_id: 임베딩 모델 식별자 (해시에 포함)
+            batch_size: 배치당 청크 수
+        """
+        self.directory = directory
+        self.model_id = model_id
+        self.batch_size = max(1, batch_size)
+        self.resumed_batches = 0
+        self.fresh_batches = 0
+        self.resumed_chunks = 0
+
+    def batch_key(self, texts: List[str]) -> str:
+        """모델과 배치 텍스트로 만든 배치 식별자"""
+        digest = hashlib.sha256(self.model_id.encode('utf-8'))
+        for text in texts:
+            digest.update(b'\0')
+            digest.update(text.encode('utf-8'))
+        return digest.hexdigest()[:32]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def load(self, texts: List[str]):
+        """저장된 배치 임베딩 (np.ndarray, 없거나 손상되었으면 None)"""
+        import numpy as np
+
+        path = self._path(self.batch_key(texts))
+        if not os.path.exists(path):
+            return None
+        try:
+            vectors = np.load(path, allow_pickle=False)
+        except (OSError, ValueError):
+            os.remove(path)
+            return None
+        if vectors.ndim != 2 or len(vectors) != len(texts):
+            os.remove(path)
+            return None
+        return vectors
+
+    def save(self, texts: List[str], vectors) -> None:
+        """배치 임베딩 저장 (임시 파일에 쓴 뒤 교체)"""
+        import numpy as np
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(self.batch_key(texts))
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.asarray(vectors, dtype=np.float32), allow_pickle=False)
+        os.replace(tmp_path, path)
+
+    def embed(self, texts: List[str], embed_batch) -> List[List[float]]:
+        """
+        배치 단위로 임베딩 (체크포인트가 있는 배치는 재사용하고, 새로 만든 배치는 즉시 저장)
+
+        Args:
+            texts: 임베딩할 텍스트 전체
+            embed_batch: 텍스트 리스트를 받아 벡터 리스트를 반환하는 함수
+
+        Returns:
+            List[List[float]]: 입력 순서대로의 벡터
+        """
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            cached = self.load(batch)
+            if cached is not None:
+                vectors.extend(cached.tolist())
+                self.resumed_batches += 1
+                self.resumed_chunks += len(batch)
+                EMBEDDING_BATCHES.inc(source='resumed')
+                continue
+
+            batch_vectors = embed_batch(batch)
+            self.save(batch, batch_vectors)
+            vectors.extend(batch_vectors)
+            self.fresh_batches += 1
+            EMBEDDING_BATCHES.inc(source='fresh')
+        return vectors
+
+    def stats(self) -> dict:
+        """재사용/새로 임베딩한 배치 수"""
+        return {
+            'resumed_batches': self.resumed_batches,
+            'fresh_batches': self.fresh_batches,
+            'resumed_chunks': self.resumed_chunks
+        }
+
+    def clear(self) -> None:
+        """체크포인트 디렉토리 삭제 (인덱스 저장 완료 후)"""
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,81 @@
+"""
+임베딩 차원 축소 (PCA 투영)
+- 인덱스 구축 시 문서 임베딩으로 PCA를 학습하여 지정한 차원으로 투영
+  (평균을 빼지 않는 절단 SVD: 임베딩 간 내적을 가장 잘 보존하므로 검색 순위 유지에 유리)
+- 투영 행렬은 인덱스와 함께 projection.npz로 저장하고, 질의 임베딩에도 같은 투영 적용
+- 투영 후 벡터를 다시 정규화하여 L2 거리 순위가 코사인 유사도 순위와 같도록 유지
+- index_bundle이 PROJECTION_NAME을 쓰므로 앱 시작 시 로드됨: NumPy는 사용할 때 임포트
+"""
+import os
+from typing import Optional
+
+
+PROJECTION_NAME = 'projection.npz'
+
+
+class PCAProjection:
+    """주성분 투영"""
+
+    def __init__(self, components):
+        """
+        Args:
+            components: 주성분 행렬 (D, d)
+        """
+        import numpy as np
+
+        self.components = np.asarray(components, dtype=np.float32)
+
+    @property
+    def input_dimensions(self) -> int:
+        return self.components.shape[0]
+
+    @property
+    def dimensions(self) -> int:
+        return self.components.shape[1]
+
+    @classmethod
+    def fit(cls, vectors, dimensions: int) -> Optional['PCAProjection']:
+        """
+        문서 임베딩으로 PCA 학습
+
+        Args:
+            vectors: 문서 임베딩 (N, D)
+            dimensions: 투영할 차원
+
+        Returns:
+            PCAProjection 또는 None (벡터 수나 원본 차원이 목표 차원 이하라 축소할 수 없는 경우)
+        """
+        import numpy as np
+
+        matrix = np.asarray(vectors, dtype=np.float64)
+        if matrix.ndim != 2 or matrix.shape[0] <= dimensions or matrix.shape[1] <= dimensions:
+            return None
+
+        _, _, vt = np.linalg.svd(matrix, full_matrices=False)
+        return cls(vt[:dimensions].T)
+
+    def apply(self, vectors):
+        """벡터 투영 후 정규화 (N, D) -> (N, d)"""
+        import numpy as np
+
+        projected = np.asarray(vectors, dtype=np.float32) @ self.components
+        norms = np.linalg.norm(projected, axis=1, keepdims=True)
+        return projected / np.maximum(norms, 1e-12)
+
+    def save(self, directory: str) -> None:
+        """인덱스 디렉토리에 저장"""
+        import numpy as np
+
+        np.savez(os.path.join(directory, PROJECTION_NAME), components=self.components)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional['PCAProjection']:
+        """인덱스 디렉토리에서 로드 (없으면 None)"""
+        import numpy as np
+
+        path = os.path.join(directory, PROJECTION_NAME)
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['components'])
+
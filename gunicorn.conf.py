@@ -0,0 +1,22 @@
+"""
+gunicorn 설정
+- 워커 초기화 직후 최근/자주 사용한 문서를 백그라운드에서 예열
+- preload_app 사용 여부와 관계없이 각 워커 프로세스 안에서 예열 스레드 시작
+  (마스터에서 스레드를 만들면 fork 후 워커로 복제되지 않으므로)
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+# 수락 제어(ADMISSION_MAX_ACTIVE, 기본 4)보다 많게 두어 초과 요청은 앱의 대기열에서 기다리거나 즉시 거절되도록 함
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+timeout = 300
+preload_app = os.getenv('GUNICORN_PRELOAD', '').lower() in ('1', 'true', 'yes')
+
+
+def post_worker_init(worker):
+    """워커가 앱을 로드한 뒤 호출됨"""
+    from app import start_warmup
+
+    start_warmup()
+    worker.log.info("문서 예열 시작 (pid %s)", os.getpid())
@@ -0,0 +1,417 @@
+"""
+문서 인덱스 번들 내보내기/가져오기
+- 문서 하나의 인덱스를 버전과 체크섬이 있는 단일 tar.gz 파일로 묶음
+  (FAISS 인덱스, JSON 청크 메타데이터, PCA 투영, 페이지 텍스트 사이드카, 선택적으로 원본 PDF)
+- bundle.json에 형식 버전, 임베딩 모델, 청킹 파라미터, 파일별 SHA-256 기록
+- 가져올 때 체크섬과 임베딩 모델을 확인하고, 피클 대신 JSON 메타데이터로 docstore를 다시 만들어
+  재임베딩 없이 인덱스 디렉토리에 설치
+
+사용 예:
+    python index_bundle.py export uploads/manual.pdf -o manual.bundle.tar.gz --include-pdf
+    python index_bundle.py import manual.bundle.tar.gz --upload-dir uploads
+    python index_bundle.py info manual.bundle.tar.gz
+"""
+import io
+import os
+import sys
+import json
+import time
+import pickle
+import shutil
+import tarfile
+import hashlib
+import argparse
+import tempfile
+from datetime import datetime
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from werkzeug.utils import secure_filename
+
+import index_store
+from pdf_processor import SIDECAR_SUFFIX, file_sha256
+from embedding_projection import PROJECTION_NAME
+
+
+BUNDLE_FORMAT = 'pdfchat-index-bundle'
+BUNDLE_VERSION = 1
+BUNDLE_INFO_NAME = 'bundle.json'
+
+# 번들 안의 파일 이름 (이 목록에 없는 항목은 가져올 때 무시)
+INDEX_MEMBER = 'index.faiss'
+CHUNKS_MEMBER = 'chunks.json'
+PROJECTION_MEMBER = PROJECTION_NAME
+SIDECAR_MEMBER = 'pages.json.gz'
+PDF_MEMBER = 'document.pdf'
+BUNDLE_MEMBERS = (INDEX_MEMBER, CHUNKS_MEMBER, PROJECTION_MEMBER, SIDECAR_MEMBER, PDF_MEMBER)
+
+# bundle.json/chunks.json 필수 필드와 타입 (가져올 때 검증)
+INFO_FIELDS = {'format': str, 'version': int, 'manifest': dict, 'dimensions': int, 'files': dict}
+MANIFEST_FIELDS = {
+    'version': int, 'source': str, 'file_sha256': str, 'embedding_model': str,
+    'chunk_size': int, 'chunk_overlap': int
+}
+CHUNK_FIELDS = {'chunk_id': int, 'text': str, 'page_number': int, 'pages': list, 'source': str}
+
+
+class BundleError(ValueError):
+    """번들 형식/체크섬/호환성 오류"""
+
+
+def _check_fields(value, fields: Dict, label: str) -> None:
+    """딕셔너리의 필수 필드/타입 확인 (bool은 int로 인정하지 않음)"""
+    if not isinstance(value, dict):
+        raise BundleError(f"{label} 형식이 올바르지 않습니다.")
+    for key, expected in fields.items():
+        field = value.get(key)
+        if not isinstance(field, expected) or isinstance(field, bool):
+            raise BundleError(f"{label}의 {key} 필드가 없거나 형식이 올바르지 않습니다.")
+
+
+def bundle_source_name(manifest: Dict) -> str:
+    """
+    번들에 기록된 원본 파일명을 업로드 폴더에 써도 안전한 이름으로 변환
+
+    Raises:
+        BundleError: 정리한 이름이 비었거나 .pdf 파일이 아닌 경우
+    """
+    source = secure_filename(os.path.basename(manifest['source'].replace('\\', '/')))
+    stem, extension = os.path.splitext(source)
+    if not stem or extension.lower() != '.pdf':
+        raise BundleError(f"허용되지 않는 원본 파일명입니다: {manifest['source']!r}")
+    return source
+
+
+def _sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _add_bytes(tar: tarfile.TarFile, name: str, data: bytes) -> None:
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    tar.addfile(info, io.BytesIO(data))
+
+
+def _ordered_chunks(index_dir: str) -> list:
+    """FAISS 위치 순서의 청크 메타데이터 (위치 i의 벡터 = chunks[i])"""
+    with open(os.path.join(index_dir, 'chunks_metadata.pkl'), 'rb') as f:
+        chunks = pickle.load(f)
+    with open(os.path.join(index_dir, 'index.pkl'), 'rb') as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+
+    by_id = {chunk['chunk_id']: chunk for chunk in chunks}
+    ordered = []
+    for position in range(len(index_to_docstore_id)):
+        doc = docstore.search(index_to_docstore_id[position])
+        chunk = by_id[doc.metadata['chunk_id']]
+        ordered.append({
+            'chunk_id': chunk['chunk_id'],
+            'text': chunk['text'],
+            'page_number': chunk['page_number'],
+            'pages': chunk.get('pages', [chunk['page_number']]),
+            'source': chunk['source']
+        })
+    return ordered
+
+
+def export_bundle(pdf_path: str, index_root: str, output_path: str, include_pdf: bool = False) -> Dict:
+    """
+    문서 인덱스를 번들 파일로 내보내기
+
+    Args:
+        pdf_path: 원본 PDF 경로 (문서 ID와 사이드카 위치 결정)
+        index_root: 인덱스 루트 디렉토리
+        output_path: 저장할 번들 경로 (.tar.gz)
+        include_pdf: 원본 PDF 포함 여부
+
+    Returns:
+        Dict: bundle.json 내용
+    """
+    import faiss
+
+    index_dir = index_store.index_dir_for(pdf_path, index_root)
+    manifest = index_store.read_manifest(index_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"인덱스가 없습니다: {index_dir}")
+
+    index = faiss.read_index(os.path.join(index_dir, INDEX_MEMBER))
+    members = {
+        INDEX_MEMBER: faiss.serialize_index(index).tobytes(),
+        CHUNKS_MEMBER: json.dumps(_ordered_chunks(index_dir), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    }
+
+    projection_path = os.path.join(index_dir, PROJECTION_NAME)
+    if os.path.exists(projection_path):
+        with open(projection_path, 'rb') as f:
+            members[PROJECTION_MEMBER] = f.read()
+
+    sidecar_path = pdf_path + SIDECAR_SUFFIX
+    if os.path.exists(sidecar_path):
+        with open(sidecar_path, 'rb') as f:
+            members[SIDECAR_MEMBER] = f.read()
+
+    if include_pdf:
+        if file_sha256(pdf_path) != manifest['file_sha256']:
+            raise BundleError("PDF가 인덱스를 만든 뒤 바뀌었습니다. 인덱스를 다시 구축한 뒤 내보내세요.")
+        with open(pdf_path, 'rb') as f:
+            members[PDF_MEMBER] = f.read()
+
+    info = {
+        'format': BUNDLE_FORMAT,
+        'version': BUNDLE_VERSION,
+        'document_id': index_store.document_id(pdf_path),
+        'manifest': manifest,
+        'dimensions': index.d,
+        'vectors': index.ntotal,
+        'exported_at': datetime.now().isoformat(timespec='seconds'),
+        'files': {
+            name: {'sha256': _sha256_bytes(data), 'size': len(data)}
+            for name, data in members.items()
+        }
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with tarfile.open(tmp_path, 'w:gz') as tar:
+        _add_bytes(tar, BUNDLE_INFO_NAME, json.dumps(info, ensure_ascii=False, indent=2).encode('utf-8'))
+        for name, data in members.items():
+            _add_bytes(tar, name, data)
+    os.replace(tmp_path, output_path)
+    return info
+
+
+def read_bundle(bundle_path: str) -> tuple:
+    """
+    번들 읽기 및 검증 (형식, 버전, 파일별 체크섬)
+
+    Returns:
+        Tuple[Dict, Dict[str, bytes]]: (bundle.json 내용, 파일 이름 -> 내용)
+    """
+    members = {}
+    try:
+        with tarfile.open(bundle_path, 'r:*') as tar:
+            for member in tar.getmembers():
+                # 알려진 일반 파일만 메모리로 읽음 (경로를 풀지 않으므로 경로 조작 불가)
+                if member.isfile() and member.name in BUNDLE_MEMBERS + (BUNDLE_INFO_NAME,):
+                    members[member.name] = tar.extractfile(member).read()
+    except (tarfile.TarError, EOFError, OSError) as e:
+        raise BundleError(f"번들 파일을 읽을 수 없습니다: {type(e).__name__}")
+
+    if BUNDLE_INFO_NAME not in members:
+        raise BundleError("bundle.json이 없습니다.")
+    try:
+        info = json.loads(members.pop(BUNDLE_INFO_NAME))
+    except ValueError:
+        raise BundleError("bundle.json을 해석할 수 없습니다.")
+    if not isinstance(info, dict) or info.get('format') != BUNDLE_FORMAT:
+        raise BundleError("인덱스 번들 형식이 아닙니다.")
+    if info.get('version') != BUNDLE_VERSION:
+        raise BundleError(f"지원하지 않는 번들 버전입니다: {info.get('version')}")
+    _check_fields(info, INFO_FIELDS, 'bundle.json')
+    _check_fields(info['manifest'], MANIFEST_FIELDS, '매니페스트')
+    if info['manifest'].get('version') != index_store.MANIFEST_VERSION:
+        raise BundleError(f"호환되지 않는 인덱스 매니페스트 버전입니다: {info['manifest'].get('version')}")
+
+    for name, expected in info['files'].items():
+        if name not in BUNDLE_MEMBERS or not isinstance(expected, dict) or not isinstance(expected.get('sha256'), str):
+            raise BundleError(f"bundle.json의 파일 목록이 올바르지 않습니다: {name}")
+        data = members.get(name)
+        if data is None:
+            raise BundleError(f"번들에 {name}이(가) 없습니다.")
+        if _sha256_bytes(data) != expected['sha256']:
+            raise BundleError(f"{name}의 체크섬이 일치하지 않습니다.")
+    if INDEX_MEMBER not in info['files'] or CHUNKS_MEMBER not in info['files']:
+        raise BundleError("번들에 인덱스 또는 청크 메타데이터가 없습니다.")
+    # 체크섬 목록에 없는 파일은 검증되지 않았으므로 사용하지 않음
+    members = {name: data for name, data in members.items() if name in info['files']}
+
+    return info, members
+
+
+def import_bundle(
+    bundle_path: str,
+    index_root: str,
+    upload_dir: str = 'uploads',
+    expected_model: Optional[str] = None,
+    overwrite_pdf: bool = False
+) -> Dict:
+    """
+    번들을 인덱스 디렉토리에 설치 (재임베딩 없음)
+
+    Args:
+        bundle_path: 번들 경로
+        index_root: 인덱스 루트 디렉토리
+        upload_dir: PDF와 페이지 텍스트 사이드카를 둘 디렉토리 (문서 ID도 이 경로 기준)
+        expected_model: 현재 엔진의 임베딩 모델 식별자 (다르면 거절, None이면 확인하지 않음)
+        overwrite_pdf: 같은 이름의 다른 PDF가 있으면 덮어쓸지 여부
+
+    Returns:
+        Dict: document_id, source, index_dir, total_chunks, pdf_path (PDF를 설치했거나 이미 있으면)
+
+    Raises:
+        BundleError: 형식/체크섬/모델 불일치, 허용되지 않는 원본 파일명, 손상된 인덱스/청크
+    """
+    import faiss
+    import numpy as np
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_core.documents import Document
+
+    info, members = read_bundle(bundle_path)
+    manifest = info['manifest']
+    if expected_model is not None and manifest['embedding_model'] != expected_model:
+        raise BundleError(
+            f"임베딩 모델이 다릅니다: 번들 {manifest['embedding_model']}, 현재 {expected_model}"
+        )
+
+    source = bundle_source_name(manifest)
+    try:
+        index = faiss.deserialize_index(np.frombuffer(members[INDEX_MEMBER], dtype=np.uint8))
+        chunks = json.loads(members[CHUNKS_MEMBER])
+    except (RuntimeError, ValueError):
+        raise BundleError("인덱스 또는 청크 메타데이터를 해석할 수 없습니다.")
+    if not isinstance(chunks, list):
+        raise BundleError("청크 메타데이터 형식이 올바르지 않습니다.")
+    for chunk in chunks:
+        _check_fields(chunk, CHUNK_FIELDS, '청크')
+    if index.ntotal != len(chunks) or index.d != info['dimensions']:
+        raise BundleError("인덱스 벡터 수/차원이 청크 메타데이터와 일치하지 않습니다.")
+
+    os.makedirs(upload_dir, exist_ok=True)
+    target = os.path.join(upload_dir, source)
+    if PDF_MEMBER in members:
+        if os.path.exists(target) and file_sha256(target) != manifest['file_sha256'] and not overwrite_pdf:
+            raise BundleError(f"같은 이름의 다른 PDF가 이미 있습니다: {target}")
+        if not os.path.exists(target) or file_sha256(target) != manifest['file_sha256']:
+            with open(target, 'wb') as f:
+                f.write(members[PDF_MEMBER])
+    if SIDECAR_MEMBER in members and not os.path.exists(target + SIDECAR_SUFFIX):
+        # 사이드카는 PDF 수정 시각이 달라도 내용 해시가 같으면 재사용됨
+        with open(target + SIDECAR_SUFFIX, 'wb') as f:
+            f.write(members[SIDECAR_MEMBER])
+    pdf_path = target if os.path.isfile(target) else None
+
+    # 임시 디렉토리에 인덱스를 만든 뒤 기존 디렉토리와 교체 (문서 ID는 번들 값 대신 설치 경로로 다시 계산)
+    document_id = index_store.document_id(target)
+    index_dir = os.path.join(index_root, document_id)
+    os.makedirs(index_root, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(prefix=f".{document_id}.import-", dir=index_root)
+    try:
+        ids = [str(chunk['chunk_id']) for chunk in chunks]
+        docstore = InMemoryDocstore({
+            doc_id: Document(
+                page_content=chunk['text'],
+                metadata={key: chunk[key] for key in ('chunk_id', 'page_number', 'pages', 'source')}
+            )
+            for doc_id, chunk in zip(ids, chunks)
+        })
+        # FAISS.save_local()과 같은 형식 (index.faiss + (docstore, 위치 -> 문서 ID) 피클)
+        faiss.write_index(index, os.path.join(staging_dir, INDEX_MEMBER))
+        with open(os.path.join(staging_dir, 'index.pkl'), 'wb') as f:
+            pickle.dump((docstore, dict(enumerate(ids))), f)
+
+        with open(os.path.join(staging_dir, 'chunks_metadata.pkl'), 'wb') as f:
+            pickle.dump(sorted(chunks, key=lambda chunk: chunk['chunk_id']), f)
+        if PROJECTION_MEMBER in members:
+            with open(os.path.join(staging_dir, PROJECTION_NAME), 'wb') as f:
+                f.write(members[PROJECTION_MEMBER])
+        index_store.write_manifest(staging_dir, dict(
+            manifest,
+            source=source,
+            source_path=os.path.abspath(target),
+            imported_at=datetime.now().isoformat(timespec='seconds')
+        ))
+
+        if os.path.exists(index_dir):
+            retired_dir = f"{staging_dir}.old"
+            os.replace(index_dir, retired_dir)
+            os.replace(staging_dir, index_dir)
+            shutil.rmtree(retired_dir, ignore_errors=True)
+        else:
+            os.replace(staging_dir, index_dir)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    return {
+        'document_id': document_id,
+        'source': source,
+        'index_dir': index_dir,
+        'total_chunks': len(chunks),
+        'embedding_model': manifest['embedding_model'],
+        'pdf_path': pdf_path
+    }
+
+
+def _engine_class(backend: str):
+    if backend == 'free':
+        from rag_engine_free import RAGEngineFree
+        return RAGEngineFree
+    from rag_engine import RAGEngine
+    return RAGEngine
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='문서 인덱스 번들 내보내기/가져오기')
+    parser.add_argument('--backend', choices=('openai', 'free'), default=os.getenv('RAG_BACKEND', 'openai'))
+    parser.add_argument('--index-root', default=os.getenv('INDEX_ROOT'), help='인덱스 루트 (기본값: 엔진별 저장 경로)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('export', help='PDF의 인덱스를 번들로 내보내기')
+    export_parser.add_argument('pdf', help='원본 PDF 경로 (예: uploads/manual.pdf)')
+    export_parser.add_argument('-o', '--output', help='번들 경로 (기본값: <문서 ID>.bundle.tar.gz)')
+    export_parser.add_argument('--include-pdf', action='store_true', help='원본 PDF 포함')
+
+    import_parser = commands.add_parser('import', help='번들을 인덱스 루트에 설치')
+    import_parser.add_argument('bundle', help='번들 경로')
+    import_parser.add_argument('--upload-dir', default='uploads', help='PDF/사이드카를 둘 디렉토리')
+    import_parser.add_argument('--overwrite-pdf', action='store_true', help='같은 이름의 다른 PDF 덮어쓰기')
+    import_parser.add_argument('--skip-model-check', action='store_true', help='현재 임베딩 모델과의 일치 확인 생략')
+
+    info_parser = commands.add_parser('info', help='번들 정보와 체크섬 확인')
+    info_parser.add_argument('bundle', help='번들 경로')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    load_dotenv()
+    args = parse_args(argv)
+
+    try:
+        if args.command == 'info':
+            info, _ = read_bundle(args.bundle)
+            print(json.dumps(info, ensure_ascii=False, indent=2))
+            print("[OK] 체크섬 확인 완료")
+            return 0
+
+        engine_class = _engine_class(args.backend)
+        index_root = args.index_root or engine_class.DEFAULT_STORE_PATH
+
+        if args.command == 'export':
+            output = args.output or f"{index_store.document_id(args.pdf)}.bundle.tar.gz"
+            info = export_bundle(args.pdf, index_root, output, include_pdf=args.include_pdf)
+            size = os.path.getsize(output)
+            print(f"[OK] {output} ({size / 1024:.1f}KB, 벡터 {info['vectors']}개 x {info['dimensions']}차원, "
+                  f"모델 {info['manifest']['embedding_model']})")
+            return 0
+
+        expected_model = None
+        if not args.skip_model_check:
+            expected_model = engine_class(os.getenv('OPENAI_API_KEY') or 'unused').embedding_model_id()
+        result = import_bundle(
+            args.bundle, index_root,
+            upload_dir=args.upload_dir,
+            expected_model=expected_model,
+            overwrite_pdf=args.overwrite_pdf
+        )
+        print(f"[OK] {result['source']} 인덱스 설치 완료: {result['index_dir']} ({result['total_chunks']}개 청크)")
+        if result['pdf_path'] is None:
+            print("[INFO] 번들에 PDF가 없습니다. 같은 PDF를 업로드하면 재임베딩 없이 이 인덱스를 사용합니다.")
+        return 0
+
+    except (BundleError, FileNotFoundError) as e:
+        print(f"❌ {e}")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+문서별 벡터 인덱스 저장소
+- 문서마다 <인덱스 루트>/<문서 ID>/ 디렉토리에 FAISS 인덱스 저장 (문서 ID: 파일명 + 경로 해시)
+- manifest.json에 PDF 해시, 청킹 파라미터(중복 청크 기준 포함), 임베딩 모델을 기록
+- 같은 PDF/설정으로 이미 만들어진 인덱스는 재임베딩 없이 로드
+- 문서별 사용 기록(usage.json)으로 최근/자주 사용한 문서 조회 (워커 시작 시 예열용)
+- 구축 중 임베딩을 배치별로 체크포인트하여 중단(타임아웃, 워커 종료, API 오류) 후 이어서 구축
+"""
+import os
+import re
+import json
+import time
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from metrics import stage_timer
+from dedup import DEDUP_THRESHOLD
+from embedding_checkpoint import EmbeddingCheckpoint, CHECKPOINT_DIR_NAME
+
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+USAGE_NAME = 'usage.json'
+
+
+def document_id(pdf_path: str) -> str:
+    """
+    PDF 경로로부터 파일시스템에 안전한 문서 ID 생성
+
+    파일명만 쓰면 a/manual.pdf와 b/manual.pdf, "a b.pdf"와 "a_b.pdf"가 같은 인덱스 디렉토리를 쓰게 되므로
+    절대 경로 해시 8자리를 붙여 구분합니다. (예: manual-1a2b3c4d)
+    """
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    safe_stem = re.sub(r'[^\w.-]', '_', stem).strip('._') or 'document'
+    path_hash = hashlib.sha1(os.path.normcase(os.path.abspath(pdf_path)).encode('utf-8')).hexdigest()[:8]
+    return f"{safe_stem}-{path_hash}"
+
+
+def index_dir_for(pdf_path: str, index_root: str) -> str:
+    """문서의 인덱스 디렉토리 경로"""
+    return os.path.join(index_root, document_id(pdf_path))
+
+
+def read_manifest(index_dir: str) -> Optional[Dict]:
+    """인덱스 매니페스트 읽기 (없거나 손상되었으면 None)"""
+    path = os.path.join(index_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(index_dir: str, manifest: Dict) -> None:
+    """인덱스 매니페스트 저장 (임시 파일에 쓴 뒤 교체)"""
+    path = os.path.join(index_dir, MANIFEST_NAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def is_index_current(
+    manifest: Optional[Dict],
+    file_sha256: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    embedding_model: str,
+    dedup_threshold: float = DEDUP_THRESHOLD
+) -> bool:
+    """매니페스트가 현재 PDF/설정과 일치하는지 확인"""
+    return bool(manifest) and \
+        manifest.get('dedup_threshold') == dedup_threshold and \
+        manifest.get('version') == MANIFEST_VERSION and \
+        manifest.get('file_sha256') == file_sha256 and \
+        manifest.get('chunk_size') == chunk_size and \
+        manifest.get('chunk_overlap') == chunk_overlap and \
+        manifest.get('embedding_model') == embedding_model
+
+
+def load_or_build_index(
+    processor,
+    engine,
+    index_root: str,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    force: bool = False,
+    allow_build: bool = True,
+    dedup_threshold: float = DEDUP_THRESHOLD
+) -> Dict:
+    """
+    문서 인덱스를 로드하거나 (없거나 오래되었으면) 새로 구축하여 저장
+
+    Args:
+        processor: PDFProcessor 인스턴스
+        engine: RAGEngine 인스턴스 (인덱스가 로드/구축됨)
+        index_root: 인덱스 루트 디렉토리
+        chunk_size: 청크 크기
+        chunk_overlap: 청크 겹침 크기
+        force: True면 기존 인덱스를 무시하고 다시 구축
+        allow_build: False면 유효한 인덱스가 없을 때 구축하지 않고 FileNotFoundError 발생
+        dedup_threshold: 거의 같은 청크를 합칠 추정 Jaccard 유사도 (0이면 합치지 않음)
+
+    Returns:
+        Dict: status('loaded' 또는 'built'), index_dir, total_chunks, elapsed,
+              구축한 경우 resumed_batches/fresh_batches/resumed_chunks (체크포인트 재사용 현황)
+    """
+    started_at = time.perf_counter()
+    index_dir = index_dir_for(processor.pdf_path, index_root)
+    file_hash = processor.file_hash
+    manifest = read_manifest(index_dir)
+
+    if not force and is_index_current(
+        manifest, file_hash, chunk_size, chunk_overlap, engine.embedding_model_id(), dedup_threshold
+    ):
+        engine.load_vector_store(index_dir)
+        status = 'loaded'
+    elif not allow_build:
+        raise FileNotFoundError(f"유효한 인덱스가 없습니다: {index_dir}")
+    else:
+        # 구축 도중 중단되어도 이전 매니페스트로 오판하지 않도록 먼저 제거
+        manifest_path = os.path.join(index_dir, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
+        chunks = processor.create_chunks_with_metadata(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            dedup_threshold=dedup_threshold
+        )
+        if not chunks:
+            raise ValueError("PDF에서 추출된 텍스트가 없습니다. (스캔 이미지 PDF일 수 있습니다)")
+
+        # 임베딩 배치를 체크포인트하여 중단되면 다음 구축에서 이어서 진행
+        checkpoint = EmbeddingCheckpoint(
+            os.path.join(index_dir, CHECKPOINT_DIR_NAME),
+            engine.embedding_model_id()
+        )
+        engine.build_vector_store(chunks, checkpoint=checkpoint)
+        engine.save_vector_store(index_dir)
+
+        with stage_timer('manifest_write'):
+            write_manifest(index_dir, {
+                'version': MANIFEST_VERSION,
+                'source': os.path.basename(processor.pdf_path),
+                'source_path': os.path.abspath(processor.pdf_path),
+                'file_sha256': file_hash,
+                'total_pages': processor.total_pages,
+                'total_chunks': len(chunks),
+                'chunk_size': chunk_size,
+                'chunk_overlap': chunk_overlap,
+                'dedup_threshold': dedup_threshold,
+                'embedding_model': engine.embedding_model_id(),
+                'created_at': datetime.now().isoformat(timespec='seconds')
+            })
+        checkpoint.clear()
+        status = 'built'
+
+    info = {
+        'status': status,
+        'index_dir': index_dir,
+        'total_chunks': len(engine.chunks_metadata),
+        'elapsed': time.perf_counter() - started_at
+    }
+    if status == 'built':
+        info.update(checkpoint.stats())
+    return info
+
+
+def record_usage(index_root: str, pdf_path: str) -> None:
+    """문서 사용 기록 갱신 (마지막 사용 시각, 사용 횟수)"""
+    path = os.path.join(index_root, USAGE_NAME)
+    usage = read_usage(index_root)
+    entry = usage.setdefault(document_id(pdf_path), {'count': 0})
+    entry['source'] = os.path.basename(pdf_path)
+    entry['count'] += 1
+    entry['last_used'] = time.time()
+
+    os.makedirs(index_root, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(usage, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def read_usage(index_root: str) -> Dict[str, Dict]:
+    """문서 사용 기록 읽기 (문서 ID -> {source, count, last_used})"""
+    path = os.path.join(index_root, USAGE_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def most_used_documents(index_root: str, limit: int, strategy: str = 'recent') -> List[Dict]:
+    """
+    최근(recent) 또는 자주(frequent) 사용한 문서 목록
+
+    Returns:
+        List[Dict]: document_id, source, count, last_used
+    """
+    key = 'count' if strategy == 'frequent' else 'last_used'
+    entries = [
+        dict(entry, document_id=doc_id)
+        for doc_id, entry in read_usage(index_root).items()
+    ]
+    entries.sort(key=lambda entry: entry.get(key, 0), reverse=True)
+    return entries[:limit]
@@ -0,0 +1,203 @@
+"""
+PDF 일괄 인덱싱 CLI
+- 디렉토리 안의 PDF를 프로세스 풀로 병렬 처리
+- 문서마다 하나의 인덱스를 <인덱스 루트>/<문서 ID>/ 에 저장
+- 같은 해시/설정으로 이미 인덱싱된 문서는 건너뜀 (중단 후 재실행 시 이어서 처리)
+- 전체 처리량과 단계별 소요 시간 출력
+
+사용 예:
+    python ingest.py manuals/ --workers 4
+    python ingest.py manuals/ --backend free --recursive
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+
+# 워커 프로세스 전역 상태 (initializer에서 설정)
+_worker = {}
+
+
+def find_pdfs(directory: str, recursive: bool = False) -> List[str]:
+    """디렉토리에서 PDF 파일 목록 (정렬됨)"""
+    pdf_paths = []
+    for root, dirs, files in os.walk(directory):
+        pdf_paths.extend(
+            os.path.join(root, filename)
+            for filename in files
+            if filename.lower().endswith('.pdf')
+        )
+        if not recursive:
+            break
+    return sorted(pdf_paths)
+
+
+def _init_worker(backend: str, api_key: str) -> None:
+    """워커 프로세스 초기화 (엔진 클래스는 프로세스당 한 번만 임포트)"""
+    if backend == 'free':
+        from rag_engine_free import RAGEngineFree as engine_class
+    else:
+        from rag_engine import RAGEngine as engine_class
+
+    _worker['engine_class'] = engine_class
+    _worker['api_key'] = api_key
+
+
+def ingest_one(pdf_path: str, index_root: str, chunk_size: int, chunk_overlap: int, force: bool) -> Dict:
+    """PDF 하나를 인덱싱하고 결과와 단계별 시간 반환 (워커 프로세스에서 실행)"""
+    import metrics
+    import index_store
+    from pdf_processor import PDFProcessor, file_sha256
+
+    metrics.start_request_timing()
+    started_at = time.perf_counter()
+    engine_class = _worker['engine_class']
+    index_root = index_root or engine_class.DEFAULT_STORE_PATH
+
+    try:
+        engine = engine_class(_worker['api_key'])
+
+        # 매니페스트가 현재 파일 해시/설정과 일치하면 PDF를 열지 않고 건너뜀
+        manifest = index_store.read_manifest(index_store.index_dir_for(pdf_path, index_root))
+        if not force and index_store.is_index_current(
+            manifest, file_sha256(pdf_path), chunk_size, chunk_overlap, engine.embedding_model_id()
+        ):
+            return {
+                'path': pdf_path,
+                'status': 'skipped',
+                'pages': manifest.get('total_pages', 0),
+                'chunks': manifest.get('total_chunks', 0),
+                'elapsed': time.perf_counter() - started_at,
+                'timings': metrics.get_request_timings()
+            }
+
+        with PDFProcessor(pdf_path) as processor:
+            info = index_store.load_or_build_index(
+                processor, engine, index_root,
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                force=force
+            )
+            pages = processor.total_pages
+
+        return {
+            'path': pdf_path,
+            'status': 'skipped' if info['status'] == 'loaded' else 'indexed',
+            'pages': pages,
+            'chunks': info['total_chunks'],
+            'resumed_batches': info.get('resumed_batches', 0),
+            'fresh_batches': info.get('fresh_batches', 0),
+            'elapsed': time.perf_counter() - started_at,
+            'timings': metrics.get_request_timings()
+        }
+
+    except Exception as e:
+        return {
+            'path': pdf_path,
+            'status': 'failed',
+            'error': f"{type(e).__name__}: {e}",
+            'pages': 0,
+            'chunks': 0,
+            'elapsed': time.perf_counter() - started_at,
+            'timings': metrics.get_request_timings()
+        }
+
+
+def print_summary(results: List[Dict], wall_time: float) -> None:
+    """전체 처리량 및 단계별 소요 시간 요약 출력"""
+    indexed = [r for r in results if r['status'] == 'indexed']
+    skipped = [r for r in results if r['status'] == 'skipped']
+    failed = [r for r in results if r['status'] == 'failed']
+
+    pages = sum(r['pages'] for r in indexed)
+    chunks = sum(r['chunks'] for r in indexed)
+
+    print("\n" + "=" * 50)
+    print("  일괄 인덱싱 결과")
+    print("=" * 50)
+    print(f"문서: 총 {len(results)}개 (인덱싱 {len(indexed)}, 건너뜀 {len(skipped)}, 실패 {len(failed)})")
+    print(f"소요 시간: {wall_time:.1f}초")
+    if wall_time > 0:
+        print(f"처리량: {len(indexed) / wall_time:.2f} 문서/초, "
+              f"{pages / wall_time:.1f} 페이지/초, {chunks / wall_time:.1f} 청크/초")
+
+    resumed = sum(r.get('resumed_batches', 0) for r in indexed)
+    if resumed:
+        fresh = sum(r.get('fresh_batches', 0) for r in indexed)
+        print(f"임베딩 배치: 체크포인트 재사용 {resumed}개, 새로 임베딩 {fresh}개")
+
+    stage_totals: Dict[str, float] = {}
+    stage_counts: Dict[str, int] = {}
+    for result in indexed:
+        for stage, seconds in result['timings']:
+            stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+            stage_counts[stage] = stage_counts.get(stage, 0) + 1
+
+    if stage_totals:
+        print("\n단계별 소요 시간 (인덱싱한 문서 기준, 워커 합산):")
+        for stage, total in sorted(stage_totals.items(), key=lambda item: item[1], reverse=True):
+            print(f"  {stage:<18} 합계 {total:8.2f}초   평균 {total / stage_counts[stage] * 1000:9.1f}ms")
+
+    if failed:
+        print("\n실패한 문서:")
+        for result in failed:
+            print(f"  - {result['path']}: {result['error']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='PDF 디렉토리 일괄 인덱싱')
+    parser.add_argument('directory', help='PDF가 들어 있는 디렉토리')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='프로세스 수')
+    parser.add_argument('--backend', choices=('openai', 'free'), default=os.getenv('RAG_BACKEND', 'openai'))
+    parser.add_argument('--index-root', default=os.getenv('INDEX_ROOT'), help='인덱스 루트 (기본값: 엔진별 저장 경로)')
+    parser.add_argument('--chunk-size', type=int, default=int(os.getenv('CHUNK_SIZE', 1000)))
+    parser.add_argument('--chunk-overlap', type=int, default=int(os.getenv('CHUNK_OVERLAP', 200)))
+    parser.add_argument('--recursive', action='store_true', help='하위 디렉토리까지 검색')
+    parser.add_argument('--force', action='store_true', help='이미 인덱싱된 문서도 다시 처리')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    load_dotenv()
+    args = parse_args(argv)
+
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        print("❌ OPENAI_API_KEY가 설정되지 않았습니다.")
+        return 1
+
+    pdf_paths = find_pdfs(args.directory, args.recursive)
+    if not pdf_paths:
+        print(f"⚠️  '{args.directory}'에서 PDF 파일을 찾지 못했습니다.")
+        return 1
+
+    print(f"[INFO] {len(pdf_paths)}개의 PDF 인덱싱 시작 (워커 {args.workers}개, 백엔드 {args.backend})")
+
+    results = []
+    started_at = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_worker,
+        initargs=(args.backend, api_key)
+    ) as executor:
+        futures = [
+            executor.submit(ingest_one, path, args.index_root, args.chunk_size, args.chunk_overlap, args.force)
+            for path in pdf_paths
+        ]
+        for i, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results.append(result)
+            print(f"  [{i}/{len(pdf_paths)}] {result['status']:<8} {os.path.basename(result['path'])} "
+                  f"({result['pages']}페이지, {result['chunks']}청크, {result['elapsed']:.1f}초)")
+
+    print_summary(results, time.perf_counter() - started_at)
+    return 1 if any(r['status'] == 'failed' for r in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
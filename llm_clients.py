@@ -0,0 +1,302 @@
+"""
+공유 LLM/임베딩 클라이언트 모듈
+- 프로세스 전역 OpenAI 클라이언트 및 임베딩 객체 (HTTP 커넥션 풀/TLS 세션 재사용)
+- 호출 단위 타임아웃 및 재시도 예산(retry budget, 채팅/임베딩 공유)
+- p95 지연 시간을 넘긴 채팅 호출에 대한 선택적 헤지(hedged) 요청
+
+환경 변수:
+- OPENAI_BASE_URL: OpenAI 호환 API 주소 (로컬 스텁 서버 테스트용)
+- OPENAI_TIMEOUT / OPENAI_CONNECT_TIMEOUT: 요청/연결 타임아웃 (초, 기본값 60 / 5)
+- OPENAI_MAX_CONNECTIONS / OPENAI_MAX_KEEPALIVE: 커넥션 풀 크기 (기본값 20 / 10)
+- OPENAI_MAX_RETRIES: 호출당 최대 재시도 횟수 (기본값 2)
+- OPENAI_RETRY_BUDGET_RATIO: 요청 대비 허용 재시도 비율 (기본값 0.2)
+- LLM_HEDGE_ENABLED: 채팅 헤지 요청 사용 여부 (기본값 꺼짐)
+- LLM_HEDGE_PERCENTILE / LLM_HEDGE_MIN_SAMPLES: 헤지 기준 백분위수와 최소 표본 수 (기본값 95 / 20)
+- OPENAI_EMBEDDING_MODEL: 임베딩 모델 (기본값: langchain_openai 기본 모델)
+"""
+import os
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Optional
+
+import httpx
+import openai
+from openai import OpenAI
+
+from metrics import counter, gauge
+
+
+LLM_RETRIES = counter('pdfchat_llm_retries_total', 'LLM 호출 재시도 횟수', ('outcome',))
+LLM_HEDGES = counter('pdfchat_llm_hedges_total', '채팅 헤지 요청 (fired: 발송, won: 헤지가 먼저 응답)', ('outcome',))
+LLM_LATENCY_THRESHOLD = gauge('pdfchat_llm_hedge_threshold_seconds', '현재 헤지 기준 지연 시간')
+
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError
+)
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+class RetryBudget:
+    """
+    재시도 예산
+
+    요청마다 ratio만큼 토큰이 쌓이고 재시도마다 1개를 소모합니다.
+    장애 상황에서 재시도가 요청량의 일정 비율을 넘어 부하를 키우는 것을 막습니다.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_tokens: float = 3.0, max_tokens: float = 20.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = min_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+    @property
+    def tokens(self) -> float:
+        return self._tokens
+
+
+class LatencyTracker:
+    """최근 호출 지연 시간 기록 및 백분위수 계산"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """표본이 부족하면 None"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * p / 100))
+        return ordered[index]
+
+
+_http_client = None
+_openai_clients: Dict[str, OpenAI] = {}
+_openai_embeddings: Dict[tuple, object] = {}
+_budgeted_embeddings_class = None
+_hedge_executor = None
+_lock = threading.Lock()
+
+retry_budget = RetryBudget(ratio=_env_float('OPENAI_RETRY_BUDGET_RATIO', 0.2))
+chat_latency = LatencyTracker(min_samples=int(os.getenv('LLM_HEDGE_MIN_SAMPLES', 20)))
+
+
+def get_http_client() -> httpx.Client:
+    """커넥션 풀을 공유하는 프로세스 전역 HTTP 클라이언트"""
+    global _http_client
+
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=int(os.getenv('OPENAI_MAX_CONNECTIONS', 20)),
+                    max_keepalive_connections=int(os.getenv('OPENAI_MAX_KEEPALIVE', 10)),
+                    keepalive_expiry=60.0
+                ),
+                timeout=_timeout()
+            )
+        return _http_client
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        _env_float('OPENAI_TIMEOUT', 60.0),
+        connect=_env_float('OPENAI_CONNECT_TIMEOUT', 5.0)
+    )
+
+
+def get_openai_client(api_key: str) -> OpenAI:
+    """
+    API 키별 공유 OpenAI 클라이언트
+
+    SDK 내부 재시도는 끄고(max_retries=0) call_with_retry_budget()에서 재시도 예산과 함께 처리합니다.
+    """
+    client = _openai_clients.get(api_key)
+    if client is None:
+        http_client = get_http_client()
+        with _lock:
+            client = _openai_clients.get(api_key)
+            if client is None:
+                client = OpenAI(
+                    api_key=api_key,
+                    base_url=os.getenv('OPENAI_BASE_URL') or None,
+                    http_client=http_client,
+                    timeout=_timeout(),
+                    max_retries=0
+                )
+                _openai_clients[api_key] = client
+    return client
+
+
+def supports_native_dimensions(model: Optional[str]) -> bool:
+    """요청 시 축소된 차원(dimensions)을 지원하는 임베딩 모델인지 확인 (text-embedding-3 계열)"""
+    return bool(model) and model.startswith('text-embedding-3')
+
+
+def _get_budgeted_embeddings_class():
+    """재시도를 SDK 대신 공유 재시도 예산으로 처리하는 OpenAIEmbeddings 하위 클래스 (최초 호출 시 생성)"""
+    global _budgeted_embeddings_class
+
+    if _budgeted_embeddings_class is None:
+        from langchain_openai import OpenAIEmbeddings
+
+        class BudgetedOpenAIEmbeddings(OpenAIEmbeddings):
+            def embed_documents(self, texts, *args, **kwargs):
+                return call_with_retry_budget(super().embed_documents, texts, *args, **kwargs)
+
+            def embed_query(self, text, *args, **kwargs):
+                return call_with_retry_budget(super().embed_query, text, *args, **kwargs)
+
+        _budgeted_embeddings_class = BudgetedOpenAIEmbeddings
+    return _budgeted_embeddings_class
+
+
+def get_openai_embeddings(api_key: str, dimensions: Optional[int] = None):
+    """
+    API 키/차원별 공유 OpenAIEmbeddings (공유 HTTP 커넥션 풀, 채팅과 같은 재시도 예산 사용)
+    
+    Args:
+        api_key: OpenAI API 키
+        dimensions: 모델에 요청할 축소 차원 (text-embedding-3 계열만 지원, None이면 전체 차원)
+    """
+    key = (api_key, dimensions)
+    embeddings = _openai_embeddings.get(key)
+    if embeddings is None:
+        embeddings_class = _get_budgeted_embeddings_class()
+        http_client = get_http_client()
+        options = {}
+        if os.getenv('OPENAI_EMBEDDING_MODEL'):
+            options['model'] = os.getenv('OPENAI_EMBEDDING_MODEL')
+        if dimensions:
+            options['dimensions'] = dimensions
+        with _lock:
+            embeddings = _openai_embeddings.get(key)
+            if embeddings is None:
+                embeddings = embeddings_class(
+                    openai_api_key=api_key,
+                    openai_api_base=os.getenv('OPENAI_BASE_URL') or None,
+                    http_client=http_client,
+                    request_timeout=_env_float('OPENAI_TIMEOUT', 60.0),
+                    max_retries=0,
+                    **options
+                )
+                _openai_embeddings[key] = embeddings
+    return embeddings
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    global _hedge_executor
+
+    with _lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='llm-hedge')
+        return _hedge_executor
+
+
+def _timed_create(client, kwargs: Dict):
+    started_at = time.perf_counter()
+    response = client.chat.completions.create(**kwargs)
+    chat_latency.observe(time.perf_counter() - started_at)
+    return response
+
+
+def _hedged_create(client, kwargs: Dict):
+    """p95 지연 시간 안에 응답이 없으면 같은 요청을 한 번 더 보내고 먼저 온 응답 사용"""
+    threshold = None
+    if os.getenv('LLM_HEDGE_ENABLED', '').lower() in ('1', 'true', 'yes'):
+        threshold = chat_latency.percentile(_env_float('LLM_HEDGE_PERCENTILE', 95))
+
+    if threshold is None:
+        return _timed_create(client, kwargs)
+
+    LLM_LATENCY_THRESHOLD.set(threshold)
+    executor = _get_hedge_executor()
+    primary = executor.submit(_timed_create, client, kwargs)
+    done, _ = wait([primary], timeout=threshold)
+    if done:
+        return primary.result()
+
+    LLM_HEDGES.inc(outcome='fired')
+    hedge = executor.submit(_timed_create, client, kwargs)
+    pending = {primary, hedge}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is hedge:
+                    LLM_HEDGES.inc(outcome='won')
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def call_with_retry_budget(fn, *args, **kwargs):
+    """
+    재시도 가능한 오류(타임아웃, 연결 오류, 429, 5xx)에 대해 공유 재시도 예산 안에서 지수 백오프로 재호출
+
+    Args:
+        fn: 호출할 함수 (채팅 완성, 임베딩)
+        *args, **kwargs: fn 인자
+
+    Returns:
+        fn의 반환값
+    """
+    retry_budget.deposit()
+    max_retries = int(os.getenv('OPENAI_MAX_RETRIES', 2))
+    attempt = 0
+
+    while True:
+        try:
+            return fn(*args, **kwargs)
+        except RETRYABLE_ERRORS:
+            if attempt >= max_retries:
+                LLM_RETRIES.inc(outcome='exhausted_attempts')
+                raise
+            if not retry_budget.withdraw():
+                LLM_RETRIES.inc(outcome='exhausted_budget')
+                raise
+            attempt += 1
+            LLM_RETRIES.inc(outcome='retried')
+            time.sleep(min(8.0, 0.5 * 2 ** (attempt - 1)) * (0.5 + random.random()))
+
+
+def chat_completion(client, **kwargs):
+    """
+    채팅 완성 호출 (재시도 예산 + 선택적 헤지 요청)
+
+    Args:
+        client: OpenAI 호환 클라이언트
+        **kwargs: chat.completions.create 인자
+
+    Returns:
+        ChatCompletion 응답
+    """
+    return call_with_retry_budget(_hedged_create, client, kwargs)
@@ -0,0 +1,270 @@
+"""
+부하 테스트 드라이버
+- 실행 중인 앱(app.py)에 업로드 / PDF 로드 / 질의 요청을 비율대로 섞어 동시에 전송
+- 엔드포인트별 처리량, 오류율, 부하 차단(429/503) 비율, 지연 시간 백분위수(p50/p95/p99) 보고
+- 결과를 JSON으로 저장
+
+OpenAI 호출은 stub_openai_server.py로 대체하여 외부 API 비용/변동 없이 측정합니다:
+    python stub_openai_server.py --port 8001 &
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=stub gunicorn -c gunicorn.conf.py app:app &
+    python loadtest.py --base-url http://127.0.0.1:5000 --concurrency 16 --duration 60
+
+사용 예:
+    python loadtest.py --mix query=0.9,load_pdf=0.08,upload=0.02 --concurrency 32
+    python loadtest.py --conversation --output loadtest.json
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import tempfile
+import threading
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+import httpx
+
+from benchmark import SAMPLE_QUESTIONS, generate_synthetic_pdf
+
+
+FOLLOW_UP_QUESTIONS = [
+    "그럼 다음 단계는?",
+    "What about step 4?",
+    "그것은 어떻게 확인하나요?",
+]
+
+OPERATIONS = ('upload', 'load_pdf', 'query')
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """'query=0.9,load_pdf=0.08,upload=0.02' 형식의 요청 비율 파싱"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"알 수 없는 요청 종류입니다: {name} ({', '.join(OPERATIONS)})")
+        mix[name] = float(weight)
+    if sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("요청 비율의 합이 0보다 커야 합니다.")
+    return mix
+
+
+def percentile(values: List[float], p: float) -> float:
+    """최근접 순위 방식 백분위수"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(len(ordered) * p / 100) - 1))
+    return ordered[index]
+
+
+class LoadTest:
+    """가상 사용자들이 요청 비율대로 앱을 호출하며 결과를 기록"""
+
+    def __init__(self, args):
+        self.args = args
+        self.mix = args.mix
+        self.client = httpx.Client(
+            base_url=args.base_url,
+            timeout=args.timeout,
+            limits=httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        )
+        self.pdf_paths: List[str] = []
+        self.samples = defaultdict(list)  # 엔드포인트 -> [(상태 코드, 지연 시간)]
+        self.lock = threading.Lock()
+
+    def prepare_documents(self, workdir: str) -> None:
+        """업로드할 합성 PDF 생성 (또는 지정된 PDF 사용) 후 하나를 미리 업로드"""
+        if self.args.pdf:
+            self.pdf_paths = list(self.args.pdf)
+        else:
+            for i in range(self.args.documents):
+                path = os.path.join(workdir, f"loadtest_{i + 1}.pdf")
+                generate_synthetic_pdf(path, self.args.pages, seed=self.args.seed + i)
+                self.pdf_paths.append(path)
+
+        # 질의가 처음부터 가능하도록 준비 단계에서 업로드 (결과에는 포함하지 않음)
+        for path in self.pdf_paths:
+            response = self._upload(path)
+            if response.status_code != 200:
+                raise RuntimeError(f"준비 단계 업로드 실패 ({response.status_code}): {response.text[:200]}")
+
+    def _upload(self, path: str) -> httpx.Response:
+        with open(path, 'rb') as f:
+            return self.client.post(
+                '/api/upload',
+                files={'file': (os.path.basename(path), f, 'application/pdf')}
+            )
+
+    def _record(self, endpoint: str, status: int, elapsed: float) -> None:
+        with self.lock:
+            self.samples[endpoint].append((status, elapsed))
+
+    def _request(self, endpoint: str, func) -> None:
+        started_at = time.perf_counter()
+        retry_after = None
+        try:
+            response = func()
+            status = response.status_code
+            retry_after = response.headers.get('Retry-After')
+        except httpx.HTTPError:
+            status = 0  # 연결 실패/타임아웃
+        self._record(endpoint, status, time.perf_counter() - started_at)
+
+        # 거절되면 실제 클라이언트처럼 Retry-After 만큼 기다린 뒤 다음 요청
+        if status in (429, 503) and self.args.max_backoff > 0:
+            time.sleep(min(float(retry_after or 1), self.args.max_backoff))
+
+    def run_user(self, user_id: int, deadline: float, budget: List[int]) -> None:
+        """가상 사용자 1명의 요청 루프"""
+        rng = random.Random(self.args.seed * 1000 + user_id)
+        operations = list(self.mix)
+        weights = [self.mix[name] for name in operations]
+        session_id = str(uuid.uuid4()) if self.args.conversation else None
+
+        while time.perf_counter() < deadline:
+            with self.lock:
+                if budget[0] <= 0:
+                    return
+                budget[0] -= 1
+
+            operation = rng.choices(operations, weights)[0]
+            path = rng.choice(self.pdf_paths)
+
+            if operation == 'upload':
+                self._request('/api/upload', lambda: self._upload(path))
+            elif operation == 'load_pdf':
+                filename = os.path.basename(path)
+                self._request('/api/load-pdf', lambda: self.client.post(
+                    '/api/load-pdf', json={'filename': filename}
+                ))
+            else:
+                questions = SAMPLE_QUESTIONS + (FOLLOW_UP_QUESTIONS if session_id else [])
+                payload = {'question': rng.choice(questions)}
+                if session_id:
+                    payload['session_id'] = session_id
+                self._request('/api/query', lambda: self.client.post('/api/query', json=payload))
+
+            if self.args.think_time > 0:
+                time.sleep(rng.uniform(0, 2 * self.args.think_time))
+
+    def run(self) -> Dict:
+        budget = [self.args.requests or sys.maxsize]
+        started_at = time.perf_counter()
+        deadline = started_at + self.args.duration
+
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as executor:
+            for user_id in range(self.args.concurrency):
+                executor.submit(self.run_user, user_id, deadline, budget)
+
+        return self.report(time.perf_counter() - started_at)
+
+    def report(self, wall_time: float) -> Dict:
+        """엔드포인트별 처리량/오류율/지연 시간 요약"""
+        endpoints = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            latencies = [elapsed for _, elapsed in samples]
+            ok = [elapsed for status, elapsed in samples if 200 <= status < 400]
+            shed = sum(1 for status, _ in samples if status in (429, 503))
+            errors = sum(1 for status, _ in samples if status == 0 or (status >= 400 and status not in (429, 503)))
+            endpoints[endpoint] = {
+                'requests': len(samples),
+                'throughput_rps': len(samples) / wall_time if wall_time else 0.0,
+                'success_rps': len(ok) / wall_time if wall_time else 0.0,
+                'error_rate': errors / len(samples),
+                'shed_rate': shed / len(samples),
+                'status_codes': {
+                    str(code): sum(1 for status, _ in samples if status == code)
+                    for code in sorted({status for status, _ in samples})
+                },
+                'latency': {
+                    'p50': percentile(latencies, 50),
+                    'p95': percentile(latencies, 95),
+                    'p99': percentile(latencies, 99),
+                    'max': max(latencies)
+                }
+            }
+
+        total = sum(endpoint['requests'] for endpoint in endpoints.values())
+        return {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'base_url': self.args.base_url,
+                'concurrency': self.args.concurrency,
+                'duration': round(wall_time, 3),
+                'mix': self.mix,
+                'conversation': self.args.conversation,
+                'documents': [os.path.basename(path) for path in self.pdf_paths]
+            },
+            'total': {
+                'requests': total,
+                'throughput_rps': total / wall_time if wall_time else 0.0
+            },
+            'endpoints': endpoints
+        }
+
+
+def print_report(report: Dict) -> None:
+    meta = report['meta']
+    print("\n" + "=" * 92)
+    print(f"  부하 테스트 결과 (동시 사용자 {meta['concurrency']}, {meta['duration']:.1f}초, "
+          f"총 {report['total']['requests']}건, {report['total']['throughput_rps']:.2f} req/s)")
+    print("=" * 92)
+    print(f"{'endpoint':<16}{'requests':>9}{'req/s':>9}{'ok/s':>9}{'error':>8}{'shed':>8}"
+          f"{'p50':>10}{'p95':>10}{'p99':>10}")
+    for endpoint, stats in report['endpoints'].items():
+        latency = stats['latency']
+        print(f"{endpoint:<16}{stats['requests']:>9}{stats['throughput_rps']:>9.2f}{stats['success_rps']:>9.2f}"
+              f"{stats['error_rate']:>8.1%}{stats['shed_rate']:>8.1%}"
+              f"{latency['p50'] * 1000:>8.0f}ms{latency['p95'] * 1000:>8.0f}ms{latency['p99'] * 1000:>8.0f}ms")
+    print("\n(error: 연결 실패 및 429/503 이외의 4xx/5xx, shed: 수락 제어로 거절된 429/503)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='PDF 챗봇 부하 테스트')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000', help='앱 주소')
+    parser.add_argument('--concurrency', type=int, default=8, help='동시 가상 사용자 수')
+    parser.add_argument('--duration', type=float, default=30.0, help='측정 시간 (초)')
+    parser.add_argument('--requests', type=int, default=0, help='최대 요청 수 (0이면 시간으로만 제한)')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('query=0.9,load_pdf=0.08,upload=0.02'),
+                        help='요청 비율 (예: query=0.9,load_pdf=0.08,upload=0.02)')
+    parser.add_argument('--pdf', action='append', help='업로드할 PDF (여러 번 지정 가능, 기본값: 합성 PDF)')
+    parser.add_argument('--documents', type=int, default=2, help='생성할 합성 PDF 수')
+    parser.add_argument('--pages', type=int, default=20, help='합성 PDF 페이지 수')
+    parser.add_argument('--conversation', action='store_true', help='사용자별 session_id로 대화 모드 질의')
+    parser.add_argument('--think-time', type=float, default=0.0, help='요청 사이 평균 대기 시간 (초)')
+    parser.add_argument('--timeout', type=float, default=300.0, help='요청 타임아웃 (초)')
+    parser.add_argument('--max-backoff', type=float, default=5.0,
+                        help='429/503 응답 시 Retry-After를 따르는 최대 대기 시간 (초, 0이면 즉시 다음 요청)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    load_test = LoadTest(args)
+
+    with tempfile.TemporaryDirectory(prefix='pdfchat_loadtest_') as workdir:
+        print(f"[INFO] 준비 중: 문서 업로드 ({args.base_url})")
+        load_test.prepare_documents(workdir)
+        print(f"[INFO] 부하 테스트 시작: 동시 사용자 {args.concurrency}, {args.duration:.0f}초, 비율 {args.mix}")
+        report = load_test.run()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n[OK] 결과가 {args.output}에 저장되었습니다.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""
+성능 지표 수집 모듈
+- 단계별 지연 시간 히스토그램 및 카운터
+- Prometheus 텍스트 포맷 출력 (/metrics)
+- 요청 단위 단계별 소요 시간 수집 (Server-Timing 헤더용)
+
+외부 의존성 없이 동작하며, 값은 프로세스(워커) 단위로 집계됩니다.
+"""
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0
+)
+
+
+def _format_labels(labelnames: Tuple[str, ...], labelvalues: Tuple[str, ...], extra: str = '') -> str:
+    """라벨을 Prometheus 포맷 문자열로 변환"""
+    parts = []
+    for name, value in zip(labelnames, labelvalues):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{escaped}"')
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """지표 공통 기능 (라벨별 값 관리)"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def remove(self, **labels) -> None:
+        """라벨 조합 삭제 (대상이 사라진 뒤 마지막 값이 계속 노출되지 않도록)"""
+        with self._lock:
+            self._values.pop(self._key(labels), None)
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}"
+        ]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """단조 증가 카운터"""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    """임의로 증감 가능한 게이지"""
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Histogram(_Metric):
+    """누적 버킷 히스토그램"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def _render_value(self, key, state) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, state['counts']):
+            cumulative += count
+            le = 'le="' + _format_value(bound) + '"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+        lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+class Registry:
+    """지표 등록소"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+              buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# 공통 지표
+STAGE_SECONDS = histogram(
+    'pdfchat_stage_duration_seconds', '파이프라인 단계별 소요 시간', ('stage',)
+)
+STAGE_ERRORS = counter(
+    'pdfchat_stage_errors_total', '파이프라인 단계별 오류 횟수', ('stage',)
+)
+HTTP_REQUESTS = counter(
+    'pdfchat_http_requests_total', 'HTTP 요청 수', ('endpoint', 'method', 'status')
+)
+HTTP_SECONDS = histogram(
+    'pdfchat_http_request_duration_seconds', 'HTTP 요청 처리 시간', ('endpoint',)
+)
+LLM_TOKENS = counter(
+    'pdfchat_llm_tokens_total', 'LLM 토큰 사용량', ('model', 'kind')
+)
+CACHE_REQUESTS = counter(
+    'pdfchat_cache_requests_total', '캐시 조회 수', ('cache', 'result')
+)
+INDEX_VECTORS = gauge(
+    'pdfchat_index_vectors', '현재 로드된 인덱스의 벡터 수', ('source',)
+)
+INDEX_DIMENSIONS = gauge(
+    'pdfchat_index_dimensions', '현재 로드된 인덱스의 벡터 차원', ('source',)
+)
+EMBEDDING_THROUGHPUT = gauge(
+    'pdfchat_embedding_chunks_per_second', '마지막 문서 임베딩 처리량 (청크/초)', ('model',)
+)
+PAGES_PROCESSED = counter(
+    'pdfchat_pages_processed_total', '텍스트를 추출한 PDF 페이지 수'
+)
+
+
+# 요청 단위 단계별 소요 시간 (Server-Timing 헤더용)
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar(
+    'pdfchat_request_timings', default=None
+)
+
+
+def start_request_timing() -> None:
+    """현재 컨텍스트에서 요청 단위 시간 수집 시작"""
+    _request_timings.set([])
+
+
+def get_request_timings() -> List[Tuple[str, float]]:
+    """현재 요청에서 수집된 (단계, 초) 리스트"""
+    return list(_request_timings.get() or [])
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """단계 소요 시간 기록"""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """
+    단계 소요 시간 측정 컨텍스트 매니저
+
+    사용 예:
+        with stage_timer('vector_search'):
+            ...
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """캐시 적중/실패 기록"""
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def record_token_usage(model: str, usage) -> None:
+    """OpenAI 응답의 usage 객체로부터 토큰 사용량 기록"""
+    if usage is None:
+        return
+    for kind in ('prompt_tokens', 'completion_tokens', 'total_tokens'):
+        value = getattr(usage, kind, None)
+        if value:
+            LLM_TOKENS.inc(value, model=model, kind=kind.replace('_tokens', ''))
+    cached = getattr(getattr(usage, 'prompt_tokens_details', None), 'cached_tokens', None)
+    if cached:
+        LLM_TOKENS.inc(cached, model=model, kind='cached')
+
+
+def server_timing_header(total_seconds: Optional[float] = None) -> str:
+    """수집된 단계 시간을 Server-Timing 헤더 값으로 변환 (같은 단계는 합산)"""
+    totals: Dict[str, float] = {}
+    for stage, seconds in get_request_timings():
+        totals[stage] = totals.get(stage, 0.0) + seconds
+
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items()]
+    if total_seconds is not None:
+        entries.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ', '.join(entries)
+
+
+def render_prometheus() -> str:
+    """Prometheus 텍스트 포맷으로 모든 지표 출력"""
+    return REGISTRY.render()
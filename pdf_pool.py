@@ -0,0 +1,169 @@
+"""
+PDF 문서 핸들 풀
+- 프로세스 전역으로 열린 fitz.Document 핸들 수와 메모리(파일 크기 기준 추정)를 제한
+- 사용하지 않는 핸들부터 LRU 순서로 닫음 (사용 중인 핸들은 닫지 않음)
+- 닫힌 핸들이나 파일이 바뀐 핸들은 다음 접근 시 자동으로 다시 열림
+- 같은 문서에 대한 접근은 핸들 단위로 직렬화 (PyMuPDF 문서 객체는 스레드 안전하지 않음)
+
+환경 변수:
+- PDF_POOL_MAX_HANDLES: 동시에 열어 둘 최대 핸들 수 (기본값 16)
+- PDF_POOL_MAX_MB: 열린 PDF 파일 크기 합계 상한 (MB, 기본값 512)
+"""
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import fitz  # PyMuPDF
+
+from metrics import counter, gauge, record_cache
+
+
+PDF_HANDLES_OPEN = gauge('pdfchat_pdf_handles_open', '열려 있는 PDF 핸들 수')
+PDF_HANDLES_BYTES = gauge('pdfchat_pdf_handles_bytes', '열려 있는 PDF 파일 크기 합계 (바이트)')
+PDF_HANDLE_EVENTS = counter(
+    'pdfchat_pdf_handle_events_total', 'PDF 핸들 이벤트 (open, evict, reopen)', ('event',)
+)
+
+
+class _Handle:
+    """열린 문서 핸들과 사용 상태"""
+
+    def __init__(self, path: str, doc, stat: os.stat_result):
+        self.path = path
+        self.doc = doc
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.pins = 0
+        self.lock = threading.RLock()
+
+
+class DocumentPool:
+    """LRU 방식으로 열린 PDF 핸들 수와 메모리를 제한하는 풀"""
+
+    def __init__(self, max_handles: int = 16, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Args:
+            max_handles: 동시에 열어 둘 최대 핸들 수
+            max_bytes: 열린 PDF 파일 크기 합계 상한 (바이트)
+        """
+        self.max_handles = max(1, max_handles)
+        self.max_bytes = max_bytes
+        self._handles: "OrderedDict[str, _Handle]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def document(self, pdf_path: str):
+        """
+        문서 핸들 대여 (with 블록 동안 닫히지 않으며 같은 문서 접근은 직렬화됨)
+
+        Args:
+            pdf_path: PDF 파일 경로
+
+        Yields:
+            fitz.Document: 열린 문서
+        """
+        handle = self._pin(os.path.abspath(pdf_path))
+        try:
+            with handle.lock:
+                yield handle.doc
+        finally:
+            with self._lock:
+                handle.pins -= 1
+                if handle.pins == 0 and self._handles.get(handle.path) is not handle:
+                    # 파일 교체로 목록에서 분리된 핸들은 마지막 반납 시 닫음
+                    handle.doc.close()
+                self._evict_locked()
+
+    def _pin(self, path: str) -> _Handle:
+        stat = os.stat(path)
+
+        with self._lock:
+            handle = self._handles.get(path)
+            if handle is not None and (handle.size, handle.mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+                # 파일이 교체됨: 사용 중이 아니면 닫고, 사용 중이면 목록에서만 분리
+                del self._handles[path]
+                if handle.pins == 0:
+                    handle.doc.close()
+                handle = None
+                PDF_HANDLE_EVENTS.inc(event='reopen')
+
+            if handle is not None:
+                self._handles.move_to_end(path)
+                handle.pins += 1
+                record_cache('pdf_handle', hit=True)
+                return handle
+
+        record_cache('pdf_handle', hit=False)
+        doc = fitz.open(path)
+
+        with self._lock:
+            # 다른 스레드가 먼저 열었으면 그 핸들을 사용
+            handle = self._handles.get(path)
+            if handle is not None:
+                doc.close()
+            else:
+                handle = _Handle(path, doc, stat)
+                self._handles[path] = handle
+                PDF_HANDLE_EVENTS.inc(event='open')
+            self._handles.move_to_end(path)
+            handle.pins += 1
+            self._evict_locked()
+            return handle
+
+    def _evict_locked(self) -> None:
+        """상한을 넘으면 사용 중이 아닌 핸들을 오래된 순서로 닫음 (self._lock 보유 상태)"""
+        total_bytes = sum(handle.size for handle in self._handles.values())
+
+        for path in list(self._handles):
+            if len(self._handles) <= self.max_handles and total_bytes <= self.max_bytes:
+                break
+            handle = self._handles[path]
+            if handle.pins > 0:
+                continue
+            del self._handles[path]
+            handle.doc.close()
+            total_bytes -= handle.size
+            PDF_HANDLE_EVENTS.inc(event='evict')
+
+        PDF_HANDLES_OPEN.set(len(self._handles))
+        PDF_HANDLES_BYTES.set(total_bytes)
+
+    def close(self, pdf_path: str) -> None:
+        """사용 중이 아닌 문서 핸들 닫기 (다음 접근 시 다시 열림)"""
+        path = os.path.abspath(pdf_path)
+        with self._lock:
+            handle = self._handles.get(path)
+            if handle is not None and handle.pins == 0:
+                del self._handles[path]
+                handle.doc.close()
+            self._evict_locked()
+
+    def stats(self) -> Dict:
+        """열린 핸들 수, 파일 크기 합계, 사용 중인 핸들 수"""
+        with self._lock:
+            return {
+                'open_handles': len(self._handles),
+                'open_bytes': sum(handle.size for handle in self._handles.values()),
+                'pinned_handles': sum(1 for handle in self._handles.values() if handle.pins > 0),
+                'max_handles': self.max_handles,
+                'max_bytes': self.max_bytes
+            }
+
+
+_pool: Optional[DocumentPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_document_pool() -> DocumentPool:
+    """프로세스 전역 문서 핸들 풀"""
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = DocumentPool(
+                max_handles=int(os.getenv('PDF_POOL_MAX_HANDLES', 16)),
+                max_bytes=int(float(os.getenv('PDF_POOL_MAX_MB', 512)) * 1024 * 1024)
+            )
+        return _pool
@@ -3,61 +3,205 @@ PDF 처리 모듈
 - PDF에서 텍스트 추출 및 청킹
 - 페이지별 이미지 렌더링
 - 메타데이터 관리 (페이지 번호 등)
+- 페이지 텍스트 사이드카 캐시 (재청킹/페이지 정보 조회 시 PDF 재파싱 방지)
+- PDF 핸들은 프로세스 전역 풀에서 대여 (열린 핸들 수/메모리 제한, 필요 시 자동 재오픈)
+- 점진적 페이지 미리보기 (인라인 자리표시자 -> 썸네일 -> 원본 해상도)
 """
 import fitz  # PyMuPDF
 import os
-from typing import List, Dict, Tuple
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import gzip
+import json
+import base64
+import hashlib
+from typing import List, Dict, Tuple, Optional
+from metrics import stage_timer, record_cache, PAGES_PROCESSED
+from pdf_pool import get_document_pool
+from dedup import DEDUP_THRESHOLD, collapse_near_duplicates
+
+
+SIDECAR_VERSION = 1
+SIDECAR_SUFFIX = '.pages.json.gz'
+
+PAGE_IMAGE_DIR = os.getenv('PAGE_IMAGE_DIR', 'static/page_images')  # 영구 디스크에 두려면 업로드 폴더 아래로 지정
+
+# 페이지 이미지 크기별 해상도 (점진적 미리보기: 썸네일 -> 중간 -> 원본)
+PAGE_IMAGE_DPI = {'thumb': 48, 'medium': 96, 'full': 150}
+PLACEHOLDER_WIDTH = 24  # 자리표시자 가로 픽셀 수
+
+
+def file_sha256(path: str) -> str:
+    """파일 내용의 SHA-256 해시"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
 
 class PDFProcessor:
     """PDF 파일 처리 클래스"""
     
-    def __init__(self, pdf_path: str):
+    def __init__(self, pdf_path: str, sidecar_dir: Optional[str] = None, pool=None):
         """
         Args:
             pdf_path: PDF 파일 경로
+            sidecar_dir: 페이지 텍스트 사이드카 저장 디렉토리 (기본값: PDF와 같은 디렉토리)
+            pool: 사용할 문서 핸들 풀 (기본값: 프로세스 전역 풀)
         """
         self.pdf_path = pdf_path
-        self.doc = fitz.open(pdf_path)
-        self.total_pages = len(self.doc)
+        self.pool = pool or get_document_pool()
+        stat = os.stat(pdf_path)
+        self._file_signature = (stat.st_size, stat.st_mtime_ns)
+        with self.pool.document(pdf_path) as doc:
+            self.total_pages = len(doc)
+        self.sidecar_path = os.path.join(
+            sidecar_dir or os.path.dirname(pdf_path) or '.',
+            os.path.basename(pdf_path) + SIDECAR_SUFFIX
+        )
+        self._sidecar = None
+        self._placeholders = {}
         
     def extract_text_with_pages(self) -> List[Dict]:
         """
-        PDF에서 페이지별로 텍스트 추출
+        PDF에서 페이지별로 텍스트 추출 (사이드카가 유효하면 재파싱하지 않음)
         
         Returns:
             List[Dict]: 각 페이지의 텍스트와 페이지 번호를 포함한 딕셔너리 리스트
         """
-        pages_data = []
+        return [
+            {
+                'page_number': page['page_number'],
+                'text': page['text'],
+                'char_count': page['char_count']
+            }
+            for page in self._load_sidecar()['pages']
+        ]
+    
+    def is_stale(self) -> bool:
+        """이 프로세서를 만든 뒤 같은 경로의 PDF가 바뀌었는지 (크기/수정 시각 비교, 없어졌으면 True)"""
+        try:
+            stat = os.stat(self.pdf_path)
+        except FileNotFoundError:
+            return True
+        return (stat.st_size, stat.st_mtime_ns) != self._file_signature
+    
+    @property
+    def file_hash(self) -> str:
+        """PDF 파일의 SHA-256 해시 (사이드카에 저장된 값 재사용)"""
+        return self._load_sidecar()['file_sha256']
+    
+    def _load_sidecar(self) -> Dict:
+        """
+        페이지 텍스트 사이드카 로드 (없거나 PDF가 바뀌었으면 새로 생성)
         
-        for page_num in range(self.total_pages):
-            page = self.doc[page_num]
-            text = page.get_text()
-            
-            pages_data.append({
-                'page_number': page_num + 1,  # 1부터 시작
-                'text': text,
-                'char_count': len(text)
-            })
+        사이드카에는 페이지별 텍스트, 해시, 통계와 PDF 파일 해시가 저장됩니다.
+        """
+        if self._sidecar is not None:
+            return self._sidecar
+        
+        stat = os.stat(self.pdf_path)
+        sidecar = self._read_sidecar()
+        
+        if sidecar is not None and sidecar['file_size'] == stat.st_size:
+            if sidecar['file_mtime_ns'] == stat.st_mtime_ns:
+                record_cache('page_text_sidecar', hit=True)
+                self._sidecar = sidecar
+                return sidecar
             
-        return pages_data
+            # 수정 시각만 바뀐 경우 (복사 등) 내용 해시로 재확인
+            if sidecar['file_sha256'] == file_sha256(self.pdf_path):
+                record_cache('page_text_sidecar', hit=True)
+                sidecar['file_mtime_ns'] = stat.st_mtime_ns
+                self._write_sidecar(sidecar)
+                self._sidecar = sidecar
+                return sidecar
+        
+        record_cache('page_text_sidecar', hit=False)
+        self._sidecar = self._build_sidecar(stat)
+        self._write_sidecar(self._sidecar)
+        return self._sidecar
+    
+    def _build_sidecar(self, stat: os.stat_result) -> Dict:
+        """PDF를 파싱하여 페이지 텍스트 사이드카 생성"""
+        pages = []
+        
+        with stage_timer('text_extraction'), self.pool.document(self.pdf_path) as doc:
+            for page_num in range(self.total_pages):
+                page = doc[page_num]
+                text = page.get_text()
+                
+                pages.append({
+                    'page_number': page_num + 1,  # 1부터 시작
+                    'text': text,
+                    'char_count': len(text),
+                    'word_count': len(text.split()),
+                    'image_count': len(page.get_images()),
+                    'sha1': hashlib.sha1(text.encode('utf-8')).hexdigest()
+                })
+        PAGES_PROCESSED.inc(self.total_pages)
+        
+        return {
+            'version': SIDECAR_VERSION,
+            'source': os.path.basename(self.pdf_path),
+            'file_size': stat.st_size,
+            'file_mtime_ns': stat.st_mtime_ns,
+            'file_sha256': file_sha256(self.pdf_path),
+            'total_pages': self.total_pages,
+            'total_chars': sum(page['char_count'] for page in pages),
+            'empty_pages': sum(1 for page in pages if not page['text'].strip()),
+            'pages': pages
+        }
+    
+    def _read_sidecar(self) -> Optional[Dict]:
+        """사이드카 파일 읽기 (없거나 손상/구버전이면 None)"""
+        if not os.path.exists(self.sidecar_path):
+            return None
+        try:
+            with gzip.open(self.sidecar_path, 'rt', encoding='utf-8') as f:
+                sidecar = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if sidecar.get('version') != SIDECAR_VERSION or sidecar.get('total_pages') != self.total_pages:
+            return None
+        return sidecar
+    
+    def _write_sidecar(self, sidecar: Dict) -> None:
+        """사이드카 파일 저장 (임시 파일에 쓴 뒤 교체)"""
+        os.makedirs(os.path.dirname(self.sidecar_path) or '.', exist_ok=True)
+        tmp_path = f"{self.sidecar_path}.{os.getpid()}.tmp"
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+                json.dump(sidecar, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.sidecar_path)
+        except OSError as e:
+            # 읽기 전용 디스크 등: 캐시 없이 계속 진행
+            print(f"[WARN] 페이지 텍스트 사이드카 저장 실패: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
     
     def create_chunks_with_metadata(
         self, 
         chunk_size: int = 1000, 
-        chunk_overlap: int = 200
+        chunk_overlap: int = 200,
+        dedup_threshold: float = DEDUP_THRESHOLD
     ) -> List[Dict]:
         """
         텍스트를 청크로 분할하고 메타데이터(페이지 번호) 포함
         
+        페이지마다 반복되는 머리글/경고문 등 거의 같은 청크는 하나로 합치고
+        나타난 페이지 목록을 pages에 기록합니다.
+        
         Args:
             chunk_size: 각 청크의 최대 크기
             chunk_overlap: 청크 간 겹치는 부분의 크기
+            dedup_threshold: 중복으로 합칠 추정 Jaccard 유사도 (0이면 합치지 않음)
             
         Returns:
-            List[Dict]: 청크 텍스트와 메타데이터를 포함한 딕셔너리 리스트
+            List[Dict]: 청크 텍스트와 메타데이터(page_number: 첫 페이지, pages: 전체 페이지)를 포함한 딕셔너리 리스트
         """
+        # LangChain은 임포트 비용이 커서 청킹 시점에 로드
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        
         pages_data = self.extract_text_with_pages()
         
         text_splitter = RecursiveCharacterTextSplitter(
@@ -70,31 +214,38 @@ class PDFProcessor:
         chunks = []
         chunk_id = 0
         
-        for page_data in pages_data:
-            page_num = page_data['page_number']
-            text = page_data['text']
-            
-            if not text.strip():
-                continue
-            
-            # 각 페이지의 텍스트를 청크로 분할
-            page_chunks = text_splitter.split_text(text)
-            
-            for chunk_text in page_chunks:
-                chunks.append({
-                    'chunk_id': chunk_id,
-                    'text': chunk_text,
-                    'page_number': page_num,
-                    'source': os.path.basename(self.pdf_path)
-                })
-                chunk_id += 1
+        with stage_timer('chunking'):
+            for page_data in pages_data:
+                page_num = page_data['page_number']
+                text = page_data['text']
+                
+                if not text.strip():
+                    continue
                 
-        return chunks
+                # 각 페이지의 텍스트를 청크로 분할
+                page_chunks = text_splitter.split_text(text)
+                
+                for chunk_text in page_chunks:
+                    chunks.append({
+                        'chunk_id': chunk_id,
+                        'text': chunk_text,
+                        'page_number': page_num,
+                        'source': os.path.basename(self.pdf_path)
+                    })
+                    chunk_id += 1
+        
+        with stage_timer('chunk_dedup'):
+            unique_chunks = collapse_near_duplicates(chunks, dedup_threshold)
+        if len(unique_chunks) < len(chunks):
+            print(f"[INFO] 거의 같은 청크 {len(chunks) - len(unique_chunks)}개를 합침 "
+                  f"({len(chunks)} -> {len(unique_chunks)}개)")
+                
+        return unique_chunks
     
     def render_page_as_image(
         self, 
         page_number: int, 
-        output_dir: str = 'static/page_images',
+        output_dir: str = PAGE_IMAGE_DIR,
         dpi: int = 150
     ) -> str:
         """
@@ -115,24 +266,100 @@ class PDFProcessor:
         if page_number < 1 or page_number > self.total_pages:
             raise ValueError(f"페이지 번호는 1부터 {self.total_pages} 사이여야 합니다.")
         
-        # 페이지 렌더링 (0부터 시작하는 인덱스)
-        page = self.doc[page_number - 1]
-        
-        # 고해상도로 렌더링
-        zoom = dpi / 72  # 기본 DPI는 72
-        mat = fitz.Matrix(zoom, zoom)
-        pix = page.get_pixmap(matrix=mat)
-        
-        # 파일명 생성
+        # 파일명 생성 (기본 해상도가 아니면 DPI 표기)
         pdf_name = os.path.splitext(os.path.basename(self.pdf_path))[0]
-        image_filename = f"{pdf_name}_page_{page_number}.png"
+        dpi_suffix = '' if dpi == 150 else f"_{dpi}dpi"
+        image_filename = f"{pdf_name}_page_{page_number}{dpi_suffix}.png"
         image_path = os.path.join(output_dir, image_filename)
         
-        # 이미지 저장
-        pix.save(image_path)
+        # 이미 렌더링된 이미지가 PDF보다 최신이면 재사용
+        if os.path.exists(image_path) and \
+                os.path.getmtime(image_path) >= os.path.getmtime(self.pdf_path):
+            record_cache('page_image', hit=True)
+            return image_path
+        record_cache('page_image', hit=False)
+        
+        with stage_timer('page_render'), self.pool.document(self.pdf_path) as doc:
+            # 페이지 렌더링 (0부터 시작하는 인덱스)
+            page = doc[page_number - 1]
+            
+            # 고해상도로 렌더링
+            zoom = dpi / 72  # 기본 DPI는 72
+            mat = fitz.Matrix(zoom, zoom)
+            pix = page.get_pixmap(matrix=mat)
+            
+            # 이미지 저장
+            pix.save(image_path)
         
         return image_path
     
+    def render_page_placeholder(self, page_number: int) -> str:
+        """
+        페이지의 아주 작은 자리표시자 이미지 (응답에 바로 넣을 수 있는 data URI)
+        
+        Args:
+            page_number: 페이지 번호 (1부터 시작)
+            
+        Returns:
+            str: PNG data URI (수백 바이트)
+        """
+        if page_number < 1 or page_number > self.total_pages:
+            raise ValueError(f"페이지 번호는 1부터 {self.total_pages} 사이여야 합니다.")
+        
+        placeholder = self._placeholders.get(page_number)
+        if placeholder is None:
+            with stage_timer('page_placeholder'), self.pool.document(self.pdf_path) as doc:
+                page = doc[page_number - 1]
+                zoom = PLACEHOLDER_WIDTH / page.rect.width
+                pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+                png = pix.tobytes('png')
+            placeholder = 'data:image/png;base64,' + base64.b64encode(png).decode('ascii')
+            self._placeholders[page_number] = placeholder
+        
+        return placeholder
+    
+    def get_page_size(self, page_number: int) -> Tuple[float, float]:
+        """
+        페이지 크기 (렌더링 없이 조회)
+        
+        Args:
+            page_number: 페이지 번호 (1부터 시작)
+            
+        Returns:
+            Tuple[float, float]: (가로, 세로) 포인트 단위 (1/72 인치)
+        """
+        if page_number < 1 or page_number > self.total_pages:
+            raise ValueError(f"페이지 번호는 1부터 {self.total_pages} 사이여야 합니다.")
+        
+        with self.pool.document(self.pdf_path) as doc:
+            rect = doc[page_number - 1].rect
+        return rect.width, rect.height
+    
+    def page_preview(self, page_number: int) -> Dict:
+        """
+        점진적 미리보기 정보: 자리표시자와 크기별 이미지 가로 픽셀 수
+        
+        Args:
+            page_number: 페이지 번호 (1부터 시작)
+            
+        Returns:
+            Dict: page_number, placeholder, width/height(원본 해상도 기준), widths(크기별 가로 픽셀)
+        """
+        placeholder = self.render_page_placeholder(page_number)
+        width, height = self.get_page_size(page_number)
+        
+        full_zoom = PAGE_IMAGE_DPI['full'] / 72
+        return {
+            'page_number': page_number,
+            'placeholder': placeholder,
+            'width': round(width * full_zoom),
+            'height': round(height * full_zoom),
+            'widths': {
+                size: round(width * dpi / 72)
+                for size, dpi in PAGE_IMAGE_DPI.items()
+            }
+        }
+    
     def get_page_info(self, page_number: int) -> Dict:
         """
         특정 페이지의 정보 추출
@@ -146,22 +373,19 @@ class PDFProcessor:
         if page_number < 1 or page_number > self.total_pages:
             raise ValueError(f"페이지 번호는 1부터 {self.total_pages} 사이여야 합니다.")
         
-        page = self.doc[page_number - 1]
-        text = page.get_text()
-        images = page.get_images()
+        page = self._load_sidecar()['pages'][page_number - 1]
         
         return {
             'page_number': page_number,
-            'text': text,
-            'text_length': len(text),
-            'image_count': len(images),
-            'has_images': len(images) > 0
+            'text': page['text'],
+            'text_length': page['char_count'],
+            'image_count': page['image_count'],
+            'has_images': page['image_count'] > 0
         }
     
     def close(self):
-        """PDF 문서 닫기"""
-        if self.doc:
-            self.doc.close()
+        """PDF 문서 핸들 반납 (다른 곳에서 사용 중이 아니면 닫힘, 다시 접근하면 자동으로 열림)"""
+        self.pool.close(self.pdf_path)
     
     def __enter__(self):
         return self
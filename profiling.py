@@ -0,0 +1,136 @@
+"""
+요청 단위 프로파일링 모듈
+- cProfile(결정적 프로파일러)로 개별 요청 실행을 기록
+- 프로파일을 요청 ID와 함께 디스크에 저장 (.prof + 요약 .txt)
+- 최근 프로파일 목록 조회
+
+저장된 .prof 파일은 `python -m pstats <파일>` 또는 snakeviz 등으로 분석할 수 있습니다.
+"""
+import io
+import os
+import re
+import time
+import uuid
+import pstats
+import cProfile
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+PROFILE_ID_PATTERN = re.compile(r'^[0-9]{8}T[0-9]{6}_[0-9a-f]{12}_[a-z_]+$')
+
+
+class ProfileStore:
+    """프로파일 파일 저장소"""
+
+    def __init__(self, directory: str = 'profiles', max_profiles: int = 50, top_n: int = 40):
+        """
+        Args:
+            directory: 프로파일 저장 디렉토리
+            max_profiles: 보관할 최대 프로파일 수 (초과 시 오래된 것부터 삭제)
+            top_n: 요약 파일에 기록할 상위 함수 개수
+        """
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self.top_n = top_n
+        # cProfile은 동시에 하나만 활성화할 수 있으므로 직렬화
+        self._active = threading.Lock()
+
+    def run(self, name: str, func: Callable, *args, **kwargs) -> Tuple[object, Optional[str]]:
+        """
+        함수를 프로파일러로 감싸 실행하고 결과를 저장
+
+        Args:
+            name: 프로파일 대상 이름 (예: 'query', 'process_pdf')
+            func: 실행할 함수
+
+        Returns:
+            Tuple: (함수 반환값, 프로파일 ID). 다른 프로파일이 실행 중이면 ID는 None
+        """
+        if not self._active.acquire(blocking=False):
+            return func(*args, **kwargs), None
+
+        profile_id = self._new_id(name)
+        profiler = cProfile.Profile()
+        started_at = time.perf_counter()
+        try:
+            result = profiler.runcall(func, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            self._active.release()
+            self._save(profile_id, profiler, elapsed)
+
+        return result, profile_id
+
+    def list_recent(self, limit: int = 20) -> List[Dict]:
+        """최근 프로파일 목록 (최신순)"""
+        if not os.path.isdir(self.directory):
+            return []
+
+        profiles = []
+        for filename in sorted(os.listdir(self.directory), reverse=True):
+            if not filename.endswith('.prof'):
+                continue
+            profile_id = filename[:-len('.prof')]
+            if not PROFILE_ID_PATTERN.match(profile_id):
+                continue  # 직접 복사해 둔 파일 등 이 모듈이 만들지 않은 프로파일은 무시
+            path = os.path.join(self.directory, filename)
+            created, request_id, name = profile_id.split('_', 2)
+            profiles.append({
+                'profile_id': profile_id,
+                'request_id': request_id,
+                'name': name,
+                'created_at': datetime.strptime(created, '%Y%m%dT%H%M%S').isoformat(),
+                'size_bytes': os.path.getsize(path),
+                'summary': self._read_first_line(profile_id)
+            })
+            if len(profiles) >= limit:
+                break
+        return profiles
+
+    def path_for(self, profile_id: str, kind: str = 'prof') -> Optional[str]:
+        """프로파일 ID에 해당하는 파일 경로 (존재하지 않거나 잘못된 ID면 None)"""
+        if not PROFILE_ID_PATTERN.match(profile_id) or kind not in ('prof', 'txt'):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.{kind}")
+        return path if os.path.exists(path) else None
+
+    def _new_id(self, name: str) -> str:
+        timestamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+        safe_name = re.sub(r'[^a-z_]', '_', name.lower())
+        return f"{timestamp}_{uuid.uuid4().hex[:12]}_{safe_name}"
+
+    def _save(self, profile_id: str, profiler: cProfile.Profile, elapsed: float) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        profiler.dump_stats(os.path.join(self.directory, f"{profile_id}.prof"))
+
+        # 사람이 읽기 쉬운 요약 (누적 시간 기준 상위 함수)
+        buffer = io.StringIO()
+        buffer.write(f"elapsed={elapsed * 1000:.1f}ms\n\n")
+        stats = pstats.Stats(profiler, stream=buffer)
+        stats.strip_dirs().sort_stats('cumulative').print_stats(self.top_n)
+        with open(os.path.join(self.directory, f"{profile_id}.txt"), 'w', encoding='utf-8') as f:
+            f.write(buffer.getvalue())
+
+        self._prune()
+
+    def _read_first_line(self, profile_id: str) -> str:
+        path = os.path.join(self.directory, f"{profile_id}.txt")
+        if not os.path.exists(path):
+            return ''
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.readline().strip()
+
+    def _prune(self) -> None:
+        """보관 개수를 초과한 오래된 프로파일 삭제"""
+        profile_ids = sorted(
+            filename[:-len('.prof')]
+            for filename in os.listdir(self.directory)
+            if filename.endswith('.prof') and PROFILE_ID_PATTERN.match(filename[:-len('.prof')])
+        )
+        for profile_id in profile_ids[:-self.max_profiles]:
+            for kind in ('prof', 'txt'):
+                path = os.path.join(self.directory, f"{profile_id}.{kind}")
+                if os.path.exists(path):
+                    os.remove(path)
@@ -6,57 +6,262 @@ RAG (Retrieval-Augmented Generation) 엔진
 - OpenAI와의 통합
 """
 import os
+import time
 import pickle
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Tuple
 import numpy as np
-from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
-from langchain.docstore.document import Document
-from openai import OpenAI
+from llm_clients import get_openai_client, get_openai_embeddings, chat_completion, supports_native_dimensions
+from embedding_projection import PCAProjection, PROJECTION_NAME
+from metrics import (
+    stage_timer, record_token_usage,
+    INDEX_VECTORS, INDEX_DIMENSIONS, EMBEDDING_THROUGHPUT
+)
+
+
+# 적응형 검색/생성 설정
+ADAPTIVE_K_MIN = 2
+ADAPTIVE_K_MAX = 8
+ADAPTIVE_K_DEFAULT = 3
+ADAPTIVE_GAP_RATIO = 0.15
+
+# SEARCH_MODE=numpy일 때 NumPy 행렬 곱으로 정확 검색할 최대 벡터 수 (초과하면 FAISS 사용)
+EXACT_SEARCH_MAX_VECTORS = int(os.getenv('EXACT_SEARCH_MAX_VECTORS', 2000))
+
+# 여러 페이지에 반복되는 청크가 참조 페이지로 추가할 최대 페이지 수
+REFERENCED_PAGES_PER_CHUNK = 3
+
+DEFAULT_GENERATION = {'max_tokens': 1500, 'temperature': 0.7}
+GENERATION_PROFILES = {
+    'lookup': {'max_tokens': 400, 'temperature': 0.2},
+    'general': {'max_tokens': 900, 'temperature': 0.5},
+    'procedure': {'max_tokens': 1500, 'temperature': 0.7},
+}
+PROCEDURE_KEYWORDS = (
+    '방법', '어떻게', '절차', '순서', '단계', '설치', '설정', '연결', '교체', '조립',
+    'how to', 'how do', 'steps', 'install', 'configure', 'procedure', 'set up', 'setup'
+)
+LOOKUP_KEYWORDS = (
+    '무엇', '뭐', '몇', '언제', '어디', '누가', '이름', '값', '규격', '사양',
+    'what', 'which', 'when', 'where', 'who', 'how many', 'how much'
+)
+
+
+def referenced_pages(search_results: List[Dict], per_chunk: int = REFERENCED_PAGES_PER_CHUNK) -> set:
+    """
+    검색 결과의 참조 페이지
+    
+    여러 페이지에 반복되는 청크(pages)는 다른 결과와 겹치는 페이지를 우선하여
+    청크당 per_chunk개까지만 포함합니다 (모든 페이지에 있는 경고문이 전체 페이지를 참조하지 않도록).
+    
+    Args:
+        search_results: 검색된 청크들
+        per_chunk: 반복 청크당 최대 페이지 수
+        
+    Returns:
+        set: 참조 페이지 번호
+    """
+    primary = {result['page_number'] for result in search_results}
+    page_numbers = set(primary)
+    for result in search_results:
+        pages = result.get('pages') or [result['page_number']]
+        preferred = [page for page in pages if page in primary] + [page for page in pages if page not in primary]
+        page_numbers.update(preferred[:per_chunk])
+    return page_numbers
+
+
+def select_adaptive_k(
+    search_results: List[Dict],
+    min_k: int = ADAPTIVE_K_MIN,
+    default_k: int = ADAPTIVE_K_DEFAULT,
+    gap_ratio: float = ADAPTIVE_GAP_RATIO
+) -> int:
+    """
+    검색 점수 분포로부터 사용할 청크 개수 결정
+    
+    거리(낮을수록 유사) 순으로 정렬된 결과에서 연속한 두 점수 사이의 상대 간격이
+    가장 큰 지점을 찾아 그 앞까지만 사용합니다. 뚜렷한 간격이 없으면 default_k를 사용합니다.
+    
+    Args:
+        search_results: search()가 반환한 결과 (거리 오름차순)
+        min_k: 최소 청크 개수
+        default_k: 뚜렷한 간격이 없을 때의 청크 개수
+        gap_ratio: 간격으로 인정할 최소 상대 차이
+        
+    Returns:
+        int: 사용할 청크 개수
+    """
+    scores = [result['similarity_score'] for result in search_results]
+    if len(scores) <= min_k:
+        return len(scores)
+    
+    best_k, best_gap = None, gap_ratio
+    for i in range(min_k, len(scores)):
+        gap = (scores[i] - scores[i - 1]) / max(abs(scores[i - 1]), 1e-6)
+        if gap >= best_gap:
+            best_k, best_gap = i, gap
+    
+    return best_k if best_k is not None else min(default_k, len(scores))
+
+
+def classify_question(question: str) -> str:
+    """질문 유형 분류 (procedure: 절차 설명, lookup: 단답형 조회, general: 그 외)"""
+    text = question.lower()
+    if any(keyword in text for keyword in PROCEDURE_KEYWORDS):
+        return 'procedure'
+    if len(text) <= 40 and any(keyword in text for keyword in LOOKUP_KEYWORDS):
+        return 'lookup'
+    return 'general'
+
+
+def choose_generation_params(question: str, context_chars: int) -> Dict:
+    """
+    질문 유형과 컨텍스트 크기에 따른 생성 파라미터 결정
+    
+    답변은 컨텍스트보다 길 필요가 거의 없으므로 max_tokens를 컨텍스트 분량에 비례해 줄입니다.
+    
+    Returns:
+        Dict: question_type, max_tokens, temperature
+    """
+    question_type = classify_question(question)
+    profile = GENERATION_PROFILES[question_type]
+    context_budget = max(256, context_chars // 2)
+    
+    return {
+        'question_type': question_type,
+        'max_tokens': min(profile['max_tokens'], context_budget),
+        'temperature': profile['temperature']
+    }
 
 
 class RAGEngine:
     """RAG 파이프라인 관리 클래스"""
     
-    def __init__(self, openai_api_key: str):
+    # 문서별 인덱스를 저장하는 기본 루트 디렉토리
+    DEFAULT_STORE_PATH = "vector_store"
+    
+    # 검색 경로: faiss(인덱스 직접 검색, 기본값), numpy(작은 문서 정확 검색), langchain(기존 래퍼 경로, 비교용)
+    search_mode = os.getenv('SEARCH_MODE', 'faiss')
+    
+    # 임베딩 차원 축소: EMBEDDING_DIMENSIONS가 있으면 모델이 지원할 때 축소 차원을 직접 요청(native),
+    # 아니면 구축 시 PCA 투영을 학습하여 인덱스와 함께 저장 (EMBEDDING_REDUCTION=pca로 PCA 강제)
+    embedding_dimensions = int(os.getenv('EMBEDDING_DIMENSIONS', 0)) or None
+    embedding_reduction = os.getenv('EMBEDDING_REDUCTION', 'auto').lower()  # auto | pca
+    
+    def __init__(self, openai_api_key: str, embeddings=None, client=None, dimensions: int = None):
         """
         Args:
             openai_api_key: OpenAI API 키
+            embeddings: 사용할 임베딩 객체 (기본값: 프로세스 공유 OpenAIEmbeddings)
+            client: 사용할 OpenAI 호환 클라이언트 (기본값: 프로세스 공유 OpenAI 클라이언트)
+            dimensions: 인덱스 벡터 차원 (기본값: EMBEDDING_DIMENSIONS, 없으면 모델 전체 차원)
         """
         self.api_key = openai_api_key
-        self.embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key)
+        self.dimensions = dimensions or self.embedding_dimensions
+        self.reduction = None
+        if embeddings is None and self.dimensions and self.embedding_reduction != 'pca' and \
+                supports_native_dimensions(os.getenv('OPENAI_EMBEDDING_MODEL')):
+            # 직접 dimensions를 지정해 만든 경우만 native (임베딩 클래스의 속성 유무에 의존하지 않음)
+            embeddings = get_openai_embeddings(openai_api_key, dimensions=self.dimensions)
+            self.reduction = 'native'
+        elif self.dimensions:
+            native = embeddings is not None and getattr(embeddings, 'dimensions', None) == self.dimensions
+            self.reduction = 'native' if native else 'pca'
+        self.embeddings = embeddings or get_openai_embeddings(openai_api_key)
+        self.projection = None
         self.vector_store = None
         self.chunks_metadata = []
-        self.client = OpenAI(api_key=openai_api_key)
+        self.client = client or get_openai_client(openai_api_key)
+        self._positions_aligned = False
+        self._matrix = None
+        self._matrix_sq_norms = None
         
-    def build_vector_store(self, chunks: List[Dict]) -> None:
+    def build_vector_store(self, chunks: List[Dict], checkpoint=None) -> None:
         """
         청크로부터 벡터 스토어 구축
         
         Args:
             chunks: PDF 처리로부터 얻은 청크 리스트
+            checkpoint: EmbeddingCheckpoint (지정하면 배치별로 저장하고 이전 구축에서 남은 배치 재사용)
         """
         # 청크 메타데이터 저장
         self.chunks_metadata = chunks
         
-        # LangChain Document 객체로 변환
-        documents = []
-        for chunk in chunks:
-            doc = Document(
-                page_content=chunk['text'],
-                metadata={
-                    'chunk_id': chunk['chunk_id'],
-                    'page_number': chunk['page_number'],
-                    'source': chunk['source']
-                }
-            )
-            documents.append(doc)
+        texts = [chunk['text'] for chunk in chunks]
+        metadatas = [
+            {
+                'chunk_id': chunk['chunk_id'],
+                'page_number': chunk['page_number'],
+                'pages': chunk.get('pages', [chunk['page_number']]),
+                'source': chunk['source']
+            }
+            for chunk in chunks
+        ]
+        
+        # 임베딩 생성 (단계별 시간 측정을 위해 인덱스 구축과 분리)
+        print(f"[INFO] {len(texts)}개의 청크에 대한 임베딩 생성 중...")
+        started_at = time.perf_counter()
+        with stage_timer('embed_documents'):
+            if checkpoint is None:
+                vectors = self.embeddings.embed_documents(texts)
+            else:
+                vectors = checkpoint.embed(texts, self.embeddings.embed_documents)
+                if checkpoint.resumed_batches:
+                    print(f"[INFO] 체크포인트에서 {checkpoint.resumed_chunks}개 청크 재사용 "
+                          f"({checkpoint.resumed_batches}개 배치 재사용, {checkpoint.fresh_batches}개 배치 새로 임베딩)")
+        
+        elapsed = time.perf_counter() - started_at
+        if texts and elapsed > 0:
+            throughput = len(texts) / elapsed
+            EMBEDDING_THROUGHPUT.set(throughput, model=self.embedding_model_id())
+            print(f"[INFO] 임베딩 처리량: {throughput:.1f} 청크/초 ({elapsed:.2f}초)")
+        
+        # 모델이 축소 차원을 지원하지 않으면 문서 임베딩으로 PCA 투영 학습
+        self.projection = None
+        if self.reduction == 'pca':
+            with stage_timer('embedding_projection'):
+                self.projection = PCAProjection.fit(vectors, self.dimensions)
+                if self.projection is not None:
+                    vectors = self.projection.apply(vectors)
+            if self.projection is not None:
+                print(f"[INFO] PCA 투영: {self.projection.input_dimensions} -> {self.projection.dimensions}차원")
+            else:
+                print(f"[INFO] 청크 수가 {self.dimensions}개 이하라 전체 차원 유지")
         
         # FAISS 벡터 스토어 생성
-        print(f"[INFO] {len(documents)}개의 청크에 대한 임베딩 생성 중...")
-        self.vector_store = FAISS.from_documents(documents, self.embeddings)
+        with stage_timer('index_build'):
+            self.vector_store = FAISS.from_embeddings(
+                list(zip(texts, vectors)),
+                self.embeddings,
+                metadatas=metadatas
+            )
+        self._prepare_search()
+        self._update_index_metrics()
         print("[OK] 벡터 스토어 구축 완료!")
         
+    def embedding_model_name(self) -> str:
+        """임베딩 모델명 (없으면 임베딩 클래스명)"""
+        return (
+            getattr(self.embeddings, 'model', None)
+            or getattr(self.embeddings, 'model_name', None)
+            or type(self.embeddings).__name__
+        )
+    
+    def embedding_model_id(self) -> str:
+        """임베딩 모델 식별자 (모델명, 차원 축소 시 방식과 차원 포함)"""
+        model = self.embedding_model_name()
+        if self.reduction == 'native':
+            return f"{model}@{self.dimensions}"
+        if self.reduction == 'pca':
+            return f"{model}@pca{self.dimensions}"
+        return model
+    
+    def _project_queries(self, vectors):
+        """질의 임베딩을 인덱스 차원으로 투영 (PCA 투영이 없으면 그대로)"""
+        return vectors if self.projection is None else self.projection.apply(vectors)
+        
     def save_vector_store(self, path: str = "vector_store") -> None:
         """
         벡터 스토어를 디스크에 저장
@@ -69,13 +274,21 @@ class RAGEngine:
         
         os.makedirs(path, exist_ok=True)
         
-        # FAISS 인덱스 저장
-        self.vector_store.save_local(path)
-        
-        # 메타데이터 저장
-        metadata_path = os.path.join(path, "chunks_metadata.pkl")
-        with open(metadata_path, 'wb') as f:
-            pickle.dump(self.chunks_metadata, f)
+        with stage_timer('index_save'):
+            # FAISS 인덱스 저장
+            self.vector_store.save_local(path)
+            
+            # 메타데이터 저장
+            metadata_path = os.path.join(path, "chunks_metadata.pkl")
+            with open(metadata_path, 'wb') as f:
+                pickle.dump(self.chunks_metadata, f)
+            
+            # PCA 투영 행렬 저장 (질의에도 같은 투영 적용, 투영 없이 다시 구축했으면 이전 파일 삭제)
+            projection_path = os.path.join(path, PROJECTION_NAME)
+            if self.projection is not None:
+                self.projection.save(path)
+            elif os.path.exists(projection_path):
+                os.remove(projection_path)
         
         print(f"[OK] 벡터 스토어가 {path}에 저장되었습니다.")
         
@@ -89,20 +302,123 @@ class RAGEngine:
         if not os.path.exists(path):
             raise ValueError(f"{path} 경로가 존재하지 않습니다.")
         
-        # FAISS 인덱스 로드
-        self.vector_store = FAISS.load_local(
-            path, 
-            self.embeddings,
-            allow_dangerous_deserialization=True
+        with stage_timer('index_load'):
+            # FAISS 인덱스 로드
+            self.vector_store = FAISS.load_local(
+                path, 
+                self.embeddings,
+                allow_dangerous_deserialization=True
+            )
+            
+            # 메타데이터 로드
+            metadata_path = os.path.join(path, "chunks_metadata.pkl")
+            if os.path.exists(metadata_path):
+                with open(metadata_path, 'rb') as f:
+                    self.chunks_metadata = pickle.load(f)
+            
+            self.projection = PCAProjection.load(path)
+            if self.projection is not None and self.projection.dimensions != self.vector_store.index.d:
+                raise ValueError(f"투영 차원({self.projection.dimensions})과 인덱스 차원({self.vector_store.index.d})이 다릅니다.")
+            
+            self._prepare_search()
+        
+        self._update_index_metrics()
+        print(f"[OK] 벡터 스토어가 {path}로부터 로드되었습니다.")
+    
+    def _prepare_search(self) -> None:
+        """
+        직접 검색 경로 준비
+        
+        FAISS 위치 i가 chunks_metadata[i]와 같은 청크이면 docstore/Document를 거치지 않고
+        위치로 바로 청크를 찾습니다.
+        """
+        index = self.vector_store.index
+        index_to_id = self.vector_store.index_to_docstore_id
+        docstore = self.vector_store.docstore
+        
+        self._positions_aligned = index.ntotal == len(self.chunks_metadata) and all(
+            docstore.search(index_to_id[position]).metadata.get('chunk_id') == chunk['chunk_id']
+            for position, chunk in enumerate(self.chunks_metadata)
         )
         
-        # 메타데이터 로드
-        metadata_path = os.path.join(path, "chunks_metadata.pkl")
-        if os.path.exists(metadata_path):
-            with open(metadata_path, 'rb') as f:
-                self.chunks_metadata = pickle.load(f)
+        self._matrix = self._matrix_sq_norms = None
+    
+    def _exact_matrix(self):
+        """NumPy 정확 검색용 벡터 행렬 (처음 필요할 때 인덱스에서 복원, 큰 문서는 None)"""
+        index = self.vector_store.index
+        if self._matrix is None and 0 < index.ntotal <= EXACT_SEARCH_MAX_VECTORS:
+            try:
+                matrix = index.reconstruct_n(0, index.ntotal)
+            except RuntimeError:
+                # 벡터를 복원할 수 없는 인덱스 종류는 FAISS 검색만 사용
+                return None
+            self._matrix_sq_norms = np.einsum('ij,ij->i', matrix, matrix)
+            self._matrix = matrix
+        return self._matrix
+    
+    def _search_vectors(self, query_matrix: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        질의 행렬에 대한 top-k 검색 (FAISS IndexFlatL2와 같은 제곱 L2 거리)
         
-        print(f"[OK] 벡터 스토어가 {path}로부터 로드되었습니다.")
+        Returns:
+            Tuple: (거리 행렬, 위치 행렬) - 결과가 없는 자리는 위치 -1
+        """
+        matrix = self._exact_matrix() if self.search_mode == 'numpy' else None
+        if matrix is None:
+            return self.vector_store.index.search(query_matrix, k)
+        
+        n = matrix.shape[0]
+        k = min(k, n)
+        # 순위는 ||m||^2 - 2 q·m 로 정하고, ||q||^2는 최종 top-k 거리에만 더함
+        partial = self._matrix_sq_norms[None, :] - 2.0 * (query_matrix @ matrix.T)
+        if k < n:
+            top = np.argpartition(partial, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(n), partial.shape)
+        top_partial = np.take_along_axis(partial, top, axis=1)
+        order = np.argsort(top_partial, axis=1, kind='stable')
+        distances = np.take_along_axis(top_partial, order, axis=1) + \
+            np.einsum('ij,ij->i', query_matrix, query_matrix)[:, None]
+        return distances, np.take_along_axis(top, order, axis=1)
+    
+    def _results_for(self, distances: np.ndarray, positions: np.ndarray) -> List[Dict]:
+        """최종 검색 위치들에 대해서만 결과 딕셔너리 생성"""
+        results = []
+        for score, position in zip(distances, positions):
+            if position < 0:
+                continue
+            if self._positions_aligned:
+                chunk = self.chunks_metadata[position]
+                text, metadata = chunk['text'], chunk
+            else:
+                doc = self.vector_store.docstore.search(self.vector_store.index_to_docstore_id[position])
+                text, metadata = doc.page_content, doc.metadata
+            results.append({
+                'text': text,
+                'page_number': metadata['page_number'],
+                'pages': metadata.get('pages', [metadata['page_number']]),
+                'chunk_id': metadata['chunk_id'],
+                'source': metadata['source'],
+                'similarity_score': float(score)
+            })
+        return results
+    
+    def _index_source(self) -> str:
+        """인덱스 지표 라벨로 쓰는 문서명"""
+        return self.chunks_metadata[0]['source'] if self.chunks_metadata else ''
+    
+    def _update_index_metrics(self) -> None:
+        """현재 인덱스 크기를 지표에 반영"""
+        index = self.vector_store.index
+        source = self._index_source()
+        INDEX_VECTORS.set(index.ntotal, source=source)
+        INDEX_DIMENSIONS.set(index.d, source=source)
+    
+    def clear_index_metrics(self) -> None:
+        """이 인덱스의 지표 라벨 제거 (문서를 메모리에서 내릴 때)"""
+        source = self._index_source()
+        INDEX_VECTORS.remove(source=source)
+        INDEX_DIMENSIONS.remove(source=source)
         
     def search(
         self, 
@@ -122,14 +438,48 @@ class RAGEngine:
         if self.vector_store is None:
             raise ValueError("벡터 스토어가 초기화되지 않았습니다.")
         
-        # 유사도 검색 (점수 포함)
-        results = self.vector_store.similarity_search_with_score(query, k=k)
+        # 질의 임베딩
+        with stage_timer('embed_query'):
+            query_vector = self._project_queries([self.embeddings.embed_query(query)])[0]
+        
+        return self.search_by_vector(query_vector, k=k)
+    
+    def search_by_vector(
+        self, 
+        query_vector: List[float], 
+        k: int = 3
+    ) -> List[Dict]:
+        """
+        임베딩된 질의 벡터로 유사 청크 검색
+        
+        Args:
+            query_vector: 질의 임베딩 (인덱스 차원, PCA 투영 적용 후)
+            k: 반환할 결과 개수
+            
+        Returns:
+            List[Dict]: 검색된 청크와 메타데이터
+        """
+        if self.search_mode == 'langchain':
+            return self._search_langchain(query_vector, k)
+        
+        # 유사도 검색 (점수 포함): 인덱스 직접 검색 후 최종 결과만 딕셔너리로 구성
+        with stage_timer('vector_search'):
+            distances, positions = self._search_vectors(
+                np.asarray([query_vector], dtype=np.float32), k
+            )
+            return self._results_for(distances[0], positions[0])
+    
+    def _search_langchain(self, query_vector: List[float], k: int) -> List[Dict]:
+        """LangChain 래퍼를 거치는 기존 검색 경로 (벤치마크 비교용)"""
+        with stage_timer('vector_search'):
+            results = self.vector_store.similarity_search_with_score_by_vector(query_vector, k=k)
         
         search_results = []
         for doc, score in results:
             result = {
                 'text': doc.page_content,
                 'page_number': doc.metadata['page_number'],
+                'pages': doc.metadata.get('pages', [doc.metadata['page_number']]),
                 'chunk_id': doc.metadata['chunk_id'],
                 'source': doc.metadata['source'],
                 'similarity_score': float(score)
@@ -138,11 +488,44 @@ class RAGEngine:
         
         return search_results
     
+    def search_batch(
+        self, 
+        queries: List[str], 
+        k: int = 3
+    ) -> List[List[Dict]]:
+        """
+        여러 질의를 한 번에 검색 (배치 임베딩 1회 + 행렬 검색 1회)
+        
+        Args:
+            queries: 사용자 질문 리스트
+            k: 질문당 반환할 결과 개수
+            
+        Returns:
+            List[List[Dict]]: 질문 순서대로 정렬된 검색 결과
+        """
+        if self.vector_store is None:
+            raise ValueError("벡터 스토어가 초기화되지 않았습니다.")
+        
+        # 질의 임베딩 (한 번의 배치 호출)
+        with stage_timer('embed_query_batch'):
+            query_vectors = self._project_queries(self.embeddings.embed_documents(queries))
+        
+        # 전체 질의 행렬에 대해 한 번의 검색
+        with stage_timer('vector_search_batch'):
+            matrix = np.asarray(query_vectors, dtype=np.float32)
+            distances, positions = self._search_vectors(matrix, k)
+            return [
+                self._results_for(row_distances, row_positions)
+                for row_distances, row_positions in zip(distances, positions)
+            ]
+    
     def generate_answer(
         self, 
         query: str, 
         search_results: List[Dict],
-        system_prompt: str = None
+        system_prompt: str = None,
+        generation_params: Dict = None,
+        history: List[Dict] = None
     ) -> Dict:
         """
         검색 결과를 기반으로 LLM 답변 생성
@@ -151,19 +534,31 @@ class RAGEngine:
             query: 사용자 질문
             search_results: 검색된 청크들
             system_prompt: 시스템 프롬프트 (선택)
+            generation_params: max_tokens/temperature 지정 (선택, 기본값: 1500/0.7)
+            history: 대화 모드의 이전 질문/답변 메시지 (선택, 첫 질문이면 빈 리스트)
             
         Returns:
             Dict: 답변 및 참조 페이지 정보
         """
+        # 대화 모드에서는 같은 청크 집합이면 항상 같은 컨텍스트가 되도록 청크 ID 순으로 정렬
+        # (프롬프트에만 적용하고 반환하는 source_chunks는 검색 점수 순 유지)
+        context_results = search_results
+        if history is not None:
+            context_results = sorted(search_results, key=lambda result: result.get('chunk_id', 0))
+        
         # 컨텍스트 구성
         context_parts = []
-        page_numbers = set()
         
-        for i, result in enumerate(search_results, 1):
+        for i, result in enumerate(context_results, 1):
+            pages = result.get('pages') or [result['page_number']]
+            label = ', '.join(str(page) for page in pages[:REFERENCED_PAGES_PER_CHUNK])
+            if len(pages) > REFERENCED_PAGES_PER_CHUNK:
+                label += f" 외 {len(pages) - REFERENCED_PAGES_PER_CHUNK}개"
             context_parts.append(
-                f"[문서 {i} - 페이지 {result['page_number']}]\n{result['text']}\n"
+                f"[문서 {i} - 페이지 {label}]\n{result['text']}\n"
             )
-            page_numbers.add(result['page_number'])
+        
+        page_numbers = referenced_pages(search_results)
         
         context = "\n".join(context_parts)
         
@@ -179,59 +574,194 @@ class RAGEngine:
 
 답변은 한국어로 작성하며, 전문적이면서도 이해하기 쉽게 작성해주세요."""
         
+        params = dict(DEFAULT_GENERATION)
+        params.update(generation_params or {})
+        
         # OpenAI API 호출
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"""다음 문서 내용을 참고하여 질문에 답변해주세요.
+        if history is None:
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": f"""다음 문서 내용을 참고하여 질문에 답변해주세요.
 
 문서 내용:
 {context}
 
 질문: {query}"""}
-        ]
-        
-        response = self.client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            temperature=0.7,
-            max_tokens=1500
-        )
+            ]
+        else:
+            # 시스템 프롬프트 + 문서 내용을 고정된 앞부분으로 두고 대화 기록과 새 질문을 뒤에 붙임
+            # (후속 질문에서도 앞부분이 같아 제공자 측 프롬프트 캐시가 적중)
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": f"""다음 문서 내용을 참고하여 이어지는 질문들에 답변해주세요.
+
+문서 내용:
+{context}"""},
+                *history,
+                {"role": "user", "content": f"질문: {query}"}
+            ]
+        
+        with stage_timer('llm_completion'):
+            response = chat_completion(
+                self.client,
+                model="gpt-4o-mini",
+                messages=messages,
+                temperature=params['temperature'],
+                max_tokens=params['max_tokens']
+            )
+        record_token_usage(response.model, response.usage)
         
         answer = response.choices[0].message.content
+        prompt_details = getattr(response.usage, 'prompt_tokens_details', None)
         
         return {
             'answer': answer,
             'referenced_pages': sorted(list(page_numbers)),
             'source_chunks': search_results,
             'model': response.model,
-            'total_tokens': response.usage.total_tokens
+            'total_tokens': response.usage.total_tokens,
+            'prompt_tokens': getattr(response.usage, 'prompt_tokens', None),
+            'completion_tokens': getattr(response.usage, 'completion_tokens', None),
+            'cached_tokens': getattr(prompt_details, 'cached_tokens', None),
+            'generation': params
         }
     
     def query(
         self, 
         question: str, 
         k: int = 3,
-        system_prompt: str = None
+        system_prompt: str = None,
+        adaptive: bool = False
     ) -> Dict:
         """
         질의에 대한 완전한 RAG 파이프라인 실행
         
         Args:
             question: 사용자 질문
-            k: 검색할 청크 개수
+            k: 검색할 청크 개수 (adaptive=True면 무시)
             system_prompt: 커스텀 시스템 프롬프트
+            adaptive: 점수 분포로 k를, 질문 유형/컨텍스트 크기로 생성 한도를 결정
             
         Returns:
             Dict: 답변, 참조 페이지, 검색 결과 등
         """
         # 1. 검색
-        search_results = self.search(question, k=k)
+        search_results = self.search(question, k=ADAPTIVE_K_MAX if adaptive else k)
         
         # 2. 답변 생성
-        result = self.generate_answer(question, search_results, system_prompt)
+        result = self._generate_for(question, search_results, system_prompt, adaptive)
         
         # 3. 질문 추가
         result['question'] = question
         
         return result
-
+    
+    def query_with_history(
+        self, 
+        question: str, 
+        history: List[Dict],
+        previous_results: List[Dict] = None,
+        k: int = 3,
+        system_prompt: str = None,
+        adaptive: bool = False
+    ) -> Dict:
+        """
+        대화 모드 질의 (이전 검색 결과 재사용 가능)
+        
+        Args:
+            question: 사용자 질문
+            history: 이전 질문/답변 메시지 (첫 질문이면 빈 리스트)
+            previous_results: 재사용할 이전 검색 결과 (주어지면 임베딩/검색 생략)
+            k: 검색할 청크 개수 (adaptive=True면 무시)
+            system_prompt: 커스텀 시스템 프롬프트
+            adaptive: 점수 분포로 k를, 질문 유형/컨텍스트 크기로 생성 한도를 결정
+            
+        Returns:
+            Dict: 답변, 참조 페이지, 검색 결과 등 (retrieval.reused로 재사용 여부 표시)
+        """
+        reused = previous_results is not None
+        if reused:
+            search_results = previous_results
+        else:
+            search_results = self.search(question, k=ADAPTIVE_K_MAX if adaptive else k)
+        
+        result = self._generate_for(
+            question, search_results, system_prompt, adaptive,
+            history=history, reused=reused
+        )
+        result['question'] = question
+        
+        return result
+    
+    def _generate_for(
+        self, 
+        question: str, 
+        search_results: List[Dict],
+        system_prompt: str,
+        adaptive: bool,
+        history: List[Dict] = None,
+        reused: bool = False
+    ) -> Dict:
+        """(적응형이면 k/생성 한도를 조정한 뒤) 답변 생성 및 검색 설정 기록"""
+        candidates = len(search_results)
+        generation_params = None
+        
+        if adaptive:
+            # 재사용한 결과는 이미 k가 정해져 있음
+            if not reused:
+                search_results = search_results[:select_adaptive_k(search_results)]
+            context_chars = sum(len(result['text']) for result in search_results)
+            generation_params = choose_generation_params(question, context_chars)
+        
+        result = self.generate_answer(
+            question, search_results, system_prompt, generation_params, history=history
+        )
+        result['retrieval'] = {
+            'adaptive': adaptive,
+            'k': len(search_results),
+            'candidates': candidates,
+            'reused': reused
+        }
+        return result
+    
+    def query_batch(
+        self, 
+        questions: List[str], 
+        k: int = 3,
+        max_workers: int = 4,
+        system_prompt: str = None,
+        adaptive: bool = False
+    ) -> List[Dict]:
+        """
+        여러 질문에 대한 RAG 파이프라인 일괄 실행
+        
+        검색은 배치로 한 번에 수행하고, 답변 생성은 최대 max_workers개까지 동시에 실행합니다.
+        
+        Args:
+            questions: 사용자 질문 리스트
+            k: 질문당 검색할 청크 개수 (adaptive=True면 무시)
+            max_workers: 동시에 실행할 답변 생성 개수
+            system_prompt: 커스텀 시스템 프롬프트
+            adaptive: 질문별로 k와 생성 한도를 적응적으로 결정
+            
+        Returns:
+            List[Dict]: 질문 순서대로 정렬된 결과 (실패한 항목은 'error' 키 포함)
+        """
+        # 1. 배치 검색
+        batch_results = self.search_batch(questions, k=ADAPTIVE_K_MAX if adaptive else k)
+        
+        # 2. 답변 생성 (제한된 동시성, 요청 단위 지표 컨텍스트 유지)
+        def generate(question, search_results):
+            try:
+                result = self._generate_for(question, search_results, system_prompt, adaptive)
+                result['question'] = question
+                return result
+            except Exception as e:
+                return {'question': question, 'error': str(e)}
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(questions)))) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, generate, question, search_results)
+                for question, search_results in zip(questions, batch_results)
+            ]
+            return [future.result() for future in futures]
@@ -1,225 +1,145 @@
 """
 RAG 엔진 - 무료 버전 (HuggingFace 임베딩 사용)
 OpenAI API 크레딧이 없을 때 사용
+
+로컬 임베딩 모델은 프로세스당 한 번만 로드되어 모든 엔진 인스턴스가 공유합니다.
+환경 변수로 동작을 조정할 수 있습니다:
+- LOCAL_EMBEDDING_BATCH_SIZE: 인코딩 배치 크기 (기본값: 32)
+- LOCAL_EMBEDDING_THREADS: CPU 추론 스레드 수 (기본값: torch 기본값)
+- LOCAL_EMBEDDING_BACKEND: torch | quantized | onnx (기본값: torch)
+  - quantized: Linear 레이어 int8 동적 양자화 (CPU 추론 가속)
+  - onnx: ONNX Runtime 추론 (sentence-transformers>=3.2, optimum[onnxruntime] 필요)
 """
 import os
-import pickle
-from typing import List, Dict
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain.docstore.document import Document
-from openai import OpenAI
+import threading
+from rag_engine import RAGEngine
+
+
+LOCAL_EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+LOCAL_EMBEDDING_BACKENDS = ('torch', 'quantized', 'onnx')
+# 백엔드별 모델 식별자 접미사: 양자화/ONNX 벡터는 torch(fp32)와 값이 조금씩 달라 같은 인덱스에 섞지 않음
+# (기본 torch는 기존 인덱스를 그대로 쓰도록 접미사 없음)
+LOCAL_EMBEDDING_VARIANTS = {'torch': '', 'quantized': '+torch-int8', 'onnx': '+onnx-fp32'}
+
+_local_embeddings = None
+_local_embeddings_backend = None
+_local_embeddings_lock = threading.Lock()
+
+
+def get_local_embeddings():
+    """
+    프로세스 전역 로컬 임베딩 모델 반환 (최초 호출 시 1회 로드)
+
+    Returns:
+        HuggingFaceEmbeddings: 공유 임베딩 객체
+    """
+    global _local_embeddings, _local_embeddings_backend
+
+    if _local_embeddings is None:
+        with _local_embeddings_lock:
+            if _local_embeddings is None:
+                backend = os.getenv('LOCAL_EMBEDDING_BACKEND', 'torch').lower()
+                embeddings = load_local_embeddings(
+                    batch_size=int(os.getenv('LOCAL_EMBEDDING_BATCH_SIZE', 32)),
+                    threads=int(os.getenv('LOCAL_EMBEDDING_THREADS', 0)),
+                    backend=backend
+                )
+                # 잠금 밖에서 _local_embeddings를 읽는 스레드가 백엔드가 비어 있는 상태를 보지 않도록 백엔드를 먼저 기록
+                _local_embeddings_backend = backend
+                _local_embeddings = embeddings
+
+    return _local_embeddings
+
+
+def load_local_embeddings(batch_size: int = 32, threads: int = 0, backend: str = 'torch'):
+    """
+    로컬 임베딩 모델 로드
 
+    Args:
+        batch_size: 인코딩 배치 크기
+        threads: CPU 추론 스레드 수 (0이면 기본값 유지)
+        backend: 추론 방식 (torch, quantized, onnx)
 
-class RAGEngineFree:
+    Returns:
+        HuggingFaceEmbeddings: 임베딩 객체
+    """
+    if backend not in LOCAL_EMBEDDING_BACKENDS:
+        raise ValueError(f"지원하지 않는 임베딩 백엔드입니다: {backend} ({', '.join(LOCAL_EMBEDDING_BACKENDS)})")
+
+    # torch 등 무거운 의존성은 실제로 필요할 때만 로드
+    import torch
+    from langchain.embeddings import HuggingFaceEmbeddings
+
+    if threads > 0:
+        torch.set_num_threads(threads)
+
+    model_kwargs = {'device': 'cpu'}
+    if backend == 'onnx':
+        model_kwargs['backend'] = 'onnx'
+
+    print(f"📥 HuggingFace 임베딩 모델 로드 중... (백엔드: {backend}, 배치: {batch_size}, 최초 1회만 다운로드)")
+    try:
+        embeddings = HuggingFaceEmbeddings(
+            model_name=LOCAL_EMBEDDING_MODEL,
+            model_kwargs=model_kwargs,
+            encode_kwargs={'batch_size': batch_size}
+        )
+    except TypeError as e:
+        if backend == 'onnx':
+            raise ValueError(
+                "ONNX 백엔드는 sentence-transformers>=3.2 와 optimum[onnxruntime] 이 필요합니다."
+            ) from e
+        raise
+
+    if backend == 'quantized':
+        torch.quantization.quantize_dynamic(
+            embeddings.client, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+
+    print(f"✅ 임베딩 모델 로드 완료 (스레드: {torch.get_num_threads()})")
+    return embeddings
+
+
+class RAGEngineFree(RAGEngine):
     """RAG 파이프라인 관리 클래스 (무료 임베딩 사용)"""
-    
-    def __init__(self, openai_api_key: str):
+
+    DEFAULT_STORE_PATH = "vector_store_free"
+
+    def __init__(self, openai_api_key: str, embeddings=None, client=None):
         """
         Args:
             openai_api_key: OpenAI API 키 (답변 생성용만 사용)
+            embeddings: 사용할 임베딩 객체 (기본값: 프로세스 공유 HuggingFace 임베딩)
+            client: 사용할 OpenAI 호환 클라이언트 (기본값: 프로세스 공유 OpenAI 클라이언트)
         """
-        self.api_key = openai_api_key
-        
-        # HuggingFace 임베딩 사용 (무료, 로컬)
-        print("📥 HuggingFace 임베딩 모델 로드 중... (최초 1회만 다운로드)")
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+        # HuggingFace 임베딩 사용 (무료, 로컬, 프로세스당 1회 로드)
+        super().__init__(
+            openai_api_key,
+            embeddings=embeddings or get_local_embeddings(),
+            client=client
         )
-        
-        self.vector_store = None
-        self.chunks_metadata = []
-        self.client = OpenAI(api_key=openai_api_key)
-        
-    def build_vector_store(self, chunks: List[Dict]) -> None:
-        """
-        청크로부터 벡터 스토어 구축
-        
-        Args:
-            chunks: PDF 처리로부터 얻은 청크 리스트
-        """
-        # 청크 메타데이터 저장
-        self.chunks_metadata = chunks
-        
-        # LangChain Document 객체로 변환
-        documents = []
-        for chunk in chunks:
-            doc = Document(
-                page_content=chunk['text'],
-                metadata={
-                    'chunk_id': chunk['chunk_id'],
-                    'page_number': chunk['page_number'],
-                    'source': chunk['source']
-                }
-            )
-            documents.append(doc)
-        
-        # FAISS 벡터 스토어 생성
-        print(f"📊 {len(documents)}개의 청크에 대한 임베딩 생성 중... (무료 모델 사용)")
-        self.vector_store = FAISS.from_documents(documents, self.embeddings)
-        print("✅ 벡터 스토어 구축 완료!")
-        
+
+    def embedding_model_name(self) -> str:
+        """임베딩 모델명 (프로세스 공유 로컬 모델이면 추론 백엔드/양자화 방식 포함)"""
+        name = super().embedding_model_name()
+        if self.embeddings is _local_embeddings:
+            name += LOCAL_EMBEDDING_VARIANTS[_local_embeddings_backend]
+        return name
+
     def save_vector_store(self, path: str = "vector_store_free") -> None:
         """
         벡터 스토어를 디스크에 저장
-        
+
         Args:
             path: 저장 경로
         """
-        if self.vector_store is None:
-            raise ValueError("저장할 벡터 스토어가 없습니다.")
-        
-        os.makedirs(path, exist_ok=True)
-        
-        # FAISS 인덱스 저장
-        self.vector_store.save_local(path)
-        
-        # 메타데이터 저장
-        metadata_path = os.path.join(path, "chunks_metadata.pkl")
-        with open(metadata_path, 'wb') as f:
-            pickle.dump(self.chunks_metadata, f)
-        
-        print(f"💾 벡터 스토어가 {path}에 저장되었습니다.")
-        
+        super().save_vector_store(path)
+
     def load_vector_store(self, path: str = "vector_store_free") -> None:
         """
         디스크로부터 벡터 스토어 로드
-        
+
         Args:
             path: 로드 경로
         """
-        if not os.path.exists(path):
-            raise ValueError(f"{path} 경로가 존재하지 않습니다.")
-        
-        # FAISS 인덱스 로드
-        self.vector_store = FAISS.load_local(
-            path, 
-            self.embeddings,
-            allow_dangerous_deserialization=True
-        )
-        
-        # 메타데이터 로드
-        metadata_path = os.path.join(path, "chunks_metadata.pkl")
-        if os.path.exists(metadata_path):
-            with open(metadata_path, 'rb') as f:
-                self.chunks_metadata = pickle.load(f)
-        
-        print(f"📂 벡터 스토어가 {path}로부터 로드되었습니다.")
-        
-    def search(self, query: str, k: int = 3) -> List[Dict]:
-        """
-        질의에 대한 유사 청크 검색
-        
-        Args:
-            query: 사용자 질문
-            k: 반환할 결과 개수
-            
-        Returns:
-            List[Dict]: 검색된 청크와 메타데이터
-        """
-        if self.vector_store is None:
-            raise ValueError("벡터 스토어가 초기화되지 않았습니다.")
-        
-        # 유사도 검색 (점수 포함)
-        results = self.vector_store.similarity_search_with_score(query, k=k)
-        
-        search_results = []
-        for doc, score in results:
-            result = {
-                'text': doc.page_content,
-                'page_number': doc.metadata['page_number'],
-                'chunk_id': doc.metadata['chunk_id'],
-                'source': doc.metadata['source'],
-                'similarity_score': float(score)
-            }
-            search_results.append(result)
-        
-        return search_results
-    
-    def generate_answer(self, query: str, search_results: List[Dict], system_prompt: str = None) -> Dict:
-        """
-        검색 결과를 기반으로 LLM 답변 생성
-        
-        Args:
-            query: 사용자 질문
-            search_results: 검색된 청크들
-            system_prompt: 시스템 프롬프트 (선택)
-            
-        Returns:
-            Dict: 답변 및 참조 페이지 정보
-        """
-        # 컨텍스트 구성
-        context_parts = []
-        page_numbers = set()
-        
-        for i, result in enumerate(search_results, 1):
-            context_parts.append(
-                f"[문서 {i} - 페이지 {result['page_number']}]\n{result['text']}\n"
-            )
-            page_numbers.add(result['page_number'])
-        
-        context = "\n".join(context_parts)
-        
-        # 기본 시스템 프롬프트
-        if system_prompt is None:
-            system_prompt = """당신은 전문적인 설치 안내 전문가입니다. 
-제공된 문서 내용을 바탕으로 사용자의 질문에 명확하고 단계적으로 답변해주세요.
-
-답변 형식:
-1. **개요**: 질문에 대한 간단한 요약
-2. **단계별 설명**: 구체적인 단계를 번호로 나열
-3. **참고사항**: 추가로 알아야 할 중요한 정보
-
-답변은 한국어로 작성하며, 전문적이면서도 이해하기 쉽게 작성해주세요."""
-        
-        # OpenAI API 호출
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"""다음 문서 내용을 참고하여 질문에 답변해주세요.
-
-문서 내용:
-{context}
-
-질문: {query}"""}
-        ]
-        
-        response = self.client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            temperature=0.7,
-            max_tokens=1500
-        )
-        
-        answer = response.choices[0].message.content
-        
-        return {
-            'answer': answer,
-            'referenced_pages': sorted(list(page_numbers)),
-            'source_chunks': search_results,
-            'model': response.model,
-            'total_tokens': response.usage.total_tokens
-        }
-    
-    def query(self, question: str, k: int = 3, system_prompt: str = None) -> Dict:
-        """
-        질의에 대한 완전한 RAG 파이프라인 실행
-        
-        Args:
-            question: 사용자 질문
-            k: 검색할 청크 개수
-            system_prompt: 커스텀 시스템 프롬프트
-            
-        Returns:
-            Dict: 답변, 참조 페이지, 검색 결과 등
-        """
-        # 1. 검색
-        search_results = self.search(question, k=k)
-        
-        # 2. 답변 생성
-        result = self.generate_answer(question, search_results, system_prompt)
-        
-        # 3. 질문 추가
-        result['question'] = question
-        
-        return result
-
+        super().load_vector_store(path)
@@ -0,0 +1,92 @@
+"""
+동일 요청 병합(single-flight) 모듈
+- 같은 키로 동시에 들어온 호출 중 하나만 실제로 실행
+- 나머지 호출은 대기했다가 같은 결과(또는 예외)를 공유
+"""
+import re
+import threading
+import unicodedata
+from typing import Callable, Dict, Hashable, Tuple
+
+from metrics import counter
+
+
+SINGLEFLIGHT_CALLS = counter(
+    'pdfchat_singleflight_calls_total', '동일 요청 병합 결과 (leader: 실제 실행, shared: 결과 공유)',
+    ('group', 'role')
+)
+
+
+def normalize_question(question: str) -> str:
+    """병합 키 생성을 위한 질문 정규화 (유니코드/대소문자/공백/끝 문장부호)"""
+    text = unicodedata.normalize('NFKC', question).lower()
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text.rstrip(' ?!.。？！')
+
+
+class _Call:
+    """진행 중인 호출 상태"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """키 단위로 동시 호출을 하나로 합치는 클래스"""
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name: 지표에 표시할 그룹 이름
+        """
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable) -> Tuple[object, bool]:
+        """
+        같은 키의 호출이 진행 중이면 그 결과를 기다리고, 아니면 직접 실행
+
+        Args:
+            key: 병합 키
+            func: 실행할 함수 (인자 없음)
+
+        Returns:
+            Tuple: (결과, 다른 호출의 결과를 공유했는지 여부)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            SINGLEFLIGHT_CALLS.inc(group=self.name, role='shared')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        SINGLEFLIGHT_CALLS.inc(group=self.name, role='leader')
+        try:
+            call.result = func()
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        """현재 진행 중인 고유 호출 수"""
+        with self._lock:
+            return len(self._calls)
@@ -1,5 +1,6 @@
 // 전역 변수
 let currentPDF = null;
+let sessionId = null;  // 대화 모드 세션 ID (PDF를 새로 로드할 때마다 새 대화 시작)
 
 // DOM 로드 완료 시 초기화
 document.addEventListener('DOMContentLoaded', function() {
@@ -81,6 +82,7 @@ async function handlePDFUpload(event) {
         
         if (response.ok) {
             currentPDF = data;
+            sessionId = createSessionId();
             displayPDFInfo(data);
             enableChat();
             showNotification('PDF가 성공적으로 처리되었습니다!', 'success');
@@ -118,6 +120,7 @@ async function handlePDFSelect(item) {
         
         if (response.ok) {
             currentPDF = data;
+            sessionId = createSessionId();
             displayPDFInfo(data);
             enableChat();
             showNotification(`${filename}이(가) 로드되었습니다.`, 'success');
@@ -136,6 +139,14 @@ async function handlePDFSelect(item) {
     }
 }
 
+// 대화 세션 ID 생성
+function createSessionId() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+
 // PDF 정보 표시
 function displayPDFInfo(data) {
     const pdfInfo = document.getElementById('current-pdf-info');
@@ -210,7 +221,7 @@ async function handleChatSubmit(event) {
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({ question })
+            body: JSON.stringify({ question, session_id: sessionId, client_render: supportsClientRender() })
         });
         
         const data = await response.json();
@@ -319,8 +330,8 @@ function addBotMessage(data) {
         contentHTML += '<div class="answer-category"><div class="category-title"><i class="fas fa-image"></i> 참조 페이지</div><div>';
         data.references.page_images.forEach(img => {
             contentHTML += `
-                <div class="page-preview" onclick="openImageModal('${img.image_url}')">
-                    <img src="${img.image_url}" alt="Page ${img.page_number}">
+                <div class="page-preview" onclick="openImageModal('${pageOpenUrl(img)}')">
+                    ${pageImageHTML(img, '150px')}
                     <span class="page-number-badge">페이지 ${img.page_number}</span>
                 </div>
             `;
@@ -339,9 +350,111 @@ function addBotMessage(data) {
     `;
     
     messagesContainer.appendChild(messageDiv);
+    observePageImages(messageDiv);
     scrollToBottom();
 }
 
+// 페이지 이미지 (자리표시자를 먼저 보여주고, 화면에 보이면 크기에 맞는 해상도로 교체)
+function pageImageHTML(img, sizes) {
+    if (img.pdf_url) {
+        // 브라우저 렌더링: 화면에 보이면 PDF.js로 그림
+        return `<canvas class="lazy-page pdf-page" data-pdf-url="${img.pdf_url}" data-page-number="${img.page_number}"
+                    data-fallback="${img.image_url}" width="${img.width}" height="${img.height}"
+                    aria-label="Page ${img.page_number}"></canvas>`;
+    }
+    if (!img.placeholder) {
+        return `<img src="${img.image_url}" alt="Page ${img.page_number}">`;
+    }
+    return `<img class="lazy-page" src="${img.placeholder}" data-srcset="${img.srcset}" data-src="${img.thumbnail_url}"
+                sizes="${sizes}" width="${img.width}" height="${img.height}" alt="Page ${img.page_number}">`;
+}
+
+// 화면 근처에 들어온 페이지 이미지만 실제 해상도로 로드
+const pageImageObserver = 'IntersectionObserver' in window
+    ? new IntersectionObserver((entries, observer) => {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                observer.unobserve(entry.target);
+                loadPageImage(entry.target);
+            }
+        });
+    }, { rootMargin: '200px' })
+    : null;
+
+function loadPageImage(imgEl) {
+    if (imgEl.dataset.pdfUrl) {
+        renderPdfPage(imgEl);
+        return;
+    }
+    if (!imgEl.dataset.srcset) return;
+    imgEl.addEventListener('load', () => imgEl.classList.add('loaded'), { once: true });
+    imgEl.srcset = imgEl.dataset.srcset;
+    imgEl.src = imgEl.dataset.src;
+    delete imgEl.dataset.srcset;
+}
+
+// 페이지를 열 때의 주소 (브라우저 렌더링이면 원본 PDF의 해당 페이지)
+function pageOpenUrl(img) {
+    return img.pdf_url ? `${img.pdf_url}#page=${img.page_number}` : img.image_url;
+}
+
+// 브라우저 PDF 렌더링 (PDF.js가 원본 PDF에서 필요한 바이트 범위만 Range 요청으로 가져옴)
+const PDFJS_WORKER_SRC = 'https://cdnjs.cloudflare.com/ajax/libs/pdf.js/3.11.174/pdf.worker.min.js';
+const pdfDocuments = new Map();
+
+function supportsClientRender() {
+    return Boolean(window.pdfjsLib) && 'Worker' in window && 'IntersectionObserver' in window;
+}
+
+function getPdfDocument(url) {
+    if (!pdfDocuments.has(url)) {
+        pdfjsLib.GlobalWorkerOptions.workerSrc = PDFJS_WORKER_SRC;
+        const task = pdfjsLib.getDocument({
+            url,
+            disableAutoFetch: true,  // 미리 전체를 받지 않고 그릴 페이지에 필요한 범위만 요청
+            disableStream: true,
+            rangeChunkSize: 65536
+        });
+        pdfDocuments.set(url, task.promise);
+    }
+    return pdfDocuments.get(url);
+}
+
+async function renderPdfPage(canvas) {
+    const { pdfUrl, pageNumber, fallback } = canvas.dataset;
+    delete canvas.dataset.pdfUrl;
+    
+    try {
+        const pdf = await getPdfDocument(pdfUrl);
+        const page = await pdf.getPage(Number(pageNumber));
+        const unscaled = page.getViewport({ scale: 1 });
+        const cssWidth = canvas.clientWidth || unscaled.width;
+        const viewport = page.getViewport({ scale: cssWidth / unscaled.width * (window.devicePixelRatio || 1) });
+        
+        canvas.width = Math.floor(viewport.width);
+        canvas.height = Math.floor(viewport.height);
+        await page.render({ canvasContext: canvas.getContext('2d'), viewport }).promise;
+        canvas.classList.add('loaded');
+    } catch (error) {
+        // 렌더링 실패 시 서버에서 렌더링한 이미지로 대체
+        console.error('PDF 페이지 렌더링 실패:', error);
+        const img = document.createElement('img');
+        img.src = fallback;
+        img.alt = `Page ${pageNumber}`;
+        canvas.replaceWith(img);
+    }
+}
+
+function observePageImages(container) {
+    container.querySelectorAll('.lazy-page').forEach(imgEl => {
+        if (pageImageObserver) {
+            pageImageObserver.observe(imgEl);
+        } else {
+            loadPageImage(imgEl);
+        }
+    });
+}
+
 // 텍스트 포맷팅 (마크다운 스타일)
 function formatText(text) {
     if (!text) return '';
@@ -373,13 +486,14 @@ function displayReferences(references) {
         references.page_images.forEach(img => {
             const card = document.createElement('div');
             card.className = 'page-card';
-            card.onclick = () => openImageModal(img.image_url);
+            card.onclick = () => openImageModal(pageOpenUrl(img));
             card.innerHTML = `
-                <img src="${img.image_url}" alt="Page ${img.page_number}">
+                ${pageImageHTML(img, '(max-width: 1024px) 90vw, 320px')}
                 <div class="page-card-info">페이지 ${img.page_number}</div>
             `;
             pagesContainer.appendChild(card);
         });
+        observePageImages(pagesContainer);
     }
     
     // 검색된 청크
@@ -402,7 +516,7 @@ function displayReferences(references) {
     }
 }
 
-// 이미지 모달 열기
+// 이미지 모달 열기 (원본 해상도는 페이지를 열 때만 로드)
 function openImageModal(imageUrl) {
     // 간단한 구현: 새 탭에서 열기
     window.open(imageUrl, '_blank');
@@ -0,0 +1,573 @@
+"""
+디스크 용량 관리
+- 업로드 폴더, 인덱스 루트, 페이지 이미지 디렉토리의 사용량을 문서별/산출물 종류별로 집계
+  (pdf: 원본, sidecar: 페이지 텍스트, index: 벡터 인덱스, page_images: 렌더링된 페이지 이미지)
+- 디스크 예산(STORAGE_BUDGET_BYTES)은 업로드 폴더가 있는 파일시스템에만 적용
+  (Render처럼 업로드 폴더만 영구 디스크인 경우 다른 디스크의 산출물은 예산에 넣지도, 지우지도 않음)
+- 예산을 넘으면 다시 만들 수 있는 산출물부터 오래 사용하지 않은 문서 순으로 삭제
+  (1단계: 페이지 이미지, 2단계: 인덱스와 사이드카, 3단계(STORAGE_EVICT_UPLOADS): 원본 PDF까지 문서 전체)
+- 원본 PDF가 없는 산출물, 중단된 구축/가져오기의 임시 파일 정리 (유예 시간 이후)
+
+환경 변수:
+- STORAGE_BUDGET_BYTES: 디스크 예산 (예: 9G, 500M, 바이트 수. 기본값 0 = 제한 없음)
+- STORAGE_LOW_WATERMARK: 예산 초과 시 이 비율까지 줄임 (기본값 0.9)
+- STORAGE_ORPHAN_GRACE: 고아 산출물/임시 파일을 삭제하기 전 유예 시간 (초, 기본값 3600)
+- STORAGE_CHECK_INTERVAL: 요청 처리 중 예산 확인(디스크 스캔) 최소 간격 (초, 기본값 60)
+- STORAGE_EVICT_UPLOADS: 1이면 이미지/인덱스를 비워도 넘을 때 오래된 원본 PDF도 삭제 (기본값 0)
+
+사용 예:
+    python storage_manager.py stats
+    python storage_manager.py enforce --budget 9G --dry-run
+    python storage_manager.py gc
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from dotenv import load_dotenv
+
+import index_store
+from metrics import counter, gauge
+from pdf_processor import PAGE_IMAGE_DIR, SIDECAR_SUFFIX
+
+
+ARTIFACTS = ('pdf', 'sidecar', 'index', 'page_images')
+
+# 예산 초과 시 삭제 순서 (다시 만드는 비용이 작은 것부터)
+EVICTION_TIERS = (('page_images',), ('index', 'sidecar'))
+# STORAGE_EVICT_UPLOADS를 켜면 마지막으로 오래된 문서를 원본 PDF까지 통째로 삭제
+UPLOAD_EVICTION_TIER = ('page_images', 'index', 'sidecar', 'pdf')
+
+PAGE_IMAGE_PATTERN = re.compile(r'^(?P<stem>.+)_page_\d+(?:_\d+dpi)?\.png$')
+_SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+STORAGE_BYTES = gauge('pdfchat_storage_bytes', '산출물 종류별 디스크 사용량 (바이트)', ('artifact',))
+STORAGE_EVICTIONS = counter('pdfchat_storage_evictions_total', '예산 초과로 삭제한 문서 산출물 수', ('artifact',))
+STORAGE_EVICTED_BYTES = counter('pdfchat_storage_evicted_bytes_total', '예산 초과로 삭제한 바이트 수', ('artifact',))
+STORAGE_GC_BYTES = counter('pdfchat_storage_gc_bytes_total', '고아 산출물/임시 파일 정리로 삭제한 바이트 수')
+
+
+def parse_size(text) -> int:
+    """'9G', '500M', '1024' 형식의 크기를 바이트 수로 변환"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:i?B)?\s*', str(text), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"크기 형식이 올바르지 않습니다: {text} (예: 9G, 500M, 1048576)")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+
+
+STORAGE_BUDGET_BYTES = parse_size(os.getenv('STORAGE_BUDGET_BYTES', '0'))
+STORAGE_LOW_WATERMARK = float(os.getenv('STORAGE_LOW_WATERMARK', 0.9))
+STORAGE_ORPHAN_GRACE = int(os.getenv('STORAGE_ORPHAN_GRACE', 3600))
+STORAGE_CHECK_INTERVAL = float(os.getenv('STORAGE_CHECK_INTERVAL', 60))
+STORAGE_EVICT_UPLOADS = os.getenv('STORAGE_EVICT_UPLOADS', '').lower() in ('1', 'true', 'yes')
+
+
+def _path_stats(path: str) -> tuple:
+    """파일 또는 디렉토리의 (바이트 수, 가장 최근 수정 시각)"""
+    if not os.path.isdir(path):
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime
+
+    total, newest = 0, os.stat(path).st_mtime
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                stat = os.stat(os.path.join(root, name))
+            except FileNotFoundError:
+                continue
+            total += stat.st_size
+            newest = max(newest, stat.st_mtime)
+    return total, newest
+
+
+def _remove_path(path: str) -> None:
+    """파일/디렉토리 삭제 (디렉토리는 이름을 바꾼 뒤 삭제하여 다른 워커가 반쯤 지워진 인덱스를 읽지 않도록 함)"""
+    try:
+        if os.path.isdir(path):
+            retired = f"{path}.evicted-{os.getpid()}"
+            os.replace(path, retired)
+            shutil.rmtree(retired, ignore_errors=True)
+        else:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class StorageManager:
+    """문서 산출물 디스크 사용량 집계와 예산 관리"""
+
+    def __init__(
+        self,
+        upload_dir: str,
+        index_root: str,
+        image_dir: str = PAGE_IMAGE_DIR,
+        budget_bytes: int = STORAGE_BUDGET_BYTES,
+        low_watermark: float = STORAGE_LOW_WATERMARK,
+        orphan_grace: float = STORAGE_ORPHAN_GRACE,
+        check_interval: float = STORAGE_CHECK_INTERVAL,
+        evict_uploads: bool = STORAGE_EVICT_UPLOADS
+    ):
+        """
+        Args:
+            upload_dir: 업로드 폴더 (원본 PDF, 사이드카). 예산은 이 폴더가 있는 파일시스템에 적용
+            index_root: 인덱스 루트 디렉토리
+            image_dir: 페이지 이미지 디렉토리
+            budget_bytes: 디스크 예산 (0이면 제한 없음)
+            low_watermark: 예산 초과 시 줄일 목표 비율
+            orphan_grace: 고아 산출물/임시 파일 삭제 유예 시간 (초)
+            check_interval: maybe_enforce()/admit()의 최소 재스캔 간격 (초)
+            evict_uploads: True면 이미지/인덱스를 비워도 넘을 때 오래된 원본 PDF까지 문서 단위로 삭제
+        """
+        self.upload_dir = upload_dir
+        self.index_root = index_root
+        self.image_dir = image_dir
+        self.budget_bytes = max(0, budget_bytes)
+        self.low_watermark = min(1.0, max(0.0, low_watermark))
+        self.orphan_grace = orphan_grace
+        self.check_interval = check_interval
+        self.evict_uploads = evict_uploads
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._estimated_bytes = None  # 마지막 스캔 이후 예산 디스크 사용량 추정치
+        self._background = None
+
+    def _device(self, path: str) -> Optional[int]:
+        """경로가 속한 파일시스템 (아직 없으면 가장 가까운 상위 디렉토리 기준)"""
+        path = os.path.abspath(path)
+        while not os.path.exists(path):
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None
+            path = parent
+        return os.stat(path).st_dev
+
+    def budgeted_artifacts(self) -> tuple:
+        """예산 파일시스템(업로드 폴더가 있는 디스크)에 있는 산출물 종류"""
+        device = self._device(self.upload_dir)
+        roots = {'pdf': self.upload_dir, 'sidecar': self.upload_dir, 'index': self.index_root, 'page_images': self.image_dir}
+        return tuple(artifact for artifact in ARTIFACTS if self._device(roots[artifact]) == device)
+
+    def scan(self) -> tuple:
+        """
+        디스크 스캔
+
+        Returns:
+            Tuple[Dict[str, Dict], List[Dict]]:
+                (문서 ID -> {document_id, source, bytes, paths, last_used, orphan},
+                 임시 파일 목록 [{path, bytes, modified, budgeted}])
+        """
+        documents: Dict[str, Dict] = {}
+        temporary: List[Dict] = []
+        budgeted = self.budgeted_artifacts()
+
+        def add(doc_id: str, artifact: str, path: str, source: Optional[str] = None) -> Optional[Dict]:
+            try:
+                size, modified = _path_stats(path)
+            except FileNotFoundError:
+                return None
+            entry = documents.setdefault(doc_id, {
+                'document_id': doc_id,
+                'source': None,
+                'bytes': dict.fromkeys(ARTIFACTS, 0),
+                'paths': {artifact_name: [] for artifact_name in ARTIFACTS},
+                'modified': 0.0,
+                'source_missing': False,
+                'path_bytes': {}
+            })
+            entry['bytes'][artifact] += size
+            entry['paths'][artifact].append(path)
+            entry['path_bytes'][path] = size
+            entry['modified'] = max(entry['modified'], modified)
+            if source and (artifact == 'pdf' or entry['source'] is None):
+                entry['source'] = source
+            return entry
+
+        def add_temporary(path: str, artifact: str) -> None:
+            try:
+                size, modified = _path_stats(path)
+            except FileNotFoundError:
+                return
+            temporary.append({'path': path, 'bytes': size, 'modified': modified, 'budgeted': artifact in budgeted})
+
+        for name in self._listdir(self.upload_dir):
+            path = os.path.join(self.upload_dir, name)
+            if name.endswith('.tmp'):
+                add_temporary(path, 'pdf')
+            elif name.endswith(SIDECAR_SUFFIX):
+                source = name[:-len(SIDECAR_SUFFIX)]
+                add(index_store.document_id(os.path.join(self.upload_dir, source)), 'sidecar', path, source)
+            elif name.lower().endswith('.pdf') and os.path.isfile(path):
+                add(index_store.document_id(path), 'pdf', path, name)
+
+        for name in self._listdir(self.index_root):
+            path = os.path.join(self.index_root, name)
+            if not os.path.isdir(path):
+                if name.endswith('.tmp'):
+                    add_temporary(path, 'index')
+                continue
+            manifest = index_store.read_manifest(path)
+            if manifest is None or name.startswith('.') or '.evicted-' in name:
+                # 구축 중(체크포인트만 있음)이거나 중단된 가져오기/삭제의 잔여물
+                add_temporary(path, 'index')
+                continue
+            entry = add(name, 'index', path, manifest.get('source'))
+            if entry is not None:
+                # 업로드 폴더 밖의 PDF(ingest.py)로 만든 인덱스는 그 PDF가 남아 있는 동안 유지
+                source_path = manifest.get('source_path')
+                if source_path:
+                    entry['source_missing'] = not os.path.exists(source_path)
+                else:
+                    # 경로 해시가 없던 이전 형식의 문서 ID: 현재 문서 ID와 다르면 더 이상 쓰이지 않음
+                    legacy_path = os.path.join(self.upload_dir, manifest.get('source') or '')
+                    entry['source_missing'] = index_store.document_id(legacy_path) != name
+
+        for name in self._listdir(self.image_dir):
+            match = PAGE_IMAGE_PATTERN.match(name)
+            if match:
+                source = f"{match.group('stem')}.pdf"
+                add(index_store.document_id(os.path.join(self.upload_dir, source)), 'page_images',
+                    os.path.join(self.image_dir, name), source)
+
+        usage = index_store.read_usage(self.index_root)
+        for doc_id, entry in documents.items():
+            entry['last_used'] = usage.get(doc_id, {}).get('last_used') or entry['modified']
+            if entry['paths']['pdf']:
+                entry['orphan'] = False
+            elif entry['paths']['index']:
+                entry['orphan'] = entry['source_missing']
+            else:
+                entry['orphan'] = True
+        return documents, temporary
+
+    @staticmethod
+    def _listdir(directory: str) -> List[str]:
+        try:
+            return sorted(os.listdir(directory))
+        except FileNotFoundError:
+            return []
+
+    def _summarize(self, documents: Dict[str, Dict], temporary: List[Dict], budgeted: tuple) -> Dict:
+        """스캔 결과 요약 및 사용량 지표 갱신"""
+        artifacts = {
+            artifact: sum(entry['bytes'][artifact] for entry in documents.values())
+            for artifact in ARTIFACTS
+        }
+        temporary_bytes = sum(item['bytes'] for item in temporary)
+        for artifact, size in artifacts.items():
+            STORAGE_BYTES.set(size, artifact=artifact)
+        STORAGE_BYTES.set(temporary_bytes, artifact='temporary')
+
+        budget_disk_bytes = sum(artifacts[artifact] for artifact in budgeted) + \
+            sum(item['bytes'] for item in temporary if item['budgeted'])
+        return {
+            'total_bytes': sum(artifacts.values()) + temporary_bytes,
+            'budget_disk_bytes': budget_disk_bytes,
+            'artifacts': artifacts,
+            'temporary_bytes': temporary_bytes
+        }
+
+    def stats(self) -> Dict:
+        """
+        사용량 통계
+
+        Returns:
+            Dict: total_bytes, budget_disk_bytes(예산 파일시스템 사용량), budget_bytes, budgeted_artifacts,
+                  artifacts(종류별 바이트), temporary_bytes, disk(예산 파일시스템 전체/여유), documents(문서별, 큰 순)
+        """
+        budgeted = self.budgeted_artifacts()
+        documents, temporary = self.scan()
+        summary = self._summarize(documents, temporary, budgeted)
+        self._estimated_bytes = summary['budget_disk_bytes']
+
+        rows = [
+            {
+                'document_id': entry['document_id'],
+                'source': entry['source'],
+                'bytes': entry['bytes'],
+                'total_bytes': sum(entry['bytes'].values()),
+                'last_used': entry['last_used'],
+                'orphan': entry['orphan']
+            }
+            for entry in documents.values()
+        ]
+        rows.sort(key=lambda row: row['total_bytes'], reverse=True)
+
+        disk = None
+        if os.path.exists(self.upload_dir):
+            usage = shutil.disk_usage(self.upload_dir)
+            disk = {'total_bytes': usage.total, 'free_bytes': usage.free}
+        return dict(
+            summary,
+            budget_bytes=self.budget_bytes,
+            budget_used=summary['budget_disk_bytes'] / self.budget_bytes if self.budget_bytes else None,
+            budgeted_artifacts=list(budgeted),
+            disk=disk,
+            documents=rows
+        )
+
+    def _garbage(self, documents: Dict[str, Dict], temporary: List[Dict]) -> List[Dict]:
+        """스캔 결과에서 정리 대상 (유예 시간이 지난 임시 파일과 고아 문서 산출물)"""
+        cutoff = time.time() - self.orphan_grace
+        garbage = [
+            {'document_id': None, 'artifact': 'temporary', 'path': item['path'],
+             'bytes': item['bytes'], 'budgeted': item['budgeted']}
+            for item in temporary if item['modified'] < cutoff
+        ]
+
+        for entry in documents.values():
+            # 번들로 가져온 직후처럼 PDF가 곧 올라올 수 있으므로 최근 산출물은 유지
+            if not entry['orphan'] or entry['modified'] >= cutoff:
+                continue
+            for artifact in ARTIFACTS:
+                for path in entry['paths'][artifact]:
+                    garbage.append({
+                        'document_id': entry['document_id'],
+                        'artifact': artifact,
+                        'path': path,
+                        'bytes': entry['path_bytes'][path]
+                    })
+                entry['paths'][artifact] = []
+                entry['bytes'][artifact] = 0
+        return garbage
+
+    def _delete(self, garbage: List[Dict]) -> None:
+        for item in garbage:
+            _remove_path(item['path'])
+            STORAGE_GC_BYTES.inc(item['bytes'])
+
+    def collect_garbage(self, dry_run: bool = False) -> List[Dict]:
+        """
+        원본 PDF가 없는 문서의 산출물과 임시 파일 정리 (유예 시간이 지난 것만)
+
+        Returns:
+            List[Dict]: 삭제한(dry_run이면 삭제할) 항목 [{document_id, artifact, path, bytes}]
+        """
+        documents, temporary = self.scan()
+        garbage = self._garbage(documents, temporary)
+        if not dry_run:
+            self._delete(garbage)
+        return garbage
+
+    def enforce(self, required_bytes: int = 0, protected: Iterable[str] = (), dry_run: bool = False) -> Dict:
+        """
+        디스크 예산 적용 (고아 정리 후, 그래도 넘으면 오래 사용하지 않은 문서의 산출물부터 삭제)
+
+        디스크는 한 번만 스캔하며, 예산 파일시스템에 있는 산출물만 예산에 포함하고 삭제합니다.
+
+        Args:
+            required_bytes: 곧 쓸 바이트 수 (업로드 크기 등)
+            protected: 인덱스/PDF를 삭제하지 않을 문서 ID (현재 로드된 문서)
+            dry_run: True면 삭제하지 않고 계획만 반환
+
+        Returns:
+            Dict: enabled, before_bytes, after_bytes, budget_bytes, within_budget, collected, evicted
+        """
+        if not self.budget_bytes:
+            return {'enabled': False, 'within_budget': True, 'collected': [], 'evicted': []}
+
+        with self._lock:
+            self._last_check = time.monotonic()
+            budgeted = self.budgeted_artifacts()
+            documents, temporary = self.scan()
+            before = self._summarize(documents, temporary, budgeted)['budget_disk_bytes']
+
+            collected = self._garbage(documents, temporary)
+            if not dry_run:
+                self._delete(collected)
+            total = before - sum(
+                item['bytes'] for item in collected
+                if item['artifact'] in budgeted or item.get('budgeted')
+            )
+
+            evicted = []
+            target = self.budget_bytes * self.low_watermark - required_bytes
+            if total + required_bytes > self.budget_bytes:
+                lru = sorted(documents.values(), key=lambda entry: entry['last_used'])
+                protected = set(protected)
+                tiers = EVICTION_TIERS + ((UPLOAD_EVICTION_TIER,) if self.evict_uploads else ())
+
+                for tier in tiers:
+                    tier = tuple(artifact for artifact in tier if artifact in budgeted)
+                    for entry in lru:
+                        if total <= target or not tier:
+                            break
+                        if ('index' in tier or 'pdf' in tier) and entry['document_id'] in protected:
+                            continue
+                        if 'pdf' in tier and not entry['paths']['pdf']:
+                            continue
+                        for artifact in tier:
+                            if not entry['paths'][artifact]:
+                                continue
+                            size = entry['bytes'][artifact]
+                            if not dry_run:
+                                for path in entry['paths'][artifact]:
+                                    _remove_path(path)
+                                STORAGE_EVICTIONS.inc(artifact=artifact)
+                                STORAGE_EVICTED_BYTES.inc(size, artifact=artifact)
+                            evicted.append({
+                                'document_id': entry['document_id'],
+                                'source': entry['source'],
+                                'artifact': artifact,
+                                'bytes': size,
+                                'last_used': entry['last_used']
+                            })
+                            entry['paths'][artifact] = []
+                            entry['bytes'][artifact] = 0
+                            total -= size
+
+            if not dry_run:
+                self._summarize(documents, temporary, budgeted)  # 사용량 지표 갱신 (다시 스캔하지 않음)
+                self._estimated_bytes = total
+
+        return {
+            'enabled': True,
+            'before_bytes': before,
+            'after_bytes': total,
+            'budget_bytes': self.budget_bytes,
+            'required_bytes': required_bytes,
+            'within_budget': total + required_bytes <= self.budget_bytes,
+            'collected': collected,
+            'evicted': evicted
+        }
+
+    def admit(self, required_bytes: int, protected: Iterable[str] = ()) -> bool:
+        """
+        곧 쓸 바이트(업로드 등)가 예산 안에 들어가는지 확인
+
+        최근 스캔 추정치로 충분하면 디스크를 스캔하지 않고, 부족하거나 추정치가 오래되었을 때만
+        enforce()로 공간을 비운 뒤 판단합니다.
+        """
+        if not self.budget_bytes:
+            return True
+        with self._lock:
+            fresh = self._estimated_bytes is not None and \
+                time.monotonic() - self._last_check < self.check_interval
+            if fresh and self._estimated_bytes + required_bytes <= self.budget_bytes:
+                self._estimated_bytes += required_bytes
+                return True
+        report = self.enforce(required_bytes=required_bytes, protected=protected)
+        if report['within_budget']:
+            with self._lock:
+                self._estimated_bytes = report['after_bytes'] + required_bytes
+        return report['within_budget']
+
+    def maybe_enforce(self, protected: Iterable[str] = ()) -> bool:
+        """
+        마지막 확인 후 check_interval이 지났으면 백그라운드 스레드에서 예산 적용 (요청 처리 경로용)
+
+        Returns:
+            bool: 백그라운드 적용을 시작했으면 True
+        """
+        if not self.budget_bytes or time.monotonic() - self._last_check < self.check_interval:
+            return False
+        if self._background is not None and self._background.is_alive():
+            return False
+
+        protected = set(protected)
+
+        def run():
+            try:
+                report = self.enforce(protected=protected)
+                if report['evicted'] or report['collected']:
+                    print(f"[INFO] 디스크 예산 적용: {report['before_bytes']} -> {report['after_bytes']} bytes "
+                          f"(정리 {len(report['collected'])}개, 삭제 {len(report['evicted'])}개)")
+            except OSError as e:
+                print(f"[WARN] 디스크 예산 적용 실패: {e}")
+
+        self._last_check = time.monotonic()
+        self._background = threading.Thread(target=run, name='storage-enforce', daemon=True)
+        self._background.start()
+        return True
+
+
+def _engine_class(backend: str):
+    if backend == 'free':
+        from rag_engine_free import RAGEngineFree
+        return RAGEngineFree
+    from rag_engine import RAGEngine
+    return RAGEngine
+
+
+def _format_bytes(size: float) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}TB"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='문서 산출물 디스크 용량 관리')
+    parser.add_argument('command', choices=('stats', 'gc', 'enforce'),
+                        help='stats: 사용량 조회, gc: 고아 산출물 정리, enforce: 예산 적용')
+    parser.add_argument('--backend', choices=('openai', 'free'), default=os.getenv('RAG_BACKEND', 'openai'))
+    parser.add_argument('--index-root', default=os.getenv('INDEX_ROOT'), help='인덱스 루트 (기본값: 엔진별 저장 경로)')
+    parser.add_argument('--upload-dir', default='uploads', help='업로드 폴더')
+    parser.add_argument('--image-dir', default=PAGE_IMAGE_DIR, help='페이지 이미지 디렉토리')
+    parser.add_argument('--budget', type=parse_size, default=STORAGE_BUDGET_BYTES,
+                        help='디스크 예산 (예: 9G, 기본값: STORAGE_BUDGET_BYTES)')
+    parser.add_argument('--grace', type=float, default=STORAGE_ORPHAN_GRACE, help='고아 산출물 유예 시간 (초)')
+    parser.add_argument('--evict-uploads', action='store_true', default=STORAGE_EVICT_UPLOADS,
+                        help='이미지/인덱스를 비워도 넘으면 오래된 원본 PDF까지 삭제')
+    parser.add_argument('--dry-run', action='store_true', help='삭제하지 않고 대상만 출력')
+    parser.add_argument('--json', action='store_true', help='결과를 JSON으로 출력')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    load_dotenv()
+    args = parse_args(argv)
+    index_root = args.index_root or _engine_class(args.backend).DEFAULT_STORE_PATH
+    manager = StorageManager(
+        args.upload_dir, index_root,
+        image_dir=args.image_dir,
+        budget_bytes=args.budget,
+        orphan_grace=args.grace,
+        evict_uploads=args.evict_uploads
+    )
+
+    if args.command == 'stats':
+        result = manager.stats()
+    elif args.command == 'gc':
+        result = {'collected': manager.collect_garbage(dry_run=args.dry_run)}
+    else:
+        if not args.budget:
+            print("❌ 예산이 없습니다. --budget 또는 STORAGE_BUDGET_BYTES를 지정하세요.")
+            return 1
+        result = manager.enforce(dry_run=args.dry_run)
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0
+
+    if args.command == 'stats':
+        budget = f" / 예산 {_format_bytes(result['budget_bytes'])}" if result['budget_bytes'] else ''
+        print(f"총 {_format_bytes(result['total_bytes'])} (임시 파일 {_format_bytes(result['temporary_bytes'])}), "
+              f"예산 디스크 {_format_bytes(result['budget_disk_bytes'])}{budget} "
+              f"[{', '.join(result['budgeted_artifacts'])}]")
+        print(f"{'document':<32}" + ''.join(f"{artifact:>13}" for artifact in ARTIFACTS) + f"{'orphan':>8}")
+        for row in result['documents']:
+            print(f"{row['document_id'][:31]:<32}"
+                  + ''.join(f"{_format_bytes(row['bytes'][artifact]):>13}" for artifact in ARTIFACTS)
+                  + f"{'yes' if row['orphan'] else '':>8}")
+        return 0
+
+    prefix = "[DRY-RUN] " if args.dry_run else ""
+    for item in result['collected']:
+        print(f"{prefix}정리: {item['path']} ({_format_bytes(item['bytes'])})")
+    for item in result.get('evicted', []):
+        print(f"{prefix}삭제: {item['document_id']} {item['artifact']} ({_format_bytes(item['bytes'])})")
+    if args.command == 'enforce':
+        print(f"[OK] {_format_bytes(result['before_bytes'])} -> {_format_bytes(result['after_bytes'])} "
+              f"(예산 {_format_bytes(result['budget_bytes'])}, {'이내' if result['within_budget'] else '초과'})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+OpenAI 호환 스텁 서버 (부하 테스트용)
+- POST /v1/embeddings: 문자열/토큰 배열 입력 모두 지원, float/base64 응답
+- POST /v1/chat/completions: 고정 지연 + 토큰 생성 속도로 응답 시간 모사
+- 임베딩은 입력 해시로 만든 결정적 벡터 (같은 입력이면 항상 같은 벡터)
+- 선택적으로 일정 비율의 500 오류를 주입 (재시도/헤지 동작 확인용)
+
+사용 예:
+    python stub_openai_server.py --port 8001 --chat-latency 0.8 --tokens-per-second 60
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=stub gunicorn -c gunicorn.conf.py app:app
+"""
+import sys
+import json
+import time
+import array
+import base64
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+import numpy as np
+
+
+STUB_ANSWER = (
+    "**개요**\n스텁 서버의 답변입니다.\n\n"
+    "**단계별 설명**\n1. 첫 번째 단계\n2. 두 번째 단계\n3. 세 번째 단계\n\n"
+    "**참고사항**\n부하 테스트용 응답입니다."
+)
+
+
+def stub_vector(text: str, dimensions: int) -> List[float]:
+    """입력 해시로 시드를 정한 정규화 벡터"""
+    seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little')
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+    return vector.tolist()
+
+
+def embedding_inputs(payload) -> List[str]:
+    """embeddings 요청의 input을 항목별 문자열로 변환 (문자열, 문자열 배열, 토큰 배열, 토큰 배열의 배열)"""
+    if isinstance(payload, str):
+        return [payload]
+    if payload and all(isinstance(item, int) for item in payload):
+        return [' '.join(map(str, payload))]
+    return [
+        item if isinstance(item, str) else ' '.join(map(str, item))
+        for item in payload
+    ]
+
+
+class StubConfig:
+    """서버 동작 설정"""
+
+    def __init__(self, args):
+        self.dimensions = args.dimensions
+        self.embedding_latency = args.embedding_latency
+        self.chat_latency = args.chat_latency
+        self.tokens_per_second = args.tokens_per_second
+        self.completion_tokens = args.completion_tokens
+        self.error_rate = args.error_rate
+        self.random = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.requests = {'embeddings': 0, 'chat': 0, 'errors': 0}
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            return self.error_rate > 0 and self.random.random() < self.error_rate
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """OpenAI 호환 엔드포인트 처리"""
+
+    server_version = 'StubOpenAI/1.0'
+    protocol_version = 'HTTP/1.1'  # keep-alive (커넥션 풀 재사용 확인)
+
+    @property
+    def config(self) -> StubConfig:
+        return self.server.config
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, body: Dict) -> None:
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip('/') in ('/health', '/v1/models'):
+            self._send_json(200, {'status': 'ok', 'requests': self.config.requests})
+        else:
+            self._send_json(404, {'error': {'message': 'not found'}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json(400, {'error': {'message': 'invalid JSON'}})
+            return
+
+        if self.config.should_fail():
+            with self.config.lock:
+                self.config.requests['errors'] += 1
+            self._send_json(500, {'error': {'message': 'injected error', 'type': 'server_error'}})
+            return
+
+        path = self.path.rstrip('/')
+        if path.endswith('/embeddings'):
+            self._embeddings(body)
+        elif path.endswith('/chat/completions'):
+            self._chat(body)
+        else:
+            self._send_json(404, {'error': {'message': f'unknown endpoint {self.path}'}})
+
+    def _embeddings(self, body: Dict) -> None:
+        inputs = embedding_inputs(body.get('input', []))
+        dimensions = body.get('dimensions') or self.config.dimensions
+        time.sleep(self.config.embedding_latency)
+
+        data = []
+        for i, text in enumerate(inputs):
+            vector = stub_vector(text, dimensions)
+            if body.get('encoding_format') == 'base64':
+                vector = base64.b64encode(array.array('f', vector).tobytes()).decode('ascii')
+            data.append({'object': 'embedding', 'index': i, 'embedding': vector})
+
+        tokens = sum(len(text.split()) for text in inputs)
+        with self.config.lock:
+            self.config.requests['embeddings'] += 1
+        self._send_json(200, {
+            'object': 'list',
+            'data': data,
+            'model': body.get('model', 'stub-embedding'),
+            'usage': {'prompt_tokens': tokens, 'total_tokens': tokens}
+        })
+
+    def _chat(self, body: Dict) -> None:
+        prompt_chars = sum(len(str(message.get('content', ''))) for message in body.get('messages', []))
+        prompt_tokens = max(1, prompt_chars // 4)
+        completion_tokens = min(self.config.completion_tokens, body.get('max_tokens') or self.config.completion_tokens)
+
+        # 첫 토큰까지의 지연 + 토큰 생성 시간
+        delay = self.config.chat_latency
+        if self.config.tokens_per_second > 0:
+            delay += completion_tokens / self.config.tokens_per_second
+        time.sleep(delay)
+
+        with self.config.lock:
+            self.config.requests['chat'] += 1
+        self._send_json(200, {
+            'id': f"chatcmpl-stub-{int(time.time() * 1000)}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'stub-chat'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': STUB_ANSWER},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+                'prompt_tokens_details': {'cached_tokens': 0}
+            }
+        })
+
+
+def make_server(args) -> ThreadingHTTPServer:
+    """스텁 서버 생성 (serve_forever는 호출하지 않음)"""
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    server.daemon_threads = True
+    server.config = StubConfig(args)
+    server.verbose = args.verbose
+    return server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='OpenAI 호환 스텁 서버')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--dimensions', type=int, default=1536, help='임베딩 차원')
+    parser.add_argument('--embedding-latency', type=float, default=0.05, help='임베딩 요청당 지연 (초)')
+    parser.add_argument('--chat-latency', type=float, default=0.5, help='채팅 첫 토큰까지의 지연 (초)')
+    parser.add_argument('--tokens-per-second', type=float, default=50.0, help='채팅 토큰 생성 속도 (0이면 즉시)')
+    parser.add_argument('--completion-tokens', type=int, default=200, help='채팅 응답 토큰 수 (max_tokens로 제한)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='500 오류 주입 비율 (0~1)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--verbose', action='store_true', help='요청 로그 출력')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = make_server(args)
+    print(f"[INFO] 스텁 OpenAI 서버 실행 중: http://{args.host}:{args.port}/v1 "
+          f"(채팅 {args.chat_latency}s + {args.completion_tokens}토큰 @ {args.tokens_per_second}/s, "
+          f"임베딩 {args.embedding_latency}s, 오류율 {args.error_rate:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"[INFO] 종료 - 처리한 요청: {server.config.requests}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
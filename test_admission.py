@@ -0,0 +1,107 @@
+"""
+요청 수락 제어 테스트
+- 워커 한도가 찼을 때 대기 중인 질의가 먼저 대기한 인덱싱보다 먼저 수락됨
+- 대기열이 가득 차면 즉시 429, 대기 시간이 초과되면 503과 Retry-After
+"""
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+
+def controller(max_active=1, queue_size=4, timeout=5.0):
+    """질의(우선순위 0)와 인덱싱(우선순위 1) 종류를 등록한 제어기"""
+    admission = AdmissionController(max_active=max_active)
+    admission.add_class('query', priority=0, concurrency=1, queue_size=queue_size, timeout=timeout)
+    admission.add_class('ingest', priority=1, concurrency=1, queue_size=queue_size, timeout=timeout)
+    return admission
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "조건을 기다리다 시간 초과"
+        time.sleep(0.005)
+
+
+def start_waiter(admission, name, admitted_order):
+    """name 종류로 수락을 기다렸다가 수락 순서를 기록하는 스레드"""
+    def run():
+        with admission.admit(name):
+            admitted_order.append(name)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_waiting_query_is_admitted_before_earlier_ingest():
+    """슬롯이 비면 먼저 대기한 인덱싱보다 질의가 먼저 수락됨"""
+    admission = controller(max_active=1)
+    admitted_order = []
+
+    with admission.admit('ingest'):
+        threads = [start_waiter(admission, 'ingest', admitted_order)]
+        wait_until(lambda: admission.stats()['ingest']['waiting'] == 1)
+        threads.append(start_waiter(admission, 'query', admitted_order))
+        wait_until(lambda: admission.stats()['query']['waiting'] == 1)
+
+    for thread in threads:
+        thread.join(5)
+    assert admitted_order == ['query', 'ingest']
+
+
+def test_full_queue_is_rejected_with_429():
+    """실행 한도 + 대기열이 가득 차면 기다리지 않고 429"""
+    admission = controller(queue_size=1)
+    admitted_order = []
+
+    with admission.admit('query'):
+        waiter = start_waiter(admission, 'query', admitted_order)
+        wait_until(lambda: admission.stats()['query']['waiting'] == 1)
+
+        started_at = time.perf_counter()
+        with pytest.raises(AdmissionRejected) as rejected:
+            with admission.admit('query'):
+                pass
+
+        assert time.perf_counter() - started_at < 1.0
+        assert rejected.value.status == 429
+        assert rejected.value.reason == 'queue_full'
+        assert rejected.value.retry_after >= 1
+
+    waiter.join(5)
+    assert admitted_order == ['query']
+
+
+def test_wait_timeout_is_rejected_with_503():
+    """대기 시간이 지나면 503과 Retry-After를 주고 대기열에서 빠짐"""
+    admission = controller(timeout=0.05)
+
+    with admission.admit('query'):
+        with pytest.raises(AdmissionRejected) as rejected:
+            with admission.admit('query'):
+                pass
+
+    assert rejected.value.status == 503
+    assert rejected.value.reason == 'timeout'
+    assert rejected.value.retry_after >= 1
+    stats = admission.stats()['query']
+    assert (stats['running'], stats['waiting']) == (0, 0)
+
+
+def test_rejected_request_gets_retry_after_header(tmp_path, monkeypatch):
+    """API 응답은 거절 상태 코드와 Retry-After 헤더를 포함"""
+    monkeypatch.chdir(tmp_path)  # app.log를 임시 디렉토리에 생성
+    import app
+
+    admission = controller(timeout=0.05)
+    monkeypatch.setattr(app, 'admission', admission)
+
+    with admission.admit('query'):
+        response = app.app.test_client().post('/api/query', json={'question': '전원은 어떻게 켜나요?'})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(response.json['retry_after'])
@@ -0,0 +1,119 @@
+"""
+Flask 앱 문서 캐시 테스트
+- 같은 경로의 PDF가 바뀌면 (덮어쓴 업로드 등) 캐시된 엔진/프로세서를 쓰지 않고 다시 로드
+"""
+import io
+import os
+from collections import OrderedDict
+
+import pytest
+
+import benchmark
+from rag_engine import RAGEngine
+
+
+class StubEngine(RAGEngine):
+    """스텁 임베딩/LLM을 쓰는 엔진 (앱의 엔진 클래스 대체용)"""
+
+    def __init__(self, openai_api_key, embeddings=None, client=None):
+        super().__init__(
+            openai_api_key,
+            embeddings=benchmark.StubEmbeddings(),
+            client=benchmark.StubChatClient()
+        )
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    """스텁 엔진과 임시 업로드/인덱스 폴더를 쓰는 app 모듈 (app.log도 임시 디렉토리에 생성)"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    import app as module
+
+    monkeypatch.setattr(module, '_engine_class', StubEngine)
+    monkeypatch.setattr(module, 'active_document', None)
+    monkeypatch.setitem(module.app.config, 'UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    monkeypatch.setitem(module.app.config, 'INDEX_ROOT', str(tmp_path / 'idx'))
+    module.loaded_documents.clear()
+    yield module
+    module.loaded_documents.clear()
+
+
+def pdf_bytes(tmp_path, pages, seed):
+    path = str(tmp_path / f'source-{pages}-{seed}.pdf')
+    benchmark.generate_synthetic_pdf(path, pages=pages, paragraphs=2, seed=seed)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def upload(client, data, filename='manual.pdf'):
+    return client.post(
+        '/api/upload',
+        data={'file': (io.BytesIO(data), filename)},
+        content_type='multipart/form-data'
+    )
+
+
+def test_overwritten_upload_is_reloaded(app_module, tmp_path):
+    """같은 이름으로 다른 PDF를 올리면 이전 인덱스를 재사용하지 않음"""
+    client = app_module.app.test_client()
+    first = upload(client, pdf_bytes(tmp_path, pages=3, seed=1))
+    assert first.json['total_pages'] == 3
+
+    second = upload(client, pdf_bytes(tmp_path, pages=8, seed=2))
+
+    assert second.status_code == 200
+    assert second.json['index_status'] == 'built'
+    assert second.json['total_pages'] == 8
+    assert client.get('/api/pdf-info').json['total_pages'] == 8
+
+
+def test_unchanged_document_is_served_from_cache(app_module, tmp_path):
+    """파일이 그대로면 캐시된 엔진을 재사용"""
+    client = app_module.app.test_client()
+    upload(client, pdf_bytes(tmp_path, pages=3, seed=1))
+
+    response = client.post('/api/load-pdf', json={'filename': 'manual.pdf'})
+
+    assert response.json['index_status'] == 'cached'
+
+
+def test_file_replaced_on_disk_is_reloaded(app_module, tmp_path):
+    """업로드 API를 거치지 않고 파일이 바뀌어도 다시 로드하고, 페이지 이미지도 새 파일 기준"""
+    client = app_module.app.test_client()
+    upload(client, pdf_bytes(tmp_path, pages=3, seed=1))
+    path = os.path.join(app_module.app.config['UPLOAD_FOLDER'], 'manual.pdf')
+    with open(path, 'wb') as f:
+        f.write(pdf_bytes(tmp_path, pages=8, seed=2))
+
+    assert app_module.processor_for(path).total_pages == 8
+    response = client.post('/api/load-pdf', json={'filename': 'manual.pdf'})
+    assert response.json['index_status'] == 'built'
+    assert response.json['total_pages'] == 8
+
+
+def test_preview_processors_are_cached_and_bounded(app_module, tmp_path, monkeypatch):
+    """로드하지 않은 문서의 페이지 이미지용 프로세서는 경로별로 재사용하고 캐시 크기를 넘으면 오래된 것부터 제거"""
+    monkeypatch.setitem(app_module.app.config, 'DOCUMENT_CACHE_SIZE', 2)
+    monkeypatch.setattr(app_module, 'preview_processors', OrderedDict())
+    upload_dir = tmp_path / 'uploads'
+    upload_dir.mkdir()
+    paths = []
+    for seed in range(3):
+        path = str(upload_dir / f'manual-{seed}.pdf')
+        with open(path, 'wb') as f:
+            f.write(pdf_bytes(tmp_path, pages=2, seed=seed))
+        paths.append(path)
+
+    first = app_module.processor_for(paths[0])
+    assert app_module.processor_for(paths[0]) is first
+
+    with open(paths[0], 'wb') as f:
+        f.write(pdf_bytes(tmp_path, pages=4, seed=9))
+    replaced = app_module.processor_for(paths[0])
+    assert replaced is not first
+    assert replaced.total_pages == 4
+
+    app_module.processor_for(paths[1])
+    app_module.processor_for(paths[2])
+    assert list(app_module.preview_processors) == [os.path.abspath(path) for path in paths[1:]]
@@ -0,0 +1,72 @@
+"""
+MinHash 중복 청크 제거 테스트
+- 반복되는 바닥글/경고 문구는 대표 청크 하나로 합치고 나타난 페이지 목록 유지
+- 서로 다른 청크는 그대로 유지
+"""
+import random
+
+from dedup import collapse_near_duplicates
+
+
+FOOTER = "Copyright 2024 Example Corp. All rights reserved. Unauthorized reproduction of this manual is prohibited."
+WORDS = ("install", "remove", "filter", "voltage", "bracket", "screw", "panel", "cable", "sensor",
+         "valve", "pressure", "reset", "display", "warranty", "mount", "drain", "hose", "switch")
+
+
+def distinct_text(seed, words=40):
+    """시드별로 다른 본문 청크"""
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(WORDS) + str(rng.randint(0, 999)) for _ in range(words))
+
+
+def chunk(text, page):
+    return {'chunk_id': 0, 'text': text, 'page_number': page, 'source': 'manual.pdf'}
+
+
+def test_repeated_footer_collapses_into_one_chunk_with_all_pages():
+    """모든 페이지의 바닥글은 첫 청크 하나로 합쳐지고 pages에 모든 페이지가 남음"""
+    chunks = []
+    for page in range(1, 6):
+        chunks.append(chunk(distinct_text(page), page))
+        # 공백/대소문자만 다른 반복도 같은 청크로 봄
+        chunks.append(chunk(FOOTER.upper() if page % 2 else f"  {FOOTER}\n", page))
+
+    collapsed = collapse_near_duplicates(chunks, threshold=0.9)
+
+    footers = [c for c in collapsed if 'rights reserved' in c['text'].lower()]
+    assert len(footers) == 1
+    assert footers[0]['pages'] == [1, 2, 3, 4, 5]
+    assert footers[0]['page_number'] == 1
+    assert len(collapsed) == 6
+
+
+def test_distinct_chunks_are_kept_in_document_order():
+    """서로 다른 본문은 합치지 않고, chunk_id는 순서대로 다시 부여"""
+    chunks = [chunk(distinct_text(seed), page) for page, seed in enumerate(range(20), 1)]
+
+    collapsed = collapse_near_duplicates(chunks, threshold=0.9)
+
+    assert [c['text'] for c in collapsed] == [c['text'] for c in chunks]
+    assert [c['chunk_id'] for c in collapsed] == list(range(20))
+    assert all(c['pages'] == [c['page_number']] for c in collapsed)
+
+
+def test_threshold_zero_keeps_every_chunk():
+    """threshold=0이면 중복 제거를 하지 않음"""
+    chunks = [chunk(FOOTER, page) for page in range(1, 4)]
+
+    collapsed = collapse_near_duplicates(chunks, threshold=0)
+
+    assert len(collapsed) == 3
+    assert [c['pages'] for c in collapsed] == [[1], [2], [3]]
+
+
+def test_input_chunks_are_not_modified():
+    """입력 청크의 pages/chunk_id는 바뀌지 않음"""
+    chunks = [chunk(FOOTER, 1), chunk(FOOTER, 2)]
+    chunks[1]['chunk_id'] = 7
+
+    collapse_near_duplicates(chunks, threshold=0.9)
+
+    assert 'pages' not in chunks[0]
+    assert chunks[1]['chunk_id'] == 7
@@ -0,0 +1,98 @@
+"""
+임베딩 체크포인트 테스트
+- 중단된 임베딩을 저장된 배치부터 이어서 진행
+- 모델이 바뀌거나 손상된 배치는 재사용하지 않음
+- 인덱스 구축이 중단된 뒤 다시 구축하면 체크포인트 재사용
+"""
+import functools
+import os
+
+import numpy as np
+import pytest
+
+import benchmark
+import index_store
+from embedding_checkpoint import CHECKPOINT_DIR_NAME, EmbeddingCheckpoint
+from pdf_processor import PDFProcessor
+
+
+TEXTS = [f"chunk {i} power supply step {i}" for i in range(10)]
+
+
+class FlakyEmbeddings(benchmark.StubEmbeddings):
+    """fail_on번째 embed_documents 호출에서 실패하는 스텁 임베딩 (호출한 텍스트 기록)"""
+
+    def __init__(self, fail_on=None):
+        super().__init__()
+        self.fail_on = fail_on
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        if len(self.calls) == self.fail_on:
+            raise ConnectionError("임베딩 API 중단")
+        return super().embed_documents(texts)
+
+
+def test_interrupted_embedding_resumes_from_saved_batches(tmp_path):
+    """실패 전까지 저장된 배치는 다시 임베딩하지 않고, 결과는 한 번에 임베딩한 것과 같음"""
+    directory = str(tmp_path / 'checkpoints')
+    interrupted = FlakyEmbeddings(fail_on=3)
+    with pytest.raises(ConnectionError):
+        EmbeddingCheckpoint(directory, 'model', batch_size=3).embed(TEXTS, interrupted.embed_documents)
+
+    embeddings = FlakyEmbeddings()
+    checkpoint = EmbeddingCheckpoint(directory, 'model', batch_size=3)
+    vectors = checkpoint.embed(TEXTS, embeddings.embed_documents)
+
+    assert checkpoint.stats() == {'resumed_batches': 2, 'fresh_batches': 2, 'resumed_chunks': 6}
+    assert embeddings.calls == [TEXTS[6:9], TEXTS[9:]]
+    np.testing.assert_allclose(vectors, benchmark.StubEmbeddings().embed_documents(TEXTS), rtol=1e-6)
+
+
+def test_checkpoint_is_not_reused_for_another_model(tmp_path):
+    """모델 식별자가 다르면 배치 키가 달라 새로 임베딩"""
+    directory = str(tmp_path / 'checkpoints')
+    EmbeddingCheckpoint(directory, 'model-a', batch_size=5).embed(TEXTS, FlakyEmbeddings().embed_documents)
+
+    checkpoint = EmbeddingCheckpoint(directory, 'model-b', batch_size=5)
+    checkpoint.embed(TEXTS, FlakyEmbeddings().embed_documents)
+
+    assert checkpoint.resumed_batches == 0
+    assert checkpoint.fresh_batches == 2
+
+
+def test_corrupt_batch_is_discarded(tmp_path):
+    """손상된 배치 파일은 삭제하고 새로 임베딩"""
+    directory = str(tmp_path / 'checkpoints')
+    checkpoint = EmbeddingCheckpoint(directory, 'model', batch_size=5)
+    checkpoint.embed(TEXTS, FlakyEmbeddings().embed_documents)
+    path = os.path.join(directory, f"{checkpoint.batch_key(TEXTS[:5])}.npy")
+    with open(path, 'wb') as f:
+        f.write(b'not a numpy file')
+
+    assert checkpoint.load(TEXTS[:5]) is None
+    assert not os.path.exists(path)
+
+
+def test_interrupted_index_build_resumes(sample_pdf, make_engine, tmp_path, monkeypatch):
+    """구축 중 임베딩이 실패해도 다음 구축은 저장된 배치부터 이어서 진행하고, 완료 후 체크포인트 삭제"""
+    monkeypatch.setattr(index_store, 'EmbeddingCheckpoint', functools.partial(EmbeddingCheckpoint, batch_size=2))
+    index_root = str(tmp_path / 'idx')
+    processor = PDFProcessor(sample_pdf)
+
+    with pytest.raises(ConnectionError):
+        index_store.load_or_build_index(processor, make_engine(FlakyEmbeddings(fail_on=3)), index_root)
+    index_dir = index_store.index_dir_for(sample_pdf, index_root)
+    assert index_store.read_manifest(index_dir) is None
+    assert len(os.listdir(os.path.join(index_dir, CHECKPOINT_DIR_NAME))) == 2
+
+    # 같은 모델(식별자)이어야 체크포인트를 재사용
+    embeddings = FlakyEmbeddings()
+    info = index_store.load_or_build_index(processor, make_engine(embeddings), index_root)
+    processor.close()
+
+    assert info['status'] == 'built'
+    assert info['resumed_batches'] == 2
+    assert info['fresh_batches'] == len(embeddings.calls) >= 1
+    assert not os.path.exists(os.path.join(index_dir, CHECKPOINT_DIR_NAME))
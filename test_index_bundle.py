@@ -0,0 +1,139 @@
+"""
+인덱스 번들 테스트
+- 내보낸 번들을 다른 인덱스 루트/업로드 폴더에 설치하면 재구축 없이 로드
+- 체크섬이 맞지 않거나, 원본 파일명이 안전하지 않거나, bundle.json이 손상된 번들은 거절
+"""
+import io
+import json
+import os
+import tarfile
+
+import pytest
+
+import index_bundle
+import index_store
+from pdf_processor import PDFProcessor
+
+
+@pytest.fixture
+def bundle_path(sample_pdf, make_engine, tmp_path):
+    """합성 PDF로 인덱스를 구축한 뒤 PDF까지 포함해 내보낸 번들"""
+    index_root = str(tmp_path / 'idx')
+    processor = PDFProcessor(sample_pdf)
+    index_store.load_or_build_index(processor, make_engine(), index_root)
+    processor.close()
+
+    path = str(tmp_path / 'manual.bundle.tar.gz')
+    index_bundle.export_bundle(sample_pdf, index_root, path, include_pdf=True)
+    return path
+
+
+def rewrite_bundle(source_path, target_path, members=None, info=None, raw_info=None):
+    """번들 내용을 바꿔 다시 쓰기 (members: 파일 이름 -> 새 내용, info: bundle.json 수정 함수)"""
+    with tarfile.open(source_path, 'r:*') as tar:
+        contents = {member.name: tar.extractfile(member).read() for member in tar.getmembers()}
+    contents.update(members or {})
+    if info is not None:
+        bundle_info = json.loads(contents[index_bundle.BUNDLE_INFO_NAME])
+        info(bundle_info)
+        contents[index_bundle.BUNDLE_INFO_NAME] = json.dumps(bundle_info).encode('utf-8')
+    if raw_info is not None:
+        contents[index_bundle.BUNDLE_INFO_NAME] = raw_info
+
+    with tarfile.open(target_path, 'w:gz') as tar:
+        for name, data in contents.items():
+            member = tarfile.TarInfo(name)
+            member.size = len(data)
+            tar.addfile(member, io.BytesIO(data))
+    return target_path
+
+
+def set_source(name):
+    return lambda info: info['manifest'].__setitem__('source', name)
+
+
+def test_imported_bundle_loads_without_rebuilding(bundle_path, make_engine, tmp_path):
+    """설치한 인덱스는 새 위치의 PDF 기준으로 그대로 로드"""
+    upload_dir = str(tmp_path / 'other' / 'uploads')
+    index_root = str(tmp_path / 'other' / 'idx')
+
+    result = index_bundle.import_bundle(
+        bundle_path, index_root, upload_dir=upload_dir,
+        expected_model=make_engine().embedding_model_id()
+    )
+
+    assert result['pdf_path'] == os.path.join(upload_dir, 'manual.pdf')
+    processor = PDFProcessor(result['pdf_path'])
+    info = index_store.load_or_build_index(processor, make_engine(), index_root)
+    processor.close()
+    assert info['status'] == 'loaded'
+    assert info['total_chunks'] == result['total_chunks']
+
+
+def test_tampered_member_is_rejected(bundle_path, tmp_path):
+    """체크섬과 다른 청크 메타데이터는 설치하지 않음"""
+    with tarfile.open(bundle_path, 'r:*') as tar:
+        chunks = tar.extractfile(index_bundle.CHUNKS_MEMBER).read()
+    tampered = rewrite_bundle(
+        bundle_path, str(tmp_path / 'tampered.tar.gz'),
+        members={index_bundle.CHUNKS_MEMBER: chunks + b' '}  # 여전히 올바른 JSON이지만 체크섬은 다름
+    )
+
+    with pytest.raises(index_bundle.BundleError, match='체크섬'):
+        index_bundle.import_bundle(tampered, str(tmp_path / 'new-idx'), upload_dir=str(tmp_path / 'new-uploads'))
+    assert not os.path.exists(tmp_path / 'new-idx')
+
+
+def test_embedding_model_mismatch_is_rejected(bundle_path, tmp_path):
+    """다른 임베딩 모델로 만든 번들은 거절"""
+    with pytest.raises(index_bundle.BundleError, match='임베딩 모델'):
+        index_bundle.import_bundle(bundle_path, str(tmp_path / 'new-idx'), expected_model='other-model')
+
+
+@pytest.mark.parametrize('source', ['..', '', '.pdf', 'notes.txt', '../../etc/cron.d/job'])
+def test_unsafe_source_name_is_rejected(bundle_path, tmp_path, source):
+    """원본 파일명이 비었거나 .pdf가 아니면 업로드 폴더에 아무것도 쓰지 않음"""
+    malicious = rewrite_bundle(bundle_path, str(tmp_path / 'malicious.tar.gz'), info=set_source(source))
+    upload_dir = tmp_path / 'new-uploads'
+
+    with pytest.raises(index_bundle.BundleError, match='파일명'):
+        index_bundle.import_bundle(malicious, str(tmp_path / 'new-idx'), upload_dir=str(upload_dir))
+    assert not upload_dir.exists() or not os.listdir(upload_dir)
+
+
+def test_source_path_components_are_stripped(bundle_path, tmp_path):
+    """경로가 포함된 원본 파일명은 업로드 폴더 안의 안전한 파일명으로 설치"""
+    traversal = rewrite_bundle(
+        bundle_path, str(tmp_path / 'traversal.tar.gz'), info=set_source('../../outside dir/evil name.pdf')
+    )
+    upload_dir = tmp_path / 'new-uploads'
+
+    result = index_bundle.import_bundle(traversal, str(tmp_path / 'new-idx'), upload_dir=str(upload_dir))
+
+    assert result['source'] == 'evil_name.pdf'
+    assert result['pdf_path'] == os.path.join(str(upload_dir), 'evil_name.pdf')
+    assert not os.path.exists(tmp_path / 'outside dir')
+
+
+@pytest.mark.parametrize('raw_info', [
+    b'{not json',
+    b'[]',
+    json.dumps({'format': index_bundle.BUNDLE_FORMAT, 'version': index_bundle.BUNDLE_VERSION}).encode('utf-8'),
+])
+def test_malformed_bundle_info_is_rejected(bundle_path, tmp_path, raw_info):
+    """해석할 수 없거나 필드가 빠진 bundle.json은 BundleError"""
+    broken = rewrite_bundle(bundle_path, str(tmp_path / 'broken.tar.gz'), raw_info=raw_info)
+
+    with pytest.raises(index_bundle.BundleError):
+        index_bundle.import_bundle(broken, str(tmp_path / 'new-idx'), upload_dir=str(tmp_path / 'new-uploads'))
+
+
+def test_wrong_field_types_are_rejected(bundle_path, tmp_path):
+    """필드 타입이 잘못된 bundle.json은 BundleError"""
+    broken = rewrite_bundle(
+        bundle_path, str(tmp_path / 'broken.tar.gz'),
+        info=lambda info: info['files'].__setitem__(index_bundle.CHUNKS_MEMBER, 'sha256')
+    )
+
+    with pytest.raises(index_bundle.BundleError):
+        index_bundle.read_bundle(broken)
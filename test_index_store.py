@@ -0,0 +1,96 @@
+"""
+문서별 인덱스 저장소 테스트
+- 문서 ID 충돌 (같은 파일명, 정규화 후 같아지는 파일명)
+- 매니페스트 불일치(PDF, 청킹 설정, 임베딩 모델) 시 재구축
+"""
+import os
+
+import pytest
+
+import benchmark
+import index_store
+from pdf_processor import PDFProcessor
+
+
+def test_same_filename_in_different_directories_gets_different_ids(tmp_path):
+    """a/manual.pdf와 b/manual.pdf는 서로 다른 인덱스 디렉토리를 사용"""
+    first = str(tmp_path / 'a' / 'manual.pdf')
+    second = str(tmp_path / 'b' / 'manual.pdf')
+
+    assert index_store.document_id(first) != index_store.document_id(second)
+    assert index_store.index_dir_for(first, 'idx') != index_store.index_dir_for(second, 'idx')
+    assert index_store.document_id(first).startswith('manual-')
+
+
+def test_names_equal_after_sanitizing_get_different_ids(tmp_path):
+    """'a b.pdf'와 'a_b.pdf'는 파일명 정규화 결과가 같아도 구분"""
+    assert index_store.document_id(str(tmp_path / 'a b.pdf')) != index_store.document_id(str(tmp_path / 'a_b.pdf'))
+
+
+def test_document_id_is_stable_for_relative_and_absolute_paths(tmp_path, monkeypatch):
+    """같은 파일은 상대/절대 경로와 관계없이 같은 ID"""
+    monkeypatch.chdir(tmp_path)
+    assert index_store.document_id('uploads/manual.pdf') == \
+        index_store.document_id(os.path.join(str(tmp_path), 'uploads', 'manual.pdf'))
+
+
+def test_document_id_is_filesystem_safe():
+    """경로 구분자/공백 없이 디렉토리 이름으로 쓸 수 있는 ID"""
+    doc_id = index_store.document_id('../설명서 v2 (최종).pdf')
+    assert '/' not in doc_id and ' ' not in doc_id and not doc_id.startswith('.')
+
+
+def build(pdf_path, engine, index_root, **kwargs):
+    """인덱스 로드/구축 후 상태 반환"""
+    processor = PDFProcessor(pdf_path)
+    try:
+        return index_store.load_or_build_index(processor, engine, index_root, **kwargs)['status']
+    finally:
+        processor.close()
+
+
+def test_current_manifest_loads_saved_index(sample_pdf, make_engine, tmp_path):
+    """같은 PDF/설정이면 저장된 인덱스를 그대로 로드"""
+    index_root = str(tmp_path / 'idx')
+
+    assert build(sample_pdf, make_engine(), index_root) == 'built'
+    assert build(sample_pdf, make_engine(), index_root) == 'loaded'
+
+
+def test_chunking_change_triggers_rebuild(sample_pdf, make_engine, tmp_path):
+    """청크 크기가 바뀌면 재구축"""
+    index_root = str(tmp_path / 'idx')
+    build(sample_pdf, make_engine(), index_root, chunk_size=1000)
+
+    assert build(sample_pdf, make_engine(), index_root, chunk_size=500) == 'built'
+    assert build(sample_pdf, make_engine(), index_root, chunk_size=500) == 'loaded'
+
+
+def test_embedding_model_change_triggers_rebuild(sample_pdf, make_engine, tmp_path):
+    """매니페스트의 임베딩 모델이 현재 엔진과 다르면 재구축"""
+    index_root = str(tmp_path / 'idx')
+    build(sample_pdf, make_engine(), index_root)
+    index_dir = index_store.index_dir_for(sample_pdf, index_root)
+    manifest = index_store.read_manifest(index_dir)
+    index_store.write_manifest(index_dir, dict(manifest, embedding_model='other-model'))
+
+    assert build(sample_pdf, make_engine(), index_root) == 'built'
+    assert index_store.read_manifest(index_dir)['embedding_model'] == make_engine().embedding_model_id()
+
+
+def test_modified_pdf_triggers_rebuild(sample_pdf, make_engine, tmp_path):
+    """같은 경로의 PDF 내용이 바뀌면 (파일 해시 불일치) 재구축"""
+    index_root = str(tmp_path / 'idx')
+    build(sample_pdf, make_engine(), index_root)
+    benchmark.generate_synthetic_pdf(sample_pdf, pages=4, paragraphs=3, seed=2)
+
+    assert build(sample_pdf, make_engine(), index_root) == 'built'
+
+
+def test_missing_index_is_not_built_when_building_disallowed(sample_pdf, make_engine, tmp_path):
+    """예열(allow_build=False)은 오래된 인덱스를 다시 구축하지 않음"""
+    index_root = str(tmp_path / 'idx')
+    build(sample_pdf, make_engine(), index_root, chunk_size=1000)
+
+    with pytest.raises(FileNotFoundError):
+        build(sample_pdf, make_engine(), index_root, chunk_size=500, allow_build=False)
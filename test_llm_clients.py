@@ -0,0 +1,131 @@
+"""
+LLM/임베딩 클라이언트 테스트
+- 재시도 예산이 바닥나면 재시도 횟수가 남아 있어도 더 재시도하지 않음
+- 헤지 요청은 먼저 온 응답을 쓰고, 늦은 호출은 결과/오류를 버린 채 끝까지 정리됨
+- 임베딩 재시도도 채팅과 같은 재시도 예산에서 차감
+"""
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+import llm_clients
+from llm_clients import LatencyTracker, RetryBudget, chat_completion
+
+
+def connection_error():
+    return openai.APIConnectionError(request=httpx.Request('POST', 'http://stub/v1/chat/completions'))
+
+
+class FakeChatClient:
+    """chat.completions.create 호출마다 behaviours의 다음 함수를 실행하는 가짜 클라이언트"""
+
+    def __init__(self, *behaviours):
+        self.behaviours = list(behaviours)
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        with self._lock:
+            behaviour = self.behaviours[min(self.calls, len(self.behaviours) - 1)]
+            self.calls += 1
+        return behaviour()
+
+
+def fail():
+    raise connection_error()
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    """요청이 토큰을 쌓지 않는 (ratio=0) 재시도 예산, 백오프 대기 없음"""
+    def factory(tokens):
+        retry_budget = RetryBudget(ratio=0.0, min_tokens=tokens)
+        monkeypatch.setattr(llm_clients, 'retry_budget', retry_budget)
+        return retry_budget
+
+    monkeypatch.setattr(llm_clients.time, 'sleep', lambda seconds: None)
+    monkeypatch.setenv('OPENAI_MAX_RETRIES', '5')
+    monkeypatch.delenv('LLM_HEDGE_ENABLED', raising=False)
+    return factory
+
+
+def test_exhausted_budget_stops_retries(budget):
+    """예산 토큰만큼만 재시도하고, 바닥난 뒤의 호출은 재시도 없이 실패"""
+    retry_budget = budget(2)
+    client = FakeChatClient(fail)
+
+    with pytest.raises(openai.APIConnectionError):
+        chat_completion(client, model='m', messages=[])
+    assert client.calls == 3
+    assert retry_budget.tokens == 0
+
+    client = FakeChatClient(fail)
+    with pytest.raises(openai.APIConnectionError):
+        chat_completion(client, model='m', messages=[])
+    assert client.calls == 1
+
+
+def test_hedge_returns_first_response_and_slow_call_finishes(budget, monkeypatch):
+    """p95를 넘긴 호출은 헤지가 먼저 응답하고, 늦은 호출의 오류는 버려지며 스레드는 끝까지 정리됨"""
+    retry_budget = budget(3)
+    latency = LatencyTracker(min_samples=1)
+    latency.observe(0.01)
+    monkeypatch.setattr(llm_clients, 'chat_latency', latency)
+    monkeypatch.setenv('LLM_HEDGE_ENABLED', '1')
+
+    release = threading.Event()
+    slow_finished = threading.Event()
+
+    def slow():
+        try:
+            release.wait(5)
+            raise connection_error()
+        finally:
+            slow_finished.set()
+
+    client = FakeChatClient(slow, lambda: 'hedged')
+    started_at = time.perf_counter()
+    response = chat_completion(client, model='m', messages=[])
+
+    assert response == 'hedged'
+    assert time.perf_counter() - started_at < 1.0
+    assert client.calls == 2
+    assert not slow_finished.is_set()
+
+    release.set()
+    assert slow_finished.wait(5)
+    assert retry_budget.tokens == 3
+
+
+def test_embedding_retries_share_the_chat_budget(budget, monkeypatch):
+    """임베딩 재시도가 예산을 소모하면 이후 채팅 호출도 재시도하지 않음"""
+    retry_budget = budget(2)
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(500, json={'error': {'message': 'unavailable'}})
+
+    monkeypatch.setenv('OPENAI_BASE_URL', 'http://stub/v1')
+    monkeypatch.delenv('OPENAI_EMBEDDING_MODEL', raising=False)
+    monkeypatch.setattr(llm_clients, '_http_client', httpx.Client(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(llm_clients, '_openai_embeddings', {})
+    embeddings = llm_clients.get_openai_embeddings('test-key')
+    embeddings.check_embedding_ctx_length = False  # tiktoken 인코딩 다운로드 없이 원문 그대로 요청
+
+    with pytest.raises(openai.InternalServerError):
+        embeddings.embed_query('power supply')
+    assert embeddings.max_retries == 0
+    assert len(requests) == 3
+    assert retry_budget.tokens == 0
+
+    client = FakeChatClient(fail)
+    with pytest.raises(openai.APIConnectionError):
+        chat_completion(client, model='m', messages=[])
+    assert client.calls == 1
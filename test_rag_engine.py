@@ -0,0 +1,35 @@
+"""
+RAG 엔진 답변 생성 테스트
+- 대화 모드는 프롬프트 컨텍스트만 청크 ID 순으로 고정하고, 반환하는 source_chunks는 검색 점수 순 유지
+"""
+
+
+def result(chunk_id, score):
+    return {
+        'text': f"chunk {chunk_id} text",
+        'page_number': chunk_id + 1,
+        'chunk_id': chunk_id,
+        'source': 'manual.pdf',
+        'similarity_score': score
+    }
+
+
+def test_conversation_sorts_only_the_prompt_context(make_engine):
+    """source_chunks는 입력(점수) 순서 그대로, 프롬프트의 문서 순서는 청크 ID 순"""
+    engine = make_engine()
+    prompts = []
+    create = engine.client.chat.completions.create
+
+    def recording_create(**kwargs):
+        prompts.append(kwargs['messages'][1]['content'])
+        return create(**kwargs)
+
+    engine.client.chat.completions.create = recording_create
+    search_results = [result(7, 0.1), result(2, 0.3), result(5, 0.6)]
+
+    answer = engine.generate_answer('필터 교체 방법', search_results, history=[])
+
+    assert [chunk['chunk_id'] for chunk in answer['source_chunks']] == [7, 2, 5]
+    positions = [prompts[0].index(f"chunk {chunk_id} text") for chunk_id in (2, 5, 7)]
+    assert positions == sorted(positions)
+    assert answer['referenced_pages'] == [3, 6, 8]
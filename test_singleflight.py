@@ -0,0 +1,95 @@
+"""
+동일 요청 병합 테스트
+- 같은 키로 동시에 들어온 호출은 한 번만 실행하고 결과를 공유
+- 실행한 호출(leader)의 예외는 기다리던 모든 호출에 전달
+"""
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight, normalize_question
+
+
+FOLLOWERS = 4
+
+
+def wait_for_waiters(flights, key, count, timeout=5.0):
+    """진행 중인 호출에 count개의 호출이 합류할 때까지 대기"""
+    deadline = time.monotonic() + timeout
+    while True:
+        with flights._lock:
+            call = flights._calls.get(key)
+            if call is not None and call.waiters >= count:
+                return
+        assert time.monotonic() < deadline, "합류한 호출을 기다리다 시간 초과"
+        time.sleep(0.005)
+
+
+def run_concurrently(flights, key, func):
+    """leader 1개 + FOLLOWERS개 호출을 동시에 실행하고 (결과, 공유 여부) 또는 예외 목록 반환"""
+    outcomes = []
+    lock = threading.Lock()
+
+    def call():
+        try:
+            outcome = flights.do(key, func)
+        except Exception as e:
+            outcome = e
+        with lock:
+            outcomes.append(outcome)
+
+    threads = [threading.Thread(target=call) for _ in range(FOLLOWERS + 1)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+
+def test_concurrent_calls_share_one_execution():
+    """함수는 한 번만 실행되고 모든 호출이 같은 결과를 받음"""
+    flights = SingleFlight('test')
+    release = threading.Event()
+    executions = []
+
+    def answer():
+        executions.append(1)
+        release.wait(5)
+        return {'answer': '전원 버튼을 3초간 누르세요.'}
+
+    threads, outcomes = run_concurrently(flights, 'power', answer)
+    wait_for_waiters(flights, 'power', FOLLOWERS)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(executions) == 1
+    assert sorted(shared for _, shared in outcomes) == [False] + [True] * FOLLOWERS
+    assert all(result is outcomes[0][0] for result, _ in outcomes)
+    assert flights.in_flight() == 0
+
+
+def test_leader_error_reaches_every_follower():
+    """leader의 예외가 기다리던 호출 모두에 전달되고, 다음 호출은 새로 실행"""
+    flights = SingleFlight('test')
+    release = threading.Event()
+    error = ConnectionError("LLM 호출 실패")
+
+    def failing():
+        release.wait(5)
+        raise error
+
+    threads, outcomes = run_concurrently(flights, 'power', failing)
+    wait_for_waiters(flights, 'power', FOLLOWERS)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(outcomes) == FOLLOWERS + 1
+    assert all(outcome is error for outcome in outcomes)
+    assert flights.do('power', lambda: 'retried') == ('retried', False)
+
+
+@pytest.mark.parametrize('question', ['전원은 어떻게 켜나요?', '  전원은   어떻게 켜나요 ', '전원은 어떻게 켜나요？'])
+def test_equivalent_questions_share_a_key(question):
+    """공백/끝 문장부호/전각 문자만 다른 질문은 같은 키"""
+    assert normalize_question(question) == '전원은 어떻게 켜나요'
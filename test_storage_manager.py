@@ -0,0 +1,157 @@
+"""
+디스크 용량 관리 테스트
+- 예산 초과 시 오래 사용하지 않은 문서부터 다시 만들 수 있는 산출물 삭제 (LRU, 현재 문서 보호)
+- 원본 PDF가 없는 산출물과 임시 파일은 유예 시간이 지난 뒤에만 정리
+"""
+import json
+import os
+import time
+
+import index_store
+from storage_manager import StorageManager
+
+
+INDEX_BYTES = 10_000
+PDF_BYTES = 1_000
+
+
+def make_document(tmp_path, name, last_used, with_pdf=True, age=0):
+    """업로드 PDF + 인덱스 디렉토리(매니페스트 포함)를 만들고 문서 ID 반환"""
+    pdf_path = str(tmp_path / 'uploads' / name)
+    os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
+    if with_pdf:
+        with open(pdf_path, 'wb') as f:
+            f.write(b'%PDF' + b'0' * PDF_BYTES)
+
+    index_root = str(tmp_path / 'idx')
+    index_dir = index_store.index_dir_for(pdf_path, index_root)
+    os.makedirs(index_dir)
+    with open(os.path.join(index_dir, 'index.faiss'), 'wb') as f:
+        f.write(b'0' * INDEX_BYTES)
+    index_store.write_manifest(index_dir, {
+        'version': index_store.MANIFEST_VERSION,
+        'source': name,
+        'source_path': os.path.abspath(pdf_path)
+    })
+
+    doc_id = index_store.document_id(pdf_path)
+    usage_path = os.path.join(index_root, index_store.USAGE_NAME)
+    usage = index_store.read_usage(index_root)
+    usage[doc_id] = {'source': name, 'count': 1, 'last_used': last_used}
+    with open(usage_path, 'w', encoding='utf-8') as f:
+        json.dump(usage, f)
+
+    if age:
+        backdate(index_dir, age)
+    return doc_id
+
+
+def backdate(path, seconds):
+    """파일/디렉토리 수정 시각을 seconds초 전으로 변경"""
+    timestamp = time.time() - seconds
+    for root, _, files in os.walk(path):
+        for name in files:
+            os.utime(os.path.join(root, name), (timestamp, timestamp))
+        os.utime(root, (timestamp, timestamp))
+    if os.path.isfile(path):
+        os.utime(path, (timestamp, timestamp))
+
+
+def manager(tmp_path, budget_bytes=0, orphan_grace=3600):
+    return StorageManager(
+        str(tmp_path / 'uploads'), str(tmp_path / 'idx'),
+        image_dir=str(tmp_path / 'page_images'),
+        budget_bytes=budget_bytes,
+        low_watermark=0.9,
+        orphan_grace=orphan_grace
+    )
+
+
+def evicted_indexes(report):
+    return [item['document_id'] for item in report['evicted'] if item['artifact'] == 'index']
+
+
+def test_least_recently_used_indexes_are_evicted_first(tmp_path):
+    """예산을 넘으면 마지막 사용이 오래된 문서의 인덱스부터, 목표치 아래가 될 때까지만 삭제"""
+    now = time.time()
+    newest = make_document(tmp_path, 'newest.pdf', last_used=now)
+    oldest = make_document(tmp_path, 'oldest.pdf', last_used=now - 300)
+    middle = make_document(tmp_path, 'middle.pdf', last_used=now - 100)
+
+    report = manager(tmp_path, budget_bytes=25_000).enforce()
+
+    assert evicted_indexes(report) == [oldest, middle]
+    assert report['within_budget']
+    documents, _ = manager(tmp_path).scan()
+    assert documents[newest]['paths']['index']
+    assert not documents[oldest]['paths']['index']
+    # 원본 PDF는 STORAGE_EVICT_UPLOADS 없이는 삭제하지 않음
+    assert all(documents[doc_id]['paths']['pdf'] for doc_id in (newest, oldest, middle))
+
+
+def test_protected_documents_are_skipped(tmp_path):
+    """현재 로드된 문서는 오래되었어도 인덱스를 삭제하지 않음"""
+    now = time.time()
+    newest = make_document(tmp_path, 'newest.pdf', last_used=now)
+    oldest = make_document(tmp_path, 'oldest.pdf', last_used=now - 300)
+    middle = make_document(tmp_path, 'middle.pdf', last_used=now - 100)
+
+    report = manager(tmp_path, budget_bytes=25_000).enforce(protected={oldest})
+
+    assert evicted_indexes(report) == [middle, newest]
+
+
+def test_dry_run_deletes_nothing(tmp_path):
+    """dry_run은 삭제 계획만 반환"""
+    now = time.time()
+    make_document(tmp_path, 'a.pdf', last_used=now)
+    oldest = make_document(tmp_path, 'b.pdf', last_used=now - 300)
+
+    report = manager(tmp_path, budget_bytes=15_000).enforce(dry_run=True)
+
+    assert evicted_indexes(report) == [oldest]
+    documents, _ = manager(tmp_path).scan()
+    assert documents[oldest]['paths']['index']
+
+
+def test_orphan_index_is_kept_during_grace_period(tmp_path):
+    """원본 PDF가 없는 인덱스라도 최근 것은 유지 (번들 가져오기 직후 등)"""
+    orphan = make_document(tmp_path, 'gone.pdf', last_used=time.time(), with_pdf=False)
+
+    collected = manager(tmp_path).collect_garbage()
+
+    assert collected == []
+    documents, _ = manager(tmp_path).scan()
+    assert documents[orphan]['orphan']
+    assert documents[orphan]['paths']['index']
+
+
+def test_orphan_index_is_collected_after_grace_period(tmp_path):
+    """유예 시간이 지난 고아 인덱스는 정리하고, PDF가 있는 문서는 오래되어도 유지"""
+    now = time.time()
+    orphan = make_document(tmp_path, 'gone.pdf', last_used=now - 7200, with_pdf=False, age=7200)
+    kept = make_document(tmp_path, 'kept.pdf', last_used=now - 7200, age=7200)
+
+    collected = manager(tmp_path).collect_garbage()
+
+    assert {item['document_id'] for item in collected} == {orphan}
+    documents, _ = manager(tmp_path).scan()
+    assert orphan not in documents
+    assert documents[kept]['paths']['index']
+
+
+def test_stale_temporary_files_are_collected_after_grace_period(tmp_path):
+    """중단된 업로드의 임시 파일은 유예 시간이 지난 것만 정리"""
+    upload_dir = tmp_path / 'uploads'
+    upload_dir.mkdir()
+    stale = upload_dir / 'stale.pdf.123.tmp'
+    fresh = upload_dir / 'fresh.pdf.456.tmp'
+    stale.write_bytes(b'0' * 100)
+    fresh.write_bytes(b'0' * 100)
+    backdate(str(stale), 7200)
+
+    collected = manager(tmp_path).collect_garbage()
+
+    assert [item['path'] for item in collected] == [str(stale)]
+    assert not stale.exists()
+    assert fresh.exists()